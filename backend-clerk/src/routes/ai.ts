@@ -1,4 +1,5 @@
 import express from 'express';
+import { randomUUID } from 'crypto';
 import { GoogleGenerativeAI } from '@google/generative-ai';
 import { requireAuth } from '../middleware/clerk.js';
 import { z } from 'zod';
@@ -36,8 +37,10 @@ router.post('/assist', requireAuth, async (req, res) => {
 
     const { action, problem_title, problem_description, user_code, language } = validationResult.data;
     const userId = req.auth?.userId;
+    // Correlation ID shared with the Python backend's logs and traces
+    const correlationId = (req.headers['x-correlation-id'] as string) || randomUUID();
 
-    console.log(`AI assist request from user ${userId}: ${action} for "${problem_title}"`);
+    console.log(`AI assist request ${correlationId} from user ${userId}: ${action} for "${problem_title}"`);
 
     // Route to Python backend for advanced AI processing
     try {
@@ -63,6 +66,7 @@ router.post('/assist', requireAuth, async (req, res) => {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
+          'X-Correlation-ID': correlationId,
         },
         body: JSON.stringify(pythonRequest),
         signal: controller.signal
@@ -78,7 +82,7 @@ router.post('/assist', requireAuth, async (req, res) => {
 
       if (pythonResult.success) {
         // Log usage for analytics
-        console.log(`AI response via Python backend for user ${userId}, action: ${action}, pipeline: ${pythonResult.pipeline}`);
+        console.log(`AI response ${correlationId} via Python backend for user ${userId}, action: ${action}, pipeline: ${pythonResult.pipeline}`);
 
         res.json({
           success: true,
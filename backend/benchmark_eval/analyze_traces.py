@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Trace Analysis for tail latency
+
+Reads spans written by TRACE_EXPORTER=file (or trace_collector.py), groups them
+into traces and reports request latency percentiles, how the slowest requests
+spend their time compared with typical ones (total span time per span name),
+and the span tree of the slowest traces with token counts and scores.
+
+Usage:
+    python analyze_traces.py ../traces.jsonl
+    python analyze_traces.py traces.jsonl --route /process --slowest 5 --tail 0.05
+"""
+
+import argparse
+import json
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# Attributes worth showing next to a span in the tree
+SHOWN_ATTRIBUTES = ("retry", "attempt", "outcome", "score", "prescore", "input_tokens", "output_tokens",
+                    "cache_read_tokens", "seconds", "error", "request_id", "http.status_code")
+
+
+def load_traces(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    traces: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                span = json.loads(line)
+                traces[span["trace_id"]].append(span)
+    return traces
+
+
+def root_of(spans: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """The span whose parent is not in the trace (parent may be upstream, e.g. the Node proxy)"""
+    ids = {span["span_id"] for span in spans}
+    roots = [span for span in spans if span["parent_id"] not in ids]
+    return min(roots, key=lambda span: span["start"])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def time_by_name(traces: List[List[Dict[str, Any]]]) -> Dict[str, float]:
+    """Mean milliseconds per trace spent in spans of each name (roots excluded)"""
+    totals: Dict[str, float] = defaultdict(float)
+    for spans in traces:
+        root = root_of(spans)
+        for span in spans:
+            if span is not root:
+                totals[span["name"]] += span["duration_ms"]
+    return {name: total / max(1, len(traces)) for name, total in totals.items()}
+
+
+def print_tree(spans: List[Dict[str, Any]]) -> None:
+    children: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for span in spans:
+        children[span["parent_id"]].append(span)
+    root = root_of(spans)
+
+    def walk(span: Dict[str, Any], depth: int) -> None:
+        attributes = " ".join(f"{k}={span['attributes'][k]}" for k in SHOWN_ATTRIBUTES if span["attributes"].get(k) is not None)
+        offset = (span["start"] - root["start"]) * 1000
+        flag = " ❌" if span["status"] != "ok" else ""
+        print(f"   {'  ' * depth}{span['name']:<{28 - 2 * depth}} +{offset:>8.1f}ms {span['duration_ms']:>9.1f}ms{flag}  {attributes}")
+        for child in sorted(children[span["span_id"]], key=lambda s: s["start"]):
+            walk(child, depth + 1)
+
+    walk(root, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find where slow requests spend their time')
+    parser.add_argument('path', type=str,
+                        help='JSONL span file (TRACE_FILE or trace_collector.py output)')
+    parser.add_argument('--route', type=str, default=None,
+                        help='Only traces whose root span is for this route, e.g. /process')
+    parser.add_argument('--tail', type=float, default=0.01,
+                        help='Fraction of slowest traces compared against the rest (default: 0.01)')
+    parser.add_argument('--slowest', type=int, default=3,
+                        help='Span trees to print for the slowest traces (default: 3)')
+
+    args = parser.parse_args()
+    traces = [spans for spans in load_traces(args.path).values()
+              if args.route is None or root_of(spans)["attributes"].get("http.route") == args.route]
+    if not traces:
+        print("No traces found")
+        return
+    traces.sort(key=lambda spans: root_of(spans)["duration_ms"])
+    durations = [root_of(spans)["duration_ms"] for spans in traces]
+
+    print(f"\n🔎 {len(traces)} traces{f' for {args.route}' if args.route else ''}:")
+    print(f"   p50 {percentile(durations, 0.5):.1f}ms | p90 {percentile(durations, 0.9):.1f}ms | "
+          f"p99 {percentile(durations, 0.99):.1f}ms | max {durations[-1]:.1f}ms")
+
+    tail_count = max(1, int(len(traces) * args.tail))
+    tail, rest = traces[-tail_count:], traces[:-tail_count] or traces
+    tail_time, rest_time = time_by_name(tail), time_by_name(rest)
+    print(f"\n🐢 Mean span time per trace, slowest {tail_count} vs the other {len(rest)}:")
+    print(f"   {'Span':<20} {'Tail (ms)':>10} {'Rest (ms)':>10} {'Extra (ms)':>11}")
+    for name in sorted(tail_time, key=lambda n: tail_time[n] - rest_time.get(n, 0.0), reverse=True):
+        print(f"   {name:<20} {tail_time[name]:>10.1f} {rest_time.get(name, 0.0):>10.1f} "
+              f"{tail_time[name] - rest_time.get(name, 0.0):>+11.1f}")
+
+    for spans in reversed(traces[-args.slowest:]):
+        print(f"\n🧵 Trace {spans[0]['trace_id']}:")
+        print_tree(spans)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,22 @@ Usage:
     python benchmark_api.py --num_samples 20 --mode code --use_evaluation
     python benchmark_api.py --num_samples 50 --mode both --endpoint http://localhost:8001/process
     python benchmark_api.py --num_samples 10 --mode hint --use_evaluation --enable_retries
+
+Load testing (async client, requests cycle through the dataset):
+    python benchmark_api.py --num_samples 500 --mode both --concurrency 20
+    python benchmark_api.py --num_samples 1000 --mode hint --qps 15 --concurrency 100 --bypass_cache
 """
 
 import argparse
+import asyncio
+import contextlib
 import json
+import math
 import time
+import httpx
 import requests
 import random
+from collections import Counter
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 from statistics import mean, median, stdev
@@ -45,10 +54,35 @@ class BenchmarkResult:
     detailed_metrics: Optional[DetailedMetrics] = None
     pipeline_used: Optional[str] = None
 
+@dataclass
+class LoadSample:
+    """One load-test request; times are seconds since the start of the test"""
+    intended_start: float  # Scheduled send time (open-loop) or actual send time (closed-loop)
+    actual_start: float
+    end: float
+    success: bool
+    status: str  # HTTP status code or exception name
+
+    @property
+    def latency(self) -> float:
+        """Latency from the intended send time, corrected for coordinated omission"""
+        return self.end - self.intended_start
+
+    @property
+    def service_time(self) -> float:
+        """Latency from when the request was actually sent"""
+        return self.end - self.actual_start
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
 class APIBenchmarker:
     def __init__(self, endpoint: str = "http://localhost:8000/process"):
         self.endpoint = endpoint
         self.results: List[BenchmarkResult] = []
+        self.load_samples: List[LoadSample] = []
     
     def load_synthetic_data(self, mode: str) -> List[Dict[str, Any]]:
         """Load synthetic data based on mode"""
@@ -99,9 +133,8 @@ class APIBenchmarker:
             improvement_advice=evaluation_data.get('improvement_advice')
         )
     
-    def make_api_call(self, payload: Dict[str, Any], use_evaluation: bool, enable_retries: bool) -> BenchmarkResult:
-        """Make a single API call and measure performance"""
-        # Set evaluation and retry settings
+    def prepare_payload(self, payload: Dict[str, Any], use_evaluation: bool, enable_retries: bool) -> Dict[str, Any]:
+        """Set evaluation and retry settings on a sample"""
         payload['use_evaluation'] = use_evaluation
         
         # Control retry behavior
@@ -109,6 +142,11 @@ class APIBenchmarker:
             payload['max_retries'] = 2 if enable_retries else 0
         else:
             payload['max_retries'] = 0  # Never retry without evaluation
+        return payload
+    
+    def make_api_call(self, payload: Dict[str, Any], use_evaluation: bool, enable_retries: bool) -> BenchmarkResult:
+        """Make a single API call and measure performance"""
+        payload = self.prepare_payload(payload, use_evaluation, enable_retries)
         
         start_time = time.time()
         
@@ -170,6 +208,24 @@ class APIBenchmarker:
                 pipeline_used=None
             )
     
+    def select_samples(self, num_samples: int, mode: str) -> List[Dict[str, Any]]:
+        """Randomly pick up to num_samples samples for the mode ("both" splits evenly)"""
+        if mode == "both":
+            # Run both hint and code modes
+            hint_data = self.load_synthetic_data("hint")
+            code_data = self.load_synthetic_data("code")
+            
+            hint_samples = random.sample(hint_data, min(num_samples // 2, len(hint_data)))
+            code_samples = random.sample(code_data, min(num_samples // 2, len(code_data)))
+            
+            all_samples = hint_samples + code_samples
+            random.shuffle(all_samples)
+            return all_samples
+        
+        # Single mode
+        data = self.load_synthetic_data(mode)
+        return random.sample(data, min(num_samples, len(data)))
+    
     def run_benchmark(self, num_samples: int, mode: str, use_evaluation: bool = False, enable_retries: bool = False) -> None:
         """Run benchmark with specified parameters"""
         print(f"\n🚀 Starting benchmark:")
@@ -183,20 +239,7 @@ class APIBenchmarker:
             retry_setting = "2 retries" if enable_retries else "0 retries"
             print(f"   ⚙️  Retry Setting: {retry_setting} (with evaluation)")
         
-        if mode == "both":
-            # Run both hint and code modes
-            hint_data = self.load_synthetic_data("hint")
-            code_data = self.load_synthetic_data("code")
-            
-            hint_samples = random.sample(hint_data, min(num_samples // 2, len(hint_data)))
-            code_samples = random.sample(code_data, min(num_samples // 2, len(code_data)))
-            
-            all_samples = hint_samples + code_samples
-            random.shuffle(all_samples)
-        else:
-            # Single mode
-            data = self.load_synthetic_data(mode)
-            all_samples = random.sample(data, min(num_samples, len(data)))
+        all_samples = self.select_samples(num_samples, mode)
         
         print(f"\n📊 Running {len(all_samples)} API calls...")
         
@@ -213,6 +256,122 @@ class APIBenchmarker:
             else:
                 print(f"❌ {result.response_time:.2f}s - {result.error}")
     
+    async def _timed_post(self, client: httpx.AsyncClient, payload: Dict[str, Any], intended_start: float, t0: float,
+                          slots: Optional[asyncio.Semaphore] = None) -> LoadSample:
+        """Send one request (once a connection slot is free) and record its timing relative to t0"""
+        async with (slots or contextlib.nullcontext()):
+            actual_start = time.perf_counter() - t0
+            try:
+                response = await client.post(self.endpoint, json=payload)
+                success, status = response.status_code == 200, str(response.status_code)
+            except httpx.HTTPError as e:
+                success, status = False, type(e).__name__
+            return LoadSample(intended_start, actual_start, time.perf_counter() - t0, success, status)
+    
+    async def run_load_test(self, num_requests: int, mode: str, concurrency: Optional[int], qps: Optional[float],
+                            use_evaluation: bool = False, enable_retries: bool = False, bypass_cache: bool = False,
+                            seed: int = 42) -> None:
+        """
+        Send num_requests through one pooled async client, cycling through the dataset
+        
+        With qps, arrivals are open-loop Poisson at that rate (concurrency caps open
+        connections; requests beyond it wait for one); latency is measured from each
+        request's scheduled send time so queueing delay is not hidden (coordinated
+        omission). Without qps, `concurrency` workers send back-to-back (closed loop).
+        """
+        samples = self.select_samples(max(num_requests, 2), mode)
+        payloads = []
+        for i in range(num_requests):
+            payload = self.prepare_payload(json.loads(json.dumps(samples[i % len(samples)])), use_evaluation, enable_retries)
+            payload['bypass_cache'] = bypass_cache
+            payloads.append(payload)
+        
+        max_connections = concurrency or 100
+        limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        timeout = httpx.Timeout(60.0, pool=None)
+        
+        print(f"\n🚀 Starting load test:")
+        print(f"   Requests: {num_requests}")
+        if qps:
+            print(f"   Arrivals: open-loop Poisson at {qps:.1f} req/s (max {max_connections} connections)")
+        else:
+            print(f"   Workers: {concurrency} (closed loop)")
+        print(f"   Evaluation: {'Enabled' if use_evaluation else 'Disabled'} | Cache: {'Bypassed' if bypass_cache else 'Enabled'}")
+        print(f"   Endpoint: {self.endpoint}")
+        
+        async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+            t0 = time.perf_counter()
+            if qps:
+                rng = random.Random(seed)
+                slots = asyncio.Semaphore(max_connections)  # Queueing for a slot counts toward latency, not service time
+                tasks = []
+                scheduled = 0.0
+                for payload in payloads:
+                    scheduled += rng.expovariate(qps)
+                    delay = scheduled - (time.perf_counter() - t0)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    tasks.append(asyncio.create_task(self._timed_post(client, payload, scheduled, t0, slots)))
+                self.load_samples = list(await asyncio.gather(*tasks))
+            else:
+                queue = list(reversed(payloads))
+                
+                async def worker():
+                    while queue:
+                        payload = queue.pop()
+                        self.load_samples.append(await self._timed_post(client, payload, time.perf_counter() - t0, t0))
+                
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+    
+    def print_load_results(self, qps: Optional[float], interval: float) -> None:
+        """Print latency percentiles, throughput and error rate over time for the load test"""
+        if not self.load_samples:
+            print("❌ No results to display")
+            return
+        
+        samples = self.load_samples
+        ok = [s for s in samples if s.success]
+        wall = max(s.end for s in samples)
+        
+        print(f"\n{'='*80}")
+        print(f"📈 LOAD TEST RESULTS")
+        print(f"{'='*80}")
+        
+        print(f"\n🎯 OVERALL:")
+        print(f"   Requests: {len(samples)} | Succeeded: {len(ok)} | Errors: {len(samples) - len(ok)} ({(len(samples) - len(ok)) / len(samples) * 100:.1f}%)")
+        print(f"   Wall time: {wall:.2f}s")
+        print(f"   Throughput: {len(ok) / wall:.2f} successful req/s ({len(samples) / wall:.2f} completed req/s)")
+        if qps:
+            offered = len(samples) / max(s.intended_start for s in samples)
+            print(f"   Offered load: {offered:.2f} req/s (target {qps:.2f})")
+        errors = Counter(s.status for s in samples if not s.success)
+        if errors:
+            print(f"   Errors by type: {', '.join(f'{status}: {count}' for status, count in errors.most_common())}")
+        
+        if ok:
+            label = "corrected for coordinated omission" if qps else "closed loop"
+            print(f"\n⏱️  LATENCY ({label}, successful requests):")
+            print(f"   {'':<14} {'p50':>8} {'p90':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+            rows = [("Latency", [s.latency for s in ok])]
+            if qps:
+                rows.append(("Service time", [s.service_time for s in ok]))
+            for name, values in rows:
+                print(f"   {name:<14} " + " ".join(f"{percentile(values, p):>7.2f}s" for p in (50, 90, 95, 99)) + f" {max(values):>7.2f}s")
+        
+        print(f"\n📉 OVER TIME ({interval:.0f}s windows, by completion time):")
+        print(f"   {'Window':<14} {'Done':>6} {'Errors':>7} {'Err %':>7} {'p95':>8}")
+        buckets = int(wall // interval) + 1
+        for b in range(buckets):
+            window = [s for s in samples if b * interval <= s.end < (b + 1) * interval]
+            if not window:
+                continue
+            failed = len([s for s in window if not s.success])
+            ok_latencies = [s.latency for s in window if s.success]
+            p95 = f"{percentile(ok_latencies, 95):>7.2f}s" if ok_latencies else f"{'-':>8}"
+            print(f"   {f'{b * interval:.0f}-{(b + 1) * interval:.0f}s':<14} {len(window):>6} {failed:>7} {failed / len(window) * 100:>6.1f}% {p95}")
+        
+        print(f"\n{'='*80}")
+    
     def print_results(self) -> None:
         """Print comprehensive benchmark results with detailed metrics"""
         if not self.results:
@@ -525,6 +684,16 @@ def main():
                         help='Enable retry mechanism when evaluation is poor (requires --use_evaluation)')
     parser.add_argument('--endpoint', type=str, default='http://localhost:8000/process',
                         help='API endpoint URL (default: http://localhost:8000/process)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='Load test: concurrent workers, or max open connections with --qps')
+    parser.add_argument('--qps', type=float, default=None,
+                        help='Load test: open-loop Poisson arrival rate in requests/s')
+    parser.add_argument('--bypass_cache', action='store_true',
+                        help='Load test: ask the server to skip its response cache')
+    parser.add_argument('--interval', type=float, default=5.0,
+                        help='Load test: window size in seconds for error rate over time (default: 5)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Load test: random seed for arrival times (default: 42)')
     
     args = parser.parse_args()
     
@@ -537,9 +706,30 @@ def main():
         print("❌ Error: --enable_retries requires --use_evaluation")
         return
     
+    if (args.concurrency is not None and args.concurrency <= 0) or (args.qps is not None and args.qps <= 0):
+        print("❌ Error: --concurrency and --qps must be positive")
+        return
+    
     # Run benchmark
     benchmarker = APIBenchmarker(args.endpoint)
     
+    if args.concurrency or args.qps:
+        try:
+            asyncio.run(benchmarker.run_load_test(
+                num_requests=args.num_samples,
+                mode=args.mode,
+                concurrency=args.concurrency,
+                qps=args.qps,
+                use_evaluation=args.use_evaluation,
+                enable_retries=args.enable_retries,
+                bypass_cache=args.bypass_cache,
+                seed=args.seed
+            ))
+        except KeyboardInterrupt:
+            print("\n\n⏹️  Load test interrupted by user")
+        benchmarker.print_load_results(args.qps, args.interval)
+        return
+    
     try:
         benchmarker.run_benchmark(
             num_samples=args.num_samples,
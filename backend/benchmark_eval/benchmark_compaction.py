@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Code Compaction Benchmark
+
+Measures how much code_compaction.compact_code shrinks large submissions and
+what it costs. The synthetic datasets hold short snippets, so each sample is
+padded the way pasted files tend to look (an unused helper, a unittest class,
+a __main__ driver, a commented-out earlier attempt) before compaction.
+
+Reports per-request compression ratio, compaction time, input tokens saved
+across the Claude and GPT prompts, and the estimated latency delta at
+--prefill_tps input tokens per second (saved prefill time minus compaction time).
+
+Usage:
+    python benchmark_compaction.py
+    python benchmark_compaction.py --budget 800 --min_tokens 200
+    python benchmark_compaction.py --padding 0   # unpadded dataset code
+"""
+
+import argparse
+import json
+import os
+import sys
+from statistics import mean, median
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from code_compaction import compact_code, estimate_tokens
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATASETS = ["synthetic_code_data.jsonl", "synthetic_hint_data.jsonl"]
+
+HELPER = '''
+def parse_input(raw):
+    """Read the test input format"""
+    lines = raw.strip().split("\\n")
+    return [list(map(int, line.split())) for line in lines]
+
+
+def format_output(result):
+    return " ".join(str(x) for x in result)
+'''
+
+TEST_HARNESS = '''
+
+import unittest
+
+
+class TestSolution(unittest.TestCase):
+    def test_example_1(self):
+        self.assertIsNotNone(parse_input("1 2 3"))
+
+    def test_example_2(self):
+        self.assertEqual(format_output([1, 2]), "1 2")
+
+    def test_empty(self):
+        self.assertEqual(format_output([]), "")
+
+
+if __name__ == "__main__":
+    for case in ["1 2 3", "4 5 6", "7 8 9"]:
+        print(format_output(parse_input(case)[0]))
+    unittest.main()
+'''
+
+
+def commented_attempt(code: str) -> str:
+    """The sample code commented out, as an abandoned earlier attempt"""
+    return "# Earlier attempt:\n" + "\n".join("# " + line for line in code.split("\n") if line.strip()) + "\n\n"
+
+
+def pad(code: str, padding: int) -> str:
+    """Surround code with padding copies of unrelated helpers, tests and old attempts"""
+    if padding <= 0:
+        return code
+    return commented_attempt(code) * padding + HELPER * padding + "\n" + code + TEST_HARNESS * padding
+
+
+def load_code(padding: int) -> List[str]:
+    codes = []
+    for name in DATASETS:
+        with open(os.path.join(HERE, name), 'r') as f:
+            for line in f:
+                if line.strip():
+                    codes.append(pad(json.loads(line)["problem"].get("code", ""), padding))
+    return codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure code compaction ratio and cost')
+    parser.add_argument('--budget', type=int, default=1500,
+                        help='Token budget (CODE_TOKEN_BUDGET, default: 1500)')
+    parser.add_argument('--min_tokens', type=int, default=400,
+                        help='Only compact above this size (CODE_COMPACTION_MIN_TOKENS, default: 400)')
+    parser.add_argument('--padding', type=int, default=3,
+                        help='Copies of helper/test/attempt padding per sample (default: 3)')
+    parser.add_argument('--prefill_tps', type=float, default=5000.0,
+                        help='Assumed provider input processing rate in tokens/s (default: 5000)')
+
+    args = parser.parse_args()
+    codes = load_code(args.padding)
+
+    rows: List[Dict[str, Any]] = []
+    for code in codes:
+        _, stats = compact_code(code, "python", args.budget, args.min_tokens)
+        saved = 2 * (stats["original_tokens"] - stats["compacted_tokens"])  # Claude prompt + GPT evaluation input
+        stats["saved_tokens"] = saved
+        stats["latency_delta_ms"] = stats["elapsed_ms"] - saved / args.prefill_tps * 1000
+        rows.append(stats)
+
+    applied = [r for r in rows if r["applied"]]
+    print(f"\n🗜️  Compaction benchmark:")
+    print(f"   Samples: {len(rows)} | Padding: {args.padding} | Budget: {args.budget} | Min tokens: {args.min_tokens}")
+    print(f"   Avg submission size: {mean(r['original_tokens'] for r in rows):.0f} tokens "
+          f"(max {max(r['original_tokens'] for r in rows)})")
+    print(f"   Compacted: {len(applied)}/{len(rows)} requests "
+          f"({len([r for r in applied if r['truncated']])} also cut to the budget)")
+
+    if not applied:
+        print("   Nothing to compact at this size; lower --min_tokens or raise --padding")
+        return
+
+    ratios = [r["ratio"] for r in applied]
+    elapsed = [r["elapsed_ms"] for r in applied]
+    print(f"\n📊 Results (compacted requests):")
+    print(f"   Compression ratio: avg {mean(ratios):.3f} | median {median(ratios):.3f} | best {min(ratios):.3f}")
+    print(f"   Compaction time:   avg {mean(elapsed):.2f}ms | median {median(elapsed):.2f}ms | max {max(elapsed):.2f}ms")
+    print(f"   Input tokens saved per request (Claude + GPT): avg {mean(r['saved_tokens'] for r in applied):.0f}")
+    print(f"   Estimated latency delta at {args.prefill_tps:.0f} tok/s: "
+          f"avg {mean(r['latency_delta_ms'] for r in applied):+.1f}ms (negative = faster)")
+
+
+if __name__ == "__main__":
+    main()
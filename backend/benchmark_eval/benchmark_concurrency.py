@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Concurrency Benchmark for the async HintGenerator pipeline
+
+Drives HintGenerator.agenerate_and_evaluate against fake providers (fake_providers.py) with a
+fixed per-call latency and reports how throughput scales with the number of
+requests kept in flight on a single event loop. With --compare_sync the old
+behaviour (blocking generate_and_evaluate called from a coroutine) is measured
+too, which stays flat at roughly one request per provider latency.
+
+Usage:
+    python benchmark_concurrency.py
+    python benchmark_concurrency.py --levels 1 10 100 500 --rounds 8 --latency 0.5
+    python benchmark_concurrency.py --use_evaluation --compare_sync
+    python benchmark_concurrency.py --levels 1 50 --error_rate 0.05 --rate_limit_rate 0.1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from statistics import median
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("CLAUDE_API_KEY", "sk-ant-benchmark")
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from hint_generator import HintGenerator
+from fake_providers import FakeAnthropic, FakeAsyncAnthropic, FakeOpenAI, FakeAsyncOpenAI
+
+PROBLEM = "Two Sum II — Input Array Is Sorted"
+CODE = "def two_sum(numbers, target):\n    pass\n"
+
+
+def build_generator(latency, **faults) -> HintGenerator:
+    """HintGenerator wired to fake sync and async providers (faults: error_rate, rate_limit_rate, ...)"""
+    generator = HintGenerator()
+    generator.claude_client = FakeAnthropic(latency, **faults)
+    generator.async_claude_client = FakeAsyncAnthropic(latency, **faults)
+    generator.openai_client = FakeOpenAI(latency, **faults)
+    generator.async_openai_client = FakeAsyncOpenAI(latency, **faults)
+    # Always call the (fake) GPT evaluator rather than deciding locally
+    generator.prescore_accept = float("inf")
+    generator.prescore_reject = float("-inf")
+    return generator
+
+
+async def run_level(generator: HintGenerator, concurrency: int, num_requests: int, use_evaluation: bool, blocking: bool) -> Dict[str, float]:
+    """Run num_requests with at most `concurrency` in flight and collect timings"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures = 0
+
+    async def one_request():
+        nonlocal failures
+        async with semaphore:
+            start = time.perf_counter()
+            if blocking:
+                result = generator.generate_and_evaluate(PROBLEM, CODE, mode="hint", use_evaluation=use_evaluation, use_cache=False)
+            else:
+                result = await generator.agenerate_and_evaluate(PROBLEM, CODE, mode="hint", use_evaluation=use_evaluation, use_cache=False)
+            latencies.append(time.perf_counter() - start)
+            if not result["success"]:
+                failures += 1
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-call pipeline logging
+        await asyncio.gather(*(one_request() for _ in range(num_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "elapsed": elapsed,
+        "throughput": num_requests / elapsed,
+        "p50": median(latencies),
+        "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "failures": failures
+    }
+
+
+def print_table(title: str, rows: List[Dict[str, float]]) -> None:
+    """Print one result table"""
+    print(f"\n{title}")
+    print(f"   {'In-flight':>10} {'Requests':>9} {'Wall (s)':>9} {'Req/s':>9} {'p50 (s)':>8} {'p95 (s)':>8} {'Speedup':>8} {'Failed':>7}")
+    base = rows[0]["throughput"] if rows else 1.0
+    for row in rows:
+        print(f"   {row['concurrency']:>10} {row['requests']:>9} {row['elapsed']:>9.2f} {row['throughput']:>9.1f} "
+              f"{row['p50']:>8.3f} {row['p95']:>8.3f} {row['throughput'] / base:>7.1f}x {row['failures']:>7}")
+
+
+async def main_async(args) -> None:
+    generator = build_generator(args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    calls_per_request = 2 if args.use_evaluation else 1
+
+    print(f"\n🚀 Concurrency benchmark:")
+    print(f"   Simulated provider latency: {args.latency:.2f}s per call ({calls_per_request} call(s) per request)")
+    print(f"   Evaluation: {'Enabled' if args.use_evaluation else 'Disabled'}")
+    if args.error_rate or args.rate_limit_rate:
+        print(f"   Injected faults per call: {args.error_rate * 100:.1f}% 5xx, {args.rate_limit_rate * 100:.1f}% 429 (retried with backoff)")
+
+    async_rows = []
+    for level in args.levels:
+        num_requests = level * args.rounds
+        stats = await run_level(generator, level, num_requests, args.use_evaluation, blocking=False)
+        async_rows.append({"concurrency": level, "requests": num_requests, **stats})
+    print_table("⚡ agenerate_and_evaluate (non-blocking):", async_rows)
+
+    if args.compare_sync:
+        sync_rows = []
+        for level in args.levels:
+            # The blocking path serializes everything, so keep the request count small
+            num_requests = args.sync_requests
+            stats = await run_level(generator, level, num_requests, args.use_evaluation, blocking=True)
+            sync_rows.append({"concurrency": level, "requests": num_requests, **stats})
+        print_table("🐢 generate_and_evaluate called from a coroutine (blocking):", sync_rows)
+
+    if args.error_rate or args.rate_limit_rate:
+        clients = [generator.async_claude_client, generator.async_openai_client, generator.claude_client, generator.openai_client]
+        calls = sum(c.stats["calls"] for c in clients)
+        faults = sum(c.stats["errors"] + c.stats["rate_limited"] for c in clients)
+        print(f"\n🧪 Provider calls: {calls} ({faults} failed with injected faults)")
+
+    ideal = 1.0 / (args.latency * calls_per_request)
+    print(f"\n📏 Single-request ceiling: {ideal:.1f} req/s; async throughput should grow ~linearly with in-flight requests.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure async pipeline throughput vs in-flight requests')
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 50, 100, 250, 500],
+                        help='In-flight request levels to test (default: 1 10 50 100 250 500)')
+    parser.add_argument('--rounds', type=int, default=4,
+                        help='Requests per level as a multiple of the in-flight count (default: 4)')
+    parser.add_argument('--latency', type=float, default=0.25,
+                        help='Simulated provider latency in seconds (default: 0.25)')
+    parser.add_argument('--use_evaluation', action='store_true',
+                        help='Include the fake GPT evaluation call')
+    parser.add_argument('--error_rate', type=float, default=0.0,
+                        help='Fraction of provider calls failing with a 5xx error (default: 0)')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0,
+                        help='Fraction of provider calls rejected with a 429 (default: 0)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for injected faults (default: 0)')
+    parser.add_argument('--compare_sync', action='store_true',
+                        help='Also measure the blocking pipeline for comparison')
+    parser.add_argument('--sync_requests', type=int, default=8,
+                        help='Requests per level for the blocking comparison (default: 8)')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
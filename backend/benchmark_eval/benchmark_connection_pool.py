@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Connection Pool Benchmark
+
+Measures what the shared provider pools (http_pools.py) save: the latency of a
+request that has to connect (TCP + TLS) against one that reuses a keep-alive
+connection, and whether a connection survives an idle gap with the httpx
+default keep-alive expiry (5s) versus PROVIDER_KEEPALIVE_EXPIRY. Requests are
+unauthenticated HEADs to the provider API hosts, so no keys or tokens are used.
+
+Usage:
+    python benchmark_connection_pool.py
+    python benchmark_connection_pool.py --requests 20 --idle 15 --providers anthropic
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from statistics import median
+from typing import Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import anthropic
+import openai
+from http_pools import PoolSettings, make_http_client, http2_available
+
+PROVIDERS = {
+    "anthropic": (anthropic.DefaultAsyncHttpxClient, os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com")),
+    "openai": (openai.DefaultAsyncHttpxClient, os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")),
+}
+
+
+async def timed_head(client, url: str) -> float:
+    start = time.perf_counter()
+    await client.head(url)
+    return time.perf_counter() - start
+
+
+async def cold_latencies(provider: str, settings: PoolSettings, requests: int) -> List[float]:
+    """First request on a fresh pool, repeated"""
+    client_class, url = PROVIDERS[provider]
+    latencies = []
+    for _ in range(requests):
+        client = make_http_client(f"bench_{provider}", client_class, True, settings)
+        latencies.append(await timed_head(client, url))
+        await client.aclose()
+    return latencies
+
+
+async def warm_latencies(provider: str, settings: PoolSettings, requests: int) -> List[float]:
+    """Requests reusing one kept-alive connection"""
+    client_class, url = PROVIDERS[provider]
+    client = make_http_client(f"bench_{provider}", client_class, True, settings)
+    await timed_head(client, url)
+    latencies = [await timed_head(client, url) for _ in range(requests)]
+    await client.aclose()
+    return latencies
+
+
+async def after_idle(provider: str, settings: PoolSettings, idle: float) -> float:
+    """Latency of a request idle seconds after the previous one on the same pool"""
+    client_class, url = PROVIDERS[provider]
+    client = make_http_client(f"bench_{provider}", client_class, True, settings)
+    await timed_head(client, url)
+    await asyncio.sleep(idle)
+    latency = await timed_head(client, url)
+    await client.aclose()
+    return latency
+
+
+async def run(providers: List[str], requests: int, idle: float) -> Dict[str, Dict[str, float]]:
+    tuned = PoolSettings.from_env()
+    default = PoolSettings(keepalive_expiry=5.0, http2=False)
+    results = {}
+    for provider in providers:
+        results[provider] = {
+            "cold": median(await cold_latencies(provider, tuned, requests)),
+            "warm": median(await warm_latencies(provider, tuned, requests)),
+            "idle_default": await after_idle(provider, default, idle),
+            "idle_tuned": await after_idle(provider, tuned, idle),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure connect vs keep-alive latency to the provider APIs')
+    parser.add_argument('--providers', nargs='+', default=list(PROVIDERS), choices=list(PROVIDERS),
+                        help='Providers to measure (default: both)')
+    parser.add_argument('--requests', type=int, default=10,
+                        help='Requests per cold/warm measurement (default: 10)')
+    parser.add_argument('--idle', type=float, default=10.0,
+                        help='Idle gap in seconds before the keep-alive comparison (default: 10)')
+
+    args = parser.parse_args()
+    settings = PoolSettings.from_env()
+    print(f"\n🔌 Pool: max {settings.max_connections} connections, {settings.max_keepalive} keep-alive, "
+          f"expiry {settings.keepalive_expiry:g}s, HTTP/2 {'on' if settings.http2 else 'off'}"
+          f"{'' if http2_available() else ' (h2 not installed)'}")
+
+    results = asyncio.run(run(args.providers, args.requests, args.idle))
+    print(f"\n{'Provider':<10} {'Cold (ms)':>10} {'Warm (ms)':>10} {'Saved (ms)':>11} "
+          f"{f'After {args.idle:g}s idle: default':>28} {'tuned':>8}")
+    for provider, r in results.items():
+        print(f"{provider:<10} {r['cold'] * 1000:>10.1f} {r['warm'] * 1000:>10.1f} {(r['cold'] - r['warm']) * 1000:>11.1f} "
+              f"{r['idle_default'] * 1000:>26.1f}ms {r['idle_tuned'] * 1000:>6.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Fan-out vs Serial Retry Benchmark
+
+Runs the same requests through the serial retry loop (agenerate_and_evaluate with
+max_retries) and through concurrent candidate generation (agenerate_fanout), using
+fake providers where a --low_score_rate fraction of GPT evaluations fall below
+the threshold. Reports latency, provider calls and token cost per request.
+
+Usage:
+    python benchmark_fanout.py
+    python benchmark_fanout.py --requests 200 --low_score_rate 0.4 --candidates 3
+    python benchmark_fanout.py --claude_latency 1.2 --gpt_latency 0.8 --jitter 0.4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from statistics import mean, median
+from typing import Any, Dict, List
+
+from benchmark_concurrency import build_generator, PROBLEM, CODE
+from fake_providers import FakeAsyncAnthropic, FakeAsyncOpenAI
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def jittered(latency: float, jitter: float) -> str:
+    """Latency spec uniform in [1 - jitter, 1 + jitter] x latency"""
+    return f"uniform:{latency * (1 - jitter)}:{latency * (1 + jitter)}"
+
+
+def provider_calls(result: Dict[str, Any]) -> int:
+    """Completed Claude + GPT calls recorded in the attempts"""
+    calls = 0
+    for attempt in result["attempts"]:
+        calls += 1
+        if (attempt.get("gpt_evaluation") or {}).get("usage"):
+            calls += 1
+    return calls
+
+
+async def run_strategy(generator, strategy: str, args) -> List[Dict[str, Any]]:
+    """Run args.requests requests through one strategy (all requests concurrently)"""
+
+    async def one(i: int) -> Dict[str, Any]:
+        start = time.perf_counter()
+        if strategy == "serial":
+            result = await generator.agenerate_and_evaluate(
+                PROBLEM, CODE, mode="hint", threshold=args.threshold,
+                max_retries=args.candidates - 1, use_evaluation=True, use_cache=False)
+        else:
+            result = await generator.agenerate_fanout(
+                PROBLEM, CODE, mode="hint", threshold=args.threshold,
+                num_candidates=args.candidates, use_evaluation=True, use_cache=False,
+                early_exit=(strategy == "fanout"))
+        score = (result["final_evaluation"] or {}).get("overall_score")
+        return {
+            "latency": time.perf_counter() - start,
+            "success": result["success"],
+            "score": score,
+            "calls": provider_calls(result),
+            "tokens": sum(v for k, v in result["usage"].items() if k.endswith(("_input_tokens", "_output_tokens"))),
+            "cancelled": (result.get("fanout") or {}).get("cancelled", 0)
+        }
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-call pipeline logging
+        return await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+
+def print_row(name: str, rows: List[Dict[str, Any]]) -> None:
+    latencies = [r["latency"] for r in rows]
+    scores = [r["score"] for r in rows if r["score"] is not None]
+    good = len([s for s in scores if s >= 3])
+    print(f"   {name:<22} {mean(latencies):>7.2f}s {median(latencies):>7.2f}s {percentile(latencies, 0.95):>7.2f}s "
+          f"{mean(r['calls'] for r in rows):>7.2f} {mean(r['tokens'] for r in rows):>9.0f} "
+          f"{mean(r['cancelled'] for r in rows):>9.2f} {good / len(rows) * 100:>7.1f}%")
+
+
+async def main_async(args) -> None:
+    generator = build_generator(args.claude_latency)
+    generator.async_claude_client = FakeAsyncAnthropic(jittered(args.claude_latency, args.jitter), seed=args.seed)
+    generator.async_openai_client = FakeAsyncOpenAI(jittered(args.gpt_latency, args.jitter),
+                                                    low_score_rate=args.low_score_rate, seed=args.seed)
+
+    print(f"\n🚀 Fan-out benchmark:")
+    print(f"   Requests: {args.requests} | Candidates / max attempts: {args.candidates}")
+    print(f"   Claude latency: {args.claude_latency:.2f}s | GPT latency: {args.gpt_latency:.2f}s | Jitter: ±{args.jitter * 100:.0f}%")
+    print(f"   Low-score rate: {args.low_score_rate * 100:.0f}% (threshold {args.threshold})")
+
+    print(f"\n   {'Strategy':<22} {'Mean':>8} {'p50':>8} {'p95':>8} {'Calls':>7} {'Tokens':>9} {'Cancelled':>9} {'Score≥3':>8}")
+    for strategy, label in (("serial", "Serial retries"), ("fanout", "Fan-out (early exit)"), ("fanout_all", "Fan-out (best of N)")):
+        rows = await run_strategy(generator, strategy, args)
+        print_row(label, rows)
+
+    print("\n   Tokens count completed calls only; calls cancelled after an early exit may still bill input tokens.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fan-out candidate generation with serial retries')
+    parser.add_argument('--requests', type=int, default=100,
+                        help='Requests per strategy (default: 100)')
+    parser.add_argument('--candidates', type=int, default=3,
+                        help='Fan-out candidates, and total serial attempts (default: 3)')
+    parser.add_argument('--claude_latency', type=float, default=0.3,
+                        help='Simulated Claude latency in seconds (default: 0.3)')
+    parser.add_argument('--gpt_latency', type=float, default=0.2,
+                        help='Simulated GPT latency in seconds (default: 0.2)')
+    parser.add_argument('--jitter', type=float, default=0.3,
+                        help='Latency jitter as a fraction of latency (default: 0.3)')
+    parser.add_argument('--low_score_rate', type=float, default=0.3,
+                        help='Fraction of evaluations scoring below threshold (default: 0.3)')
+    parser.add_argument('--threshold', type=float, default=3.0,
+                        help='Score threshold (default: 3.0)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed (default: 42)')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
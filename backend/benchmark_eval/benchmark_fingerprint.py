@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Cache Key Hit-Rate Benchmark for code fingerprinting
+
+Replays request streams through three cache-key strategies and reports the hit
+rate an unbounded response cache would reach with each:
+
+    exact      - raw code_so_far string
+    normalized - trailing whitespace / blank lines ignored (response_cache.normalize_code)
+    canonical  - AST fingerprint used by HintGenerator (comments, docstrings
+                 and formatting ignored; local names kept, since responses
+                 quote them)
+
+The synthetic datasets contain few literal repeats, so --variants adds
+near-duplicates per sample (reformatted, re-commented, renamed locals) the way
+different students type the same code; renamed variants are expected misses. Real traffic can be replayed with
+--traffic, one ProcessRequest JSON object per line.
+
+Usage:
+    python benchmark_fingerprint.py
+    python benchmark_fingerprint.py --variants 5 --seed 7
+    python benchmark_fingerprint.py --traffic process_requests.jsonl
+"""
+
+import argparse
+import ast
+import json
+import os
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hint_generator import response_cache_key
+from response_cache import make_cache_key, normalize_code
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATASETS = ["synthetic_code_data.jsonl", "synthetic_hint_data.jsonl"]
+SAFE_NAMES = ["a", "b", "c", "d", "e", "f", "g", "h", "p", "q", "r", "s", "t", "u", "w", "z"]
+
+
+def load_requests(path: str) -> List[Dict[str, Any]]:
+    """Load ProcessRequest-shaped JSON lines"""
+    with open(path, 'r') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def generator_mode(request: Dict[str, Any]) -> str:
+    return "next_code" if request.get("mode") == "code" else "hint"
+
+
+def exact_key(request: Dict[str, Any]) -> str:
+    code = request["problem"].get("code", "")
+    return make_cache_key(request["problem"].get("title", ""), code, generator_mode(request), "python", request.get("use_evaluation", False))
+
+
+def normalized_key(request: Dict[str, Any]) -> str:
+    code = normalize_code(request["problem"].get("code", ""))
+    return make_cache_key(request["problem"].get("title", ""), code, generator_mode(request), "python", request.get("use_evaluation", False))
+
+
+def canonical_key(request: Dict[str, Any]) -> str:
+    # The key HintGenerator uses for a /process request (threshold 3.0, default retry budget)
+    use_evaluation = request.get("use_evaluation", False)
+    retries = request.get("max_retries")
+    if retries is None:
+        retries = 2 if use_evaluation else 0
+    return response_cache_key(request["problem"].get("title", ""), request["problem"].get("code", ""), "python",
+                              generator_mode(request), use_evaluation, (3.0, retries))
+
+
+STRATEGIES: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    "exact": exact_key,
+    "normalized": normalized_key,
+    "canonical": canonical_key,
+}
+
+
+def perturb_code(code: str, rng: random.Random, rename: bool) -> str:
+    """Produce a semantically identical variant of code with different surface form"""
+    lines = code.split("\n")
+    out = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("#") and rng.random() < 0.5:
+            continue  # Drop a comment
+        if stripped and rng.random() < 0.2:
+            indent = line[:len(line) - len(line.lstrip())]
+            out.append(f"{indent}# note: {rng.choice(['check this', 'todo', 'hmm', 'step'])}")
+        if stripped and rng.random() < 0.3 and "#" not in line and '"' not in line and "'" not in line:
+            line = line + f"  # {rng.choice(['ok', 'loop', 'base case', 'update'])}"
+        out.append(line.rstrip() + (" " * rng.randint(0, 2)))
+        if rng.random() < 0.15:
+            out.append("")
+    variant = "\n".join(out)
+
+    if rename:
+        try:
+            tree = ast.parse(variant)
+        except SyntaxError:
+            return variant
+        locals_ = set()
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                locals_.update(a.arg for a in node.args.args if a.arg != "self")
+                for child in ast.walk(node):
+                    if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                        locals_.add(child.id)
+        for name in sorted(locals_):
+            new_name = f"{rng.choice(SAFE_NAMES)}_{name[:3]}"
+            variant = re.sub(rf"\b{re.escape(name)}\b", new_name, variant)
+    return variant
+
+
+def with_variants(requests: List[Dict[str, Any]], variants: int, seed: int) -> List[Dict[str, Any]]:
+    """Interleave each request with `variants` near-duplicates"""
+    rng = random.Random(seed)
+    out = []
+    for request in requests:
+        out.append(request)
+        for _ in range(variants):
+            clone = json.loads(json.dumps(request))
+            clone["problem"]["code"] = perturb_code(request["problem"].get("code", ""), rng, rename=rng.random() < 0.5)
+            out.append(clone)
+    rng.shuffle(out)
+    return out
+
+
+def hit_rates(requests: List[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    """Hit rate and keying cost per strategy for an unbounded cache"""
+    report = {}
+    for name, key_fn in STRATEGIES.items():
+        seen = set()
+        hits = 0
+        start = time.perf_counter()
+        for request in requests:
+            key = key_fn(request)
+            if key in seen:
+                hits += 1
+            else:
+                seen.add(key)
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            "hits": hits,
+            "hit_rate": hits / len(requests) if requests else 0.0,
+            "unique": len(seen),
+            "us_per_key": elapsed / len(requests) * 1e6 if requests else 0.0
+        }
+    return report
+
+
+def print_report(title: str, requests: List[Dict[str, Any]]) -> None:
+    report = hit_rates(requests)
+    print(f"\n📊 {title} ({len(requests)} requests)")
+    print(f"   {'Strategy':<12} {'Unique':>7} {'Hits':>6} {'Hit rate':>9} {'µs/key':>8}")
+    for name, stats in report.items():
+        print(f"   {name:<12} {stats['unique']:>7} {stats['hits']:>6} {stats['hit_rate'] * 100:>8.1f}% {stats['us_per_key']:>8.1f}")
+    base = report["exact"]["hit_rate"]
+    gain = report["canonical"]["hit_rate"] - base
+    print(f"   Canonical vs exact: {gain * 100:+.1f} percentage points")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cache-key strategies by hit rate')
+    parser.add_argument('--variants', type=int, default=3,
+                        help='Near-duplicate variants generated per synthetic sample (default: 3, 0 = raw data only)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed for variant generation (default: 42)')
+    parser.add_argument('--traffic', type=str, action='append', default=[],
+                        help='Replay a JSONL file of recorded /process request bodies (repeatable)')
+
+    args = parser.parse_args()
+
+    for dataset in DATASETS:
+        requests = load_requests(os.path.join(HERE, dataset))
+        print_report(f"{dataset} (as-is)", requests)
+        if args.variants > 0:
+            print_report(f"{dataset} + {args.variants} near-duplicates/sample", with_variants(requests, args.variants, args.seed))
+
+    for path in args.traffic:
+        print_report(f"Replayed traffic: {path}", load_requests(path))
+
+
+if __name__ == "__main__":
+    main()
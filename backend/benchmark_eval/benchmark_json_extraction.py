@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+JSON Extraction Microbenchmark
+
+Times json_extraction.extract_json (single-pass, string-aware scan with
+JSONDecoder.raw_decode) against the previous brace-rescanning extractor on
+typical model outputs and on adversarial, brace-heavy inputs, and reports
+where they return different objects.
+
+Recorded model outputs can be added with --cassette (see cassettes.py).
+
+Usage:
+    python benchmark_json_extraction.py
+    python benchmark_json_extraction.py --size 20000 --repeat 5
+    python benchmark_json_extraction.py --cassette cassettes/llm_calls.jsonl.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from json_extraction import extract_json
+
+EVALUATION = {
+    "overall_score": 4,
+    "is_good": True,
+    "metrics": {"technical_accuracy": 4, "pedagogical_value": 4, "clarity_communication": 4, "contextual_relevance": 5},
+    "mode_compliance": {"follows_mode_requirements": True, "mode_specific_feedback": "Concise next step"},
+    "summary_feedback": "Clear and appropriately scoped",
+    "improvement_advice": None
+}
+
+
+def legacy_fix_gpt_json_issues(text: str) -> str:
+    """The previous HintGenerator._fix_gpt_json_issues"""
+    fixed = text
+    pattern = r'"improvement_advice":\s*"([^"]*(?:"[^"]*)*)"'
+    match = re.search(pattern, fixed, re.DOTALL)
+    if match:
+        clean_advice = match.group(1).replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
+        if len(clean_advice) > 300:
+            clean_advice = clean_advice[:300] + "..."
+        fixed = re.sub(pattern, f'"improvement_advice": "{clean_advice}"', fixed, flags=re.DOTALL)
+    pattern = r'"feedback":\s*"([^"]*(?:"[^"]*)*)"'
+    match = re.search(pattern, fixed, re.DOTALL)
+    if match:
+        clean_feedback = match.group(1).replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
+        if len(clean_feedback) > 400:
+            clean_feedback = clean_feedback[:400] + "..."
+        fixed = re.sub(pattern, f'"feedback": "{clean_feedback}"', fixed, flags=re.DOTALL)
+    if not fixed.rstrip().endswith('}'):
+        open_braces = fixed.count('{')
+        close_braces = fixed.count('}')
+        if open_braces > close_braces:
+            fixed += '}' * (open_braces - close_braces)
+    return fixed
+
+
+def legacy_extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """The previous HintGenerator.extract_json_from_response"""
+    txt = text.strip()
+    if txt.startswith("```"):
+        txt = re.sub(r"^```(?:json)?\s*|\s*```$", "", txt, flags=re.S)
+    try:
+        return json.loads(txt)
+    except json.JSONDecodeError:
+        pass
+    if '"improvement_advice"' in txt:
+        try:
+            return json.loads(legacy_fix_gpt_json_issues(txt))
+        except (json.JSONDecodeError, re.error):
+            pass
+    start = txt.find("{")
+    while start != -1:
+        depth = 0
+        for i in range(start, len(txt)):
+            c = txt[i]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        return json.loads(txt[start:i + 1])
+                    except json.JSONDecodeError:
+                        break
+        start = txt.find("{", start + 1)
+    return None
+
+
+def build_cases(size: int) -> List[Tuple[str, str]]:
+    """(name, text) pairs: typical outputs first, then adversarial inputs of about `size` characters"""
+    hint = json.dumps({"hint": "Use a hash map from each value to its index so you need only one pass"})
+    code = json.dumps({"next_code": "    seen = {}  # value -> index"})
+    evaluation = json.dumps(EVALUATION, indent=2)
+    broken_advice = evaluation.replace('"improvement_advice": null',
+                                       '"improvement_advice": "Say "why" the map helps,\nnot just "use a map""')
+    code_block = "def f(d):\n    return {k: {v: {}} for k, v in d.items()}\n"
+    return [
+        ("hint (clean)", hint),
+        ("next_code (clean)", code),
+        ("hint in ```json fence", f"```json\n{hint}\n```"),
+        ("hint after prose", f"Here is the hint you asked for:\n{hint}\nLet me know if you need more."),
+        ("evaluation (clean)", evaluation),
+        ("evaluation, unescaped advice", broken_advice),
+        ("evaluation after prose", "Sure! My evaluation follows.\n" + evaluation + "\nThanks."),
+        ("open braces, then JSON", "{" * size + hint),
+        ("brace-heavy prose, then JSON", "set {x} " * (size // 8) + hint),
+        ("code with braces, then JSON", code_block * (size // len(code_block)) + "\n" + hint),
+        ("unclosed object", '{"hint": "' + "a{" * (size // 2)),
+        ("deeply nested invalid", "{" * (size // 4) + "x" + "}" * (size // 4) + hint),
+    ]
+
+
+def cassette_cases(path: str) -> List[Tuple[str, str]]:
+    """Recorded response texts from a cassette file"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [(f"recorded {entry['provider']} #{i}", entry["response"]["text"])
+                for i, entry in enumerate(json.loads(line) for line in f if line.strip())]
+
+
+def time_call(fn: Callable[[str], Any], text: str, repeat: int, time_limit: float) -> Tuple[float, Any]:
+    """(seconds per call, result); the first call also decides how many repeats fit in time_limit"""
+    start = time.perf_counter()
+    result = fn(text)
+    first = time.perf_counter() - start
+    runs = max(1, min(repeat, int(time_limit / max(first, 1e-9))))
+    start = time.perf_counter()
+    for _ in range(runs):
+        fn(text)
+    return (time.perf_counter() - start) / runs, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the single-pass JSON extractor with the previous one')
+    parser.add_argument('--size', type=int, default=5000,
+                        help='Approximate size of adversarial inputs in characters (default: 5000)')
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='Timed calls per case, fewer for slow cases (default: 200)')
+    parser.add_argument('--time_limit', type=float, default=2.0,
+                        help='Time budget per case and extractor in seconds (default: 2.0)')
+    parser.add_argument('--cassette', type=str, default=None,
+                        help='Also time response texts recorded in this cassette file')
+
+    args = parser.parse_args()
+    cases = build_cases(args.size)
+    if args.cassette:
+        cases += cassette_cases(args.cassette)
+
+    print(f"\n🔬 JSON extraction benchmark ({len(cases)} cases, adversarial size ~{args.size} chars):")
+    print(f"   {'Case':<32} {'Chars':>7} {'Old (µs)':>11} {'New (µs)':>10} {'Speedup':>9}  Same result")
+    total_old = total_new = 0.0
+    mismatches = 0
+    for name, text in cases:
+        old_time, old_result = time_call(legacy_extract_json, text, args.repeat, args.time_limit)
+        new_time, new_result = time_call(extract_json, text, args.repeat, args.time_limit)
+        total_old += old_time
+        total_new += new_time
+        same = old_result == new_result
+        mismatches += not same
+        print(f"   {name[:32]:<32} {len(text):>7} {old_time * 1e6:>11.1f} {new_time * 1e6:>10.1f} "
+              f"{old_time / max(new_time, 1e-12):>8.1f}x  {'✅' if same else f'old {str(old_result)[:20]} / new {str(new_result)[:20]}'}")
+
+    print(f"\n📊 Total: old {total_old * 1e3:.2f}ms | new {total_new * 1e3:.2f}ms | "
+          f"speedup {total_old / max(total_new, 1e-12):.1f}x | different results: {mismatches}")
+    if mismatches:
+        print("   The old scan ignored JSON strings and tried nested objects first, so it can return an")
+        print("   object found in code or prose (e.g. `{}`) before the response's own JSON.")
+
+
+if __name__ == "__main__":
+    main()
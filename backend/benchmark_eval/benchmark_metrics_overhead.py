@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Metrics Overhead Benchmark
+
+Measures what the /metrics instrumentation (metrics.py) costs: the time of a
+single timer / counter / labels() operation, and the number of operations one
+request performs (read back from the registry), compared with the time a
+request spends in HintGenerator when the fake providers answer instantly, i.e.
+the pure Python overhead of the pipeline.
+
+Usage:
+    python benchmark_metrics_overhead.py
+    python benchmark_metrics_overhead.py --requests 2000 --use_evaluation
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from benchmark_concurrency import build_generator, PROBLEM, CODE
+from metrics import Counter, Histogram, REGISTRY, STAGE_SECONDS, ATTEMPTS, SCHEMA_FAILURES, JSON_PARSES, PROVIDER_ERRORS
+
+
+def op_costs(repeat: int) -> dict:
+    """Seconds per operation for each kind of instrumentation call"""
+    histogram = Histogram("bench_seconds", "benchmark", labelnames=("stage",))
+    counter = Counter("bench_total", "benchmark", labelnames=("outcome",))
+    stage = histogram.labels("claude_call")
+    outcome = counter.labels("accepted")
+
+    def timed_block():
+        with stage.time():
+            pass
+
+    return {
+        "timer (with ...time())": timeit.timeit(timed_block, number=repeat) / repeat,
+        "counter inc (bound child)": timeit.timeit(outcome.inc, number=repeat) / repeat,
+        "counter inc via labels()": timeit.timeit(lambda: counter.labels("accepted").inc(), number=repeat) / repeat,
+    }
+
+
+def registry_ops() -> int:
+    """Observations + increments recorded so far by the generation metrics"""
+    total = 0
+    for child in STAGE_SECONDS._children.values():
+        total += child.count
+    for metric in (ATTEMPTS, SCHEMA_FAILURES, JSON_PARSES, PROVIDER_ERRORS):
+        total += int(sum(child.value for child in metric._children.values()))
+    return total
+
+
+async def request_cost(num_requests: int, use_evaluation: bool) -> float:
+    """Seconds per agenerate_and_evaluate with zero provider latency and no cache"""
+    generator = build_generator(0.0)
+    start = time.perf_counter()
+    for i in range(num_requests):
+        await generator.agenerate_and_evaluate(f"{PROBLEM} {i}", CODE, mode="hint", use_evaluation=use_evaluation,
+                                               max_retries=1, use_cache=False)
+    return (time.perf_counter() - start) / num_requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the cost of the /metrics instrumentation')
+    parser.add_argument('--requests', type=int, default=500,
+                        help='Requests through the fake pipeline (default: 500)')
+    parser.add_argument('--repeat', type=int, default=200000,
+                        help='Calls per operation micro-benchmark (default: 200000)')
+    parser.add_argument('--use_evaluation', action='store_true',
+                        help='Include the (fake) GPT evaluation in each request')
+
+    args = parser.parse_args()
+    costs = op_costs(args.repeat)
+    print(f"\n⏱️  Instrumentation cost per operation:")
+    for name, seconds in costs.items():
+        print(f"   {name:<28} {seconds * 1e9:>7.0f} ns")
+
+    before = registry_ops()
+    per_request = asyncio.run(request_cost(args.requests, args.use_evaluation))
+    ops = (registry_ops() - before) / args.requests
+    overhead = ops * max(costs["timer (with ...time())"], costs["counter inc via labels()"])
+
+    print(f"\n📊 Per request ({args.requests} requests, zero provider latency, evaluation {'on' if args.use_evaluation else 'off'}):")
+    print(f"   Pipeline time:          {per_request * 1e6:,.1f} µs")
+    print(f"   Metric operations:      {ops:.1f}")
+    print(f"   Instrumentation (est.): {overhead * 1e6:,.2f} µs ({overhead / per_request:.2%} of pipeline time, "
+          f"less against real provider latency)")
+    print(f"   /metrics render:        {timeit.timeit(REGISTRY.render, number=100) / 100 * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
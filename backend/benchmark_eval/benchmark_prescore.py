@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Local Pre-Score Benchmark
+
+Runs the benchmark datasets through Claude, then scores every schema-valid
+response both with the local pre-scorer (prescorer.py) and with the GPT
+evaluator, regardless of the pre-score decision. Reports how often the GPT call
+would have been skipped and how often the skipped decisions agree with GPT
+(accept -> GPT score >= threshold, reject -> GPT score < threshold).
+
+Needs CLAUDE_API_KEY and OPENAI_API_KEY (real provider calls).
+
+Usage:
+    python benchmark_prescore.py
+    python benchmark_prescore.py --mode hint --num_samples 30
+    python benchmark_prescore.py --accept 4.0 --reject 2.5 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hint_generator import HintGenerator
+from prescorer import prescore, prescore_decision
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATASETS = {"hint": "synthetic_hint_data.jsonl", "code": "synthetic_code_data.jsonl"}
+
+
+def load_samples(mode: str, num_samples: Optional[int]) -> List[Dict[str, Any]]:
+    samples = []
+    for name in (["hint", "code"] if mode == "both" else [mode]):
+        with open(os.path.join(HERE, DATASETS[name]), 'r') as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        samples.extend(rows[:num_samples] if num_samples else rows)
+    return samples
+
+
+async def score_sample(generator: HintGenerator, sample: Dict[str, Any], args, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+    """Claude response, local pre-score and GPT score for one sample (None if Claude's output is unusable)"""
+    mode = "next_code" if sample.get("mode") == "code" else "hint"
+    problem = sample["problem"]
+    async with semaphore:
+        claude_result = await generator.aget_claude_response(problem["title"], problem.get("code", ""), "python", mode)
+        if not claude_result["success"]:
+            return None
+        response_json, _, _ = generator._validate_claude_result(claude_result, mode, problem.get("code", ""), "python")
+        if response_json is None:
+            return None
+        gpt_result = await generator.aget_gpt_evaluation(claude_result["response"], problem["title"], problem.get("code", ""), mode)
+    if not gpt_result["success"]:
+        return None
+
+    local = prescore(response_json, mode, problem.get("code", ""))
+    evaluation = gpt_result["evaluation"]
+    return {
+        "mode": mode,
+        "local_score": local["score"],
+        "decision": prescore_decision(local["score"], args.threshold, args.accept, args.reject),
+        "gpt_score": evaluation.get("overall_score", evaluation.get("score", 0)),
+        "gpt_tokens": sum(gpt_result.get("usage", {}).get(k, 0) for k in ("input_tokens", "output_tokens"))
+    }
+
+
+def report(rows: List[Dict[str, Any]], args) -> None:
+    decisions = Counter(r["decision"] for r in rows)
+    skipped = [r for r in rows if r["decision"] != "uncertain"]
+    agree = [r for r in skipped if (r["gpt_score"] >= args.threshold) == (r["decision"] == "accept")]
+
+    print(f"\n📊 Pre-score results ({len(rows)} evaluated responses, threshold {args.threshold}):")
+    print(f"   Bands: accept ≥ {args.accept} | reject ≤ {args.reject}")
+    print(f"   Decisions: accept {decisions['accept']} | reject {decisions['reject']} | uncertain {decisions['uncertain']}")
+    print(f"   GPT skip rate: {len(skipped) / len(rows) * 100:.1f}%")
+    if skipped:
+        print(f"   Agreement with GPT on skipped: {len(agree) / len(skipped) * 100:.1f}% ({len(agree)}/{len(skipped)})")
+    for decision in ("accept", "reject"):
+        subset = [r for r in rows if r["decision"] == decision]
+        if subset:
+            passing = len([r for r in subset if r["gpt_score"] >= args.threshold])
+            print(f"   {decision:<7} → GPT pass {passing}/{len(subset)}")
+    if skipped:
+        saved = sum(r["gpt_tokens"] for r in skipped)
+        print(f"   GPT tokens that would be saved: {saved} ({saved / len(rows):.0f} per response)")
+
+    print(f"\n   {'Local':>6} {'GPT avg':>8} {'n':>4}")
+    for score in sorted({r["local_score"] for r in rows}):
+        subset = [r["gpt_score"] for r in rows if r["local_score"] == score]
+        print(f"   {score:>6.2f} {sum(subset) / len(subset):>8.2f} {len(subset):>4}")
+
+
+async def main_async(args) -> None:
+    generator = HintGenerator()
+    samples = load_samples(args.mode, args.num_samples)
+    print(f"\n🚀 Pre-score benchmark: {len(samples)} samples (mode: {args.mode}, concurrency: {args.concurrency})")
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    rows = await asyncio.gather(*(score_sample(generator, s, args, semaphore) for s in samples))
+    rows = [r for r in rows if r is not None]
+    if not rows:
+        print("❌ No evaluated responses")
+        return
+    report(rows, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure GPT skip rate and agreement of the local pre-scorer')
+    parser.add_argument('--mode', choices=['hint', 'code', 'both'], default='both',
+                        help='Dataset to run (default: both)')
+    parser.add_argument('--num_samples', type=int, default=None,
+                        help='Samples per dataset (default: all)')
+    parser.add_argument('--threshold', type=float, default=3.0,
+                        help='Score threshold (default: 3.0)')
+    parser.add_argument('--accept', type=float, default=4.5,
+                        help='Candidate accept band lower bound (default: 4.5; PRESCORE_ACCEPT ships off)')
+    parser.add_argument('--reject', type=float, default=float(os.getenv('PRESCORE_REJECT', '2.0')),
+                        help='Reject band upper bound (default: PRESCORE_REJECT or 2.0)')
+    parser.add_argument('--concurrency', type=int, default=4,
+                        help='Samples in flight at once (default: 4)')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Progress Store Benchmark
+
+Measures progress_store.ProgressStore on a fresh SQLite database: single-event
+upserts (one transaction each) issued from many coroutines through the
+non-blocking aupsert, batched upserts through aupsert_many, the write-behind
+queue behind /api/progress (events/sec and flush latency), concurrent
+progress/stats reads while writes are running, and user/problem stats reads,
+which read maintained aggregates instead of scanning a user's history.
+
+Usage:
+    python benchmark_progress_store.py
+    python benchmark_progress_store.py --events 50000 --users 1000 --concurrency 64
+    python benchmark_progress_store.py --db /tmp/progress.db --batch_size 500
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from statistics import median
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from progress_store import ProgressStore, WriteBehindQueue
+
+
+def make_events(num_events: int, num_users: int, num_problems: int, seed: int) -> List[Dict[str, Any]]:
+    """Progress events with growing attempt/hint/time counters per (user, problem)"""
+    rng = random.Random(seed)
+    counters: Dict[tuple, Dict[str, int]] = {}
+    start = datetime(2025, 1, 1)
+    events = []
+    for i in range(num_events):
+        user, problem = f"user-{rng.randrange(num_users)}", f"problem-{rng.randrange(num_problems)}"
+        c = counters.setdefault((user, problem), {"attempts": 0, "hints_used": 0, "time_spent": 0})
+        c["attempts"] += 1
+        c["hints_used"] += rng.random() < 0.3
+        c["time_spent"] += rng.randint(10, 300)
+        completed = rng.random() < 0.2
+        events.append({
+            "user_id": user,
+            "problem_id": problem,
+            "problem_title": problem.replace("-", " ").title(),
+            "problem_url": f"https://leetcode.com/problems/{problem}/",
+            "completed": completed,
+            **c,
+            "last_attempted": start + timedelta(seconds=i),
+            "completed_at": start + timedelta(seconds=i) if completed else None
+        })
+    return events
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def single_writes(store: ProgressStore, events: List[Dict[str, Any]], concurrency: int) -> Dict[str, float]:
+    """One aupsert (one transaction) per event, `concurrency` coroutines writing at once"""
+    latencies: List[float] = []
+    pending = iter(events)
+
+    async def worker():
+        for event in pending:
+            start = time.perf_counter()
+            await store.aupsert(event)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "rate": len(events) / elapsed, "p50": median(latencies), "p99": percentile(latencies, 0.99)}
+
+
+async def batched_writes(store: ProgressStore, events: List[Dict[str, Any]], batch_size: int) -> Dict[str, float]:
+    """aupsert_many in batches of batch_size"""
+    latencies: List[float] = []
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        t0 = time.perf_counter()
+        await store.aupsert_many(events[i:i + batch_size])
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    return {"elapsed": elapsed, "rate": len(events) / elapsed, "p50": median(latencies), "p99": percentile(latencies, 0.99)}
+
+
+async def write_behind(store: ProgressStore, events: List[Dict[str, Any]], concurrency: int, args) -> Dict[str, Any]:
+    """One queue.add per event from `concurrency` coroutines, then a final flush on close"""
+    queue = WriteBehindQueue(store, flush_size=args.flush_size, flush_interval=args.flush_interval_ms / 1000)
+    pending = iter(events)
+
+    async def worker():
+        for event in pending:
+            await queue.add([event])
+            await asyncio.sleep(0)  # Let the flush task run between events, as between requests
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    accepted = time.perf_counter() - start
+    await queue.close()
+    elapsed = time.perf_counter() - start
+    return {"accept_rate": len(events) / accepted, "durable_rate": len(events) / elapsed, **queue.stats()}
+
+
+async def reads_during_writes(store: ProgressStore, events: List[Dict[str, Any]], num_users: int, concurrency: int, duration: float) -> Dict[str, float]:
+    """Progress + stats reads from `concurrency` coroutines while one coroutine keeps writing"""
+    stop = time.perf_counter() + duration
+    latencies: List[float] = []
+    writes = 0
+
+    async def writer():
+        nonlocal writes
+        for event in events:
+            if time.perf_counter() > stop:
+                return
+            await store.aupsert(event)
+            writes += 1
+
+    async def reader(seed: int):
+        rng = random.Random(seed)
+        while time.perf_counter() < stop:
+            user = f"user-{rng.randrange(num_users)}"
+            t0 = time.perf_counter()
+            await store.aget_progress(user)
+            await store.aget_stats(user)
+            latencies.append(time.perf_counter() - t0)
+
+    await asyncio.gather(writer(), *(reader(i) for i in range(concurrency)))
+    return {"reads": len(latencies) / duration, "writes": writes / duration,
+            "p50": median(latencies) if latencies else 0.0, "p99": percentile(latencies, 0.99) if latencies else 0.0}
+
+
+def stats_reads(store: ProgressStore, num_users: int, num_problems: int, reads: int, seed: int) -> Dict[str, float]:
+    """Sequential get_stats / get_problem_stats latency (no concurrent writes)"""
+    rng = random.Random(seed)
+    user_latencies: List[float] = []
+    problem_latencies: List[float] = []
+    for _ in range(reads):
+        t0 = time.perf_counter()
+        store.get_stats(f"user-{rng.randrange(num_users)}")
+        t1 = time.perf_counter()
+        store.get_problem_stats(f"problem-{rng.randrange(num_problems)}")
+        user_latencies.append(t1 - t0)
+        problem_latencies.append(time.perf_counter() - t1)
+    return {"user_p50": median(user_latencies), "user_p99": percentile(user_latencies, 0.99),
+            "problem_p50": median(problem_latencies), "problem_p99": percentile(problem_latencies, 0.99)}
+
+
+async def main_async(args) -> None:
+    events = make_events(args.events, args.users, args.problems, args.seed)
+    db_dir = tempfile.mkdtemp(prefix="progress-bench-") if args.db is None else None
+    path = args.db or os.path.join(db_dir, "progress.db")
+    print(f"\n🚀 Progress store benchmark:")
+    print(f"   Events: {args.events} | Users: {args.users} | Problems: {args.problems} | DB: {path}")
+
+    store = ProgressStore(path, pool_size=args.pool_size)
+    try:
+        single = await single_writes(store, events, args.concurrency)
+        print(f"\n✍️  Single-event upserts ({args.concurrency} concurrent writers, one transaction each):")
+        print(f"   {single['rate']:,.0f} events/s | p50 {single['p50'] * 1000:.2f}ms | p99 {single['p99'] * 1000:.2f}ms")
+
+        batched = await batched_writes(store, events, args.batch_size)
+        print(f"\n📦 Batched upserts ({args.batch_size} events per transaction):")
+        print(f"   {batched['rate']:,.0f} events/s | p50 {batched['p50'] * 1000:.2f}ms | p99 {batched['p99'] * 1000:.2f}ms per batch")
+
+        queued = await write_behind(store, events, args.concurrency, args)
+        print(f"\n🚚 Write-behind queue (flush at {args.flush_size} rows or {args.flush_interval_ms:.0f}ms):")
+        print(f"   {queued['accept_rate']:,.0f} events/s accepted | {queued['durable_rate']:,.0f} events/s written incl. final flush")
+        print(f"   {queued['flushes']} flushes, {queued['avg_rows_per_flush']:.0f} rows each | {queued['coalesced']} events coalesced | "
+              f"flush latency p50 {queued['flush_latency_ms']['p50']:.2f}ms, p99 {queued['flush_latency_ms']['p99']:.2f}ms")
+
+        mixed = await reads_during_writes(store, events, args.users, args.concurrency, args.read_seconds)
+        print(f"\n📖 Reads during writes ({args.concurrency} readers, progress + stats per read):")
+        print(f"   {mixed['reads']:,.0f} reads/s alongside {mixed['writes']:,.0f} writes/s | "
+              f"p50 {mixed['p50'] * 1000:.2f}ms | p99 {mixed['p99'] * 1000:.2f}ms")
+
+        stats = stats_reads(store, args.users, args.problems, args.stats_reads, args.seed)
+        print(f"\n📊 Stats reads from aggregates (~{args.events // args.users} events per user, "
+              f"~{args.events // args.problems} per problem):")
+        print(f"   user stats p50 {stats['user_p50'] * 1000:.3f}ms, p99 {stats['user_p99'] * 1000:.3f}ms | "
+              f"problem stats p50 {stats['problem_p50'] * 1000:.3f}ms, p99 {stats['problem_p99'] * 1000:.3f}ms")
+    finally:
+        store.close()
+        if db_dir:
+            for name in os.listdir(db_dir):
+                os.remove(os.path.join(db_dir, name))
+            os.rmdir(db_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure progress store write and read throughput')
+    parser.add_argument('--events', type=int, default=20000,
+                        help='Progress events to write (default: 20000)')
+    parser.add_argument('--users', type=int, default=500,
+                        help='Distinct users (default: 500)')
+    parser.add_argument('--problems', type=int, default=200,
+                        help='Distinct problems (default: 200)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='Concurrent writer/reader coroutines (default: 32)')
+    parser.add_argument('--batch_size', type=int, default=200,
+                        help='Events per transaction for batched upserts (default: 200)')
+    parser.add_argument('--flush_size', type=int, default=500,
+                        help='Write-behind flush size in rows (default: 500)')
+    parser.add_argument('--flush_interval_ms', type=float, default=200,
+                        help='Write-behind flush interval in ms (default: 200)')
+    parser.add_argument('--pool_size', type=int, default=4,
+                        help='Reader connections (default: 4)')
+    parser.add_argument('--read_seconds', type=float, default=3.0,
+                        help='Duration of the mixed read/write phase (default: 3)')
+    parser.add_argument('--stats_reads', type=int, default=2000,
+                        help='User + problem stats reads in the stats phase (default: 2000)')
+    parser.add_argument('--db', type=str, default=None,
+                        help='Database file (default: a temporary file, removed afterwards)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed (default: 0)')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Shared Cache Benchmark
+
+Replays the same request stream split across N worker processes, the way
+uvicorn --workers N spreads traffic, once with a per-process in-memory cache
+and once with the SQLite cache shared by all workers (RESPONSE_CACHE_BACKEND=sqlite).
+Keys follow a Zipf-like popularity curve, as repeated hint requests for popular
+problems do. Reports the overall hit rate per worker count and the cost of a
+SQLite get/set.
+
+Usage:
+    python benchmark_shared_cache.py
+    python benchmark_shared_cache.py --workers 1 2 4 8 --requests 20000 --keys 5000
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from response_cache import InMemoryResponseCache, SQLiteResponseCache
+
+# Roughly the size of a cached /process result
+VALUE = {"success": True, "final_response": {"hint": "x" * 300}, "final_score": 4, "usage": {}}
+
+
+def request_stream(requests: int, keys: int, skew: float, seed: int) -> List[str]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(keys)]
+    return [f"key-{k}" for k in rng.choices(range(keys), weights=weights, k=requests)]
+
+
+def run_worker(args: Tuple[str, str, List[str]]) -> Tuple[int, int, float]:
+    """(hits, misses, seconds spent in the cache) for one worker's share of the stream"""
+    backend, path, stream = args
+    cache = SQLiteResponseCache(path) if backend == "sqlite" else InMemoryResponseCache(max_size=len(stream) + 1)
+    elapsed = 0.0
+    for key in stream:
+        start = time.perf_counter()
+        if cache.get(key) is None:
+            cache.set(key, VALUE)
+        elapsed += time.perf_counter() - start
+    return cache.hits, cache.misses, elapsed
+
+
+def hit_rate(backend: str, stream: List[str], workers: int) -> Tuple[float, float]:
+    """(overall hit rate, mean microseconds per lookup) with the stream round-robined over workers"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "cache.db")
+        if backend == "sqlite":
+            SQLiteResponseCache(path)  # Create the schema before the workers race for it
+        shares = [(backend, path, stream[i::workers]) for i in range(workers)]
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(run_worker, shares)
+    hits = sum(r[0] for r in results)
+    lookups = sum(r[0] + r[1] for r in results)
+    return hits / lookups, sum(r[2] for r in results) / lookups * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-process and shared cache hit rates across workers')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8],
+                        help='Worker process counts to compare (default: 1 2 4 8)')
+    parser.add_argument('--requests', type=int, default=10000,
+                        help='Requests in the replayed stream (default: 10000)')
+    parser.add_argument('--keys', type=int, default=3000,
+                        help='Distinct requests (default: 3000)')
+    parser.add_argument('--skew', type=float, default=1.0,
+                        help='Zipf exponent of key popularity (default: 1.0)')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the request stream (default: 0)')
+
+    args = parser.parse_args()
+    stream = request_stream(args.requests, args.keys, args.skew, args.seed)
+    print(f"\n🗃️  {args.requests} requests over {args.keys} keys (Zipf {args.skew:g}):")
+    print(f"   {'Workers':>7} {'Per-process hit':>16} {'Shared hit':>11} {'Memory µs/op':>13} {'SQLite µs/op':>13}")
+    for workers in args.workers:
+        memory_rate, memory_us = hit_rate("memory", stream, workers)
+        shared_rate, shared_us = hit_rate("sqlite", stream, workers)
+        print(f"   {workers:>7} {memory_rate:>16.1%} {shared_rate:>11.1%} {memory_us:>13.1f} {shared_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+
+Measures the server's cold start in fresh interpreters: wall time of
+`python -c "import server"`, the import time of server and of its heaviest
+packages (from `python -X importtime`), whether the provider SDKs were imported
+at startup (they should load lazily), and with --serve the time until uvicorn
+answers /health and /ready. --history appends each run to a JSONL file and
+compares it with the previous entry, so startup time can be tracked across
+releases.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --runs 10 --serve --history startup_history.jsonl
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime, timezone
+from statistics import median
+from typing import Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROVIDER_SDKS = ("anthropic", "openai")
+
+
+def server_env(db_dir: str) -> Dict[str, str]:
+    """Environment for a throwaway server: dummy key, temporary database, tracing off"""
+    env = dict(os.environ)
+    env.setdefault("CLAUDE_API_KEY", "sk-ant-benchmark")
+    env["PROGRESS_DB_PATH"] = os.path.join(db_dir, "progress.db")
+    env["TRACE_EXPORTER"] = "off"
+    env["LOG_LEVEL"] = "WARNING"
+    return env
+
+
+def parse_importtime(stderr: str) -> Dict[str, int]:
+    """Cumulative microseconds per module from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line.split(":", 1)[1].split("|")
+            modules[name.strip()] = int(cumulative)
+        except ValueError:
+            continue  # Header line
+    return modules
+
+
+def import_run(env: Dict[str, str]) -> Tuple[float, Dict[str, int]]:
+    """(wall seconds, importtime per module) for one fresh interpreter importing server"""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import server failed:\n{result.stderr[-2000:]}")
+    return elapsed, parse_importtime(result.stderr)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _poll(url: str, deadline: float) -> Optional[float]:
+    """Seconds (perf_counter) at which url first answered 200, or None by deadline"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except Exception:
+            pass
+        time.sleep(0.02)
+    return None
+
+
+def serve_run(env: Dict[str, str], timeout: float) -> Tuple[Optional[float], Optional[float]]:
+    """Seconds from launching uvicorn until /health and then /ready answer 200"""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "server:app", "--port", str(port)], cwd=BACKEND_DIR,
+                               env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        health = _poll(f"http://127.0.0.1:{port}/health", deadline)
+        ready = _poll(f"http://127.0.0.1:{port}/ready", deadline) if health else None
+    finally:
+        process.terminate()
+        process.wait()
+    return (health - start if health else None), (ready - start if ready else None)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True,
+                              text=True).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure server cold-start time')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='Fresh interpreters per measurement (default: 5)')
+    parser.add_argument('--top', type=int, default=10,
+                        help='Heaviest packages to list (default: 10)')
+    parser.add_argument('--serve', action='store_true',
+                        help='Also start uvicorn and time /health and /ready')
+    parser.add_argument('--timeout', type=float, default=60.0,
+                        help='Seconds to wait for /health and /ready with --serve (default: 60)')
+    parser.add_argument('--history', type=str, default=None,
+                        help='JSONL file to append this run to and compare against')
+
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as db_dir:
+        env = server_env(db_dir)
+        runs = [import_run(env) for _ in range(args.runs)]
+        serves = [serve_run(env, args.timeout) for _ in range(args.runs)] if args.serve else []
+
+    wall = median(elapsed for elapsed, _ in runs)
+    imports = runs[-1][1]
+    server_import = median(modules.get("server", 0) for _, modules in runs) / 1e6
+    sdks = [sdk for sdk in PROVIDER_SDKS if sdk in imports]
+
+    print(f"\n🚀 Cold start ({args.runs} runs, medians):")
+    print(f"   python -c 'import server': {wall * 1000:8.1f} ms wall")
+    print(f"   import server:             {server_import * 1000:8.1f} ms")
+    print(f"   Provider SDKs at startup:  {', '.join(sdks) if sdks else 'none (lazy)'}")
+
+    packages = sorted(((name, us) for name, us in imports.items() if "." not in name and name != "server"),
+                      key=lambda item: item[1], reverse=True)[:args.top]
+    print(f"\n📦 Heaviest packages:")
+    for name, us in packages:
+        print(f"   {name:<24} {us / 1000:8.1f} ms")
+
+    record = {"date": datetime.now(timezone.utc).isoformat(timespec="seconds"), "revision": git_revision(),
+              "wall_ms": round(wall * 1000, 1), "import_ms": round(server_import * 1000, 1), "provider_sdks": sdks}
+    if serves:
+        health = [h for h, _ in serves if h is not None]
+        ready = [r for _, r in serves if r is not None]
+        record["health_ms"] = round(median(health) * 1000, 1) if health else None
+        record["ready_ms"] = round(median(ready) * 1000, 1) if ready else None
+        print(f"\n🩺 uvicorn: /health after {record['health_ms']} ms, /ready after {record['ready_ms']} ms")
+
+    if args.history:
+        previous = None
+        if os.path.exists(args.history):
+            with open(args.history, encoding="utf-8") as f:
+                lines = [line for line in f if line.strip()]
+            previous = json.loads(lines[-1]) if lines else None
+        with open(args.history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+        if previous:
+            print(f"\n📈 vs {previous['revision']} ({previous['date']}):")
+            for key in ("wall_ms", "import_ms", "health_ms", "ready_ms"):
+                if record.get(key) is not None and previous.get(key) is not None:
+                    print(f"   {key:<10} {previous[key]:>8.1f} -> {record[key]:>8.1f} ms ({record[key] - previous[key]:+.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Time-to-First-Token Benchmark for streamed generation
+
+Compares when the user first sees text from HintGenerator.astream_generate_and_evaluate
+(the pipeline behind /process/stream) with when the buffered agenerate_and_evaluate
+(behind /process) returns, using simulated providers that emit the first chunk after
+--first_token seconds and the rest over the remaining --latency.
+
+Usage:
+    python benchmark_streaming.py
+    python benchmark_streaming.py --latency 1.5 --first_token 0.3 --requests 20
+    python benchmark_streaming.py --use_evaluation
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from statistics import mean, median
+from typing import Dict, List
+
+from benchmark_concurrency import build_generator, PROBLEM, CODE
+from fake_providers import FakeAsyncAnthropic
+
+
+async def measure_streaming(generator, use_evaluation: bool) -> Dict[str, float]:
+    """Time to first token and to the final result for one streamed request"""
+    start = time.perf_counter()
+    first_token = None
+    async for event, _ in generator.astream_generate_and_evaluate(PROBLEM, CODE, mode="hint", use_evaluation=use_evaluation, use_cache=False):
+        if event == "token" and first_token is None:
+            first_token = time.perf_counter() - start
+    return {"ttft": first_token, "total": time.perf_counter() - start}
+
+
+async def measure_buffered(generator, use_evaluation: bool) -> Dict[str, float]:
+    """For the buffered pipeline the first visible text arrives with the result"""
+    start = time.perf_counter()
+    await generator.agenerate_and_evaluate(PROBLEM, CODE, mode="hint", use_evaluation=use_evaluation, use_cache=False)
+    total = time.perf_counter() - start
+    return {"ttft": total, "total": total}
+
+
+def summarize(label: str, rows: List[Dict[str, float]]) -> None:
+    ttft = [r["ttft"] for r in rows]
+    total = [r["total"] for r in rows]
+    print(f"   {label:<10} TTFT avg {mean(ttft):.3f}s | median {median(ttft):.3f}s   Total avg {mean(total):.3f}s")
+
+
+async def main_async(args) -> None:
+    generator = build_generator(args.latency)
+    generator.async_claude_client = FakeAsyncAnthropic(args.latency, first_token_latency=args.first_token)
+
+    print(f"\n🚀 Streaming benchmark:")
+    print(f"   Simulated Claude latency: {args.latency:.2f}s (first chunk after {args.first_token:.2f}s)")
+    print(f"   Evaluation: {'Enabled' if args.use_evaluation else 'Disabled'}")
+
+    with contextlib.redirect_stdout(io.StringIO()):  # Silence per-call pipeline logging
+        streamed = [await measure_streaming(generator, args.use_evaluation) for _ in range(args.requests)]
+        buffered = [await measure_buffered(generator, args.use_evaluation) for _ in range(args.requests)]
+
+    print(f"\n⏱️  Results over {args.requests} requests:")
+    summarize("/process", buffered)
+    summarize("/stream", streamed)
+    reduction = 1 - mean(r["ttft"] for r in streamed) / mean(r["ttft"] for r in buffered)
+    print(f"   Time-to-first-token reduction: {reduction * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare time-to-first-token of streamed vs buffered generation')
+    parser.add_argument('--latency', type=float, default=1.2,
+                        help='Simulated total Claude latency in seconds (default: 1.2)')
+    parser.add_argument('--first_token', type=float, default=0.25,
+                        help='Simulated Claude time to first chunk in seconds (default: 0.25)')
+    parser.add_argument('--requests', type=int, default=10,
+                        help='Requests per pipeline (default: 10)')
+    parser.add_argument('--use_evaluation', action='store_true',
+                        help='Include the simulated GPT evaluation call')
+
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
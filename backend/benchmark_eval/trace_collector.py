@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+OTLP Trace Collector Stand-in
+
+Accepts OTLP/HTTP JSON exports (POST /v1/traces, what tracing.OTLPSpanExporter
+sends) and appends every span to a JSONL file in the same format as
+TRACE_EXPORTER=file, so analyze_traces.py works with either.
+
+Usage:
+    python trace_collector.py --port 4318 --output traces.jsonl
+    TRACE_EXPORTER=otlp TRACE_OTLP_ENDPOINT=http://localhost:4318/v1/traces uvicorn server:app --port 8001
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator
+
+
+def _attribute_value(value: Dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("doubleValue", "boolValue", "stringValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+def spans_from_otlp(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Span dicts (tracing.Span.to_dict format) from an OTLP ExportTraceServiceRequest"""
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            for span in scope_spans.get("spans", []):
+                start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                yield {
+                    "trace_id": span["traceId"],
+                    "span_id": span["spanId"],
+                    "parent_id": span.get("parentSpanId") or None,
+                    "name": span["name"],
+                    "start": start / 1e9,
+                    "duration_ms": round((end - start) / 1e6, 3),
+                    "status": "error" if span.get("status", {}).get("code") == 2 else "ok",
+                    "attributes": {a["key"]: _attribute_value(a["value"]) for a in span.get("attributes", [])}
+                }
+
+
+def make_handler(output_path: str):
+    lock = threading.Lock()
+    received = {"spans": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/traces":
+                self.send_error(404)
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                spans = list(spans_from_otlp(payload))
+            except (ValueError, KeyError) as e:
+                self.send_error(400, str(e))
+                return
+            with lock, open(output_path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(span) + "\n" for span in spans))
+                received["spans"] += len(spans)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Receive OTLP/HTTP JSON spans and append them to a JSONL file')
+    parser.add_argument('--port', type=int, default=4318,
+                        help='Port to listen on (default: 4318, the OTLP/HTTP port)')
+    parser.add_argument('--output', type=str, default='traces.jsonl',
+                        help='JSONL file to append spans to (default: traces.jsonl)')
+
+    args = parser.parse_args()
+    handler, received = make_handler(args.output)
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), handler)
+    print(f"📡 Collecting OTLP spans on :{args.port}/v1/traces -> {args.output}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n✅ Received {received['spans']} spans")
+
+
+if __name__ == "__main__":
+    main()
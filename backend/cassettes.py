@@ -0,0 +1,299 @@
+"""
+Record/replay cassettes for Claude and GPT calls
+
+A cassette wraps the provider clients HintGenerator uses. In record mode every
+successful messages.create / messages.stream / chat.completions.create call is
+forwarded and its response text, usage and timing appended to a JSONL file
+(gzip-compressed when the path ends in .gz), keyed by a hash of the request
+arguments. In replay mode the same requests are answered from the file without
+touching the network, optionally after the originally recorded latency.
+
+Modes (LLM_CASSETTE_MODE): off, record, replay (a miss raises CassetteMissError)
+and auto (replay hits, record misses). The file accumulates: a record session
+appends after the recordings already in it.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from fake_providers import claude_message, gpt_completion
+from structured_logging import get_logger, log_event
+
+logger = get_logger("cassettes")
+
+CASSETTE_MODES = ("off", "record", "replay", "auto")
+DEFAULT_CASSETTE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_eval", "cassettes", "llm_calls.jsonl.gz")
+
+
+class CassetteMissError(LookupError):
+    """A replayed request has no recording"""
+
+
+def request_key(provider: str, kwargs: Dict[str, Any]) -> str:
+    """Stable hash of a provider call's arguments"""
+    payload = json.dumps([provider, kwargs], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _serialize(provider: str, response: Any) -> Dict[str, Any]:
+    """Response text and usage of an SDK response"""
+    usage = getattr(response, "usage", None)
+    if provider == "claude":
+        text = "".join(getattr(block, "text", "") for block in response.content)
+        fields = ("input_tokens", "output_tokens", "cache_read_input_tokens", "cache_creation_input_tokens")
+        return {"text": text, "usage": {f: getattr(usage, f, 0) or 0 for f in fields}}
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "text": response.choices[0].message.content,
+        "usage": {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+        }
+    }
+
+
+def _deserialize(provider: str, recorded: Dict[str, Any]) -> SimpleNamespace:
+    """SDK-shaped response rebuilt from a recording"""
+    if provider == "claude":
+        return claude_message(recorded["text"], **recorded["usage"])
+    return gpt_completion(recorded["text"], **recorded["usage"])
+
+
+class Cassette:
+    """On-disk store of recorded provider calls; identical requests replay their recordings in order"""
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH, mode: str = "replay", simulate_latency: bool = False):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"LLM_CASSETTE_MODE must be one of {', '.join(CASSETTE_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._cursor: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._recorded = 0
+        # Recording appends to an existing cassette, so its earlier recordings are loaded in every mode:
+        # the in-memory order of repeated requests then matches the file a later replay reads
+        self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        skipped = 0
+        try:
+            with self._open("r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                        self._entries.setdefault(entry["key"], []).append(entry)
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        skipped += 1  # A line cut off mid-write (plain .jsonl) or not a recording
+        except (EOFError, gzip.BadGzipFile) as e:
+            # A recording interrupted mid-write: keep the complete lines read so far
+            log_event(logger, logging.WARNING, "cassette_truncated", path=self.path, error=str(e))
+        if skipped:
+            log_event(logger, logging.WARNING, "cassette_lines_skipped", path=self.path, skipped=skipped)
+        log_event(logger, logging.INFO, "cassette_loaded", path=self.path, recordings=sum(map(len, self._entries.values())))
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """Next recording for key (cycling through repeats), or None"""
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self._misses += 1
+                return None
+            index = self._cursor.get(key, 0)
+            self._cursor[key] = index + 1
+            self._hits += 1
+            return entries[index % len(entries)]
+
+    def record(self, key: str, provider: str, response: Any, latency: float, first_token: Optional[float] = None) -> None:
+        """Append one successful call to the cassette file"""
+        entry = {
+            "key": key,
+            "provider": provider,
+            "latency": round(latency, 4),
+            "response": _serialize(provider, response),
+            "recorded_at": round(time.time(), 3)
+        }
+        if first_token is not None:
+            entry["first_token"] = round(first_token, 4)
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # One small append per call (a gzip member each), so an interrupted run keeps what it recorded
+            with self._open("a") as f:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            self._entries.setdefault(key, []).append(entry)
+            self._recorded += 1
+
+    async def arecord(self, key: str, provider: str, response: Any, latency: float, first_token: Optional[float] = None) -> None:
+        """Async variant of record; the gzip append and flush run in a worker thread, off the event loop"""
+        await asyncio.to_thread(self.record, key, provider, response, latency, first_token)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "path": self.path,
+                "recordings": sum(map(len, self._entries.values())),
+                "hits": self._hits,
+                "misses": self._misses,
+                "recorded": self._recorded
+            }
+
+
+class _RecordingStream:
+    """Wraps an SDK message stream, recording the final message and time to first chunk (on_done is awaited)"""
+
+    def __init__(self, manager: Any, on_done):
+        self._manager = manager
+        self._on_done = on_done
+
+    async def __aenter__(self):
+        self._start = time.perf_counter()
+        self._first_token = None
+        self._stream = await self._manager.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._manager.__aexit__(*exc)
+
+    @property
+    async def text_stream(self):
+        async for text in self._stream.text_stream:
+            if self._first_token is None:
+                self._first_token = time.perf_counter() - self._start
+            yield text
+
+    async def get_final_message(self):
+        message = await self._stream.get_final_message()
+        await self._on_done(message, time.perf_counter() - self._start, self._first_token)
+        return message
+
+
+class _ReplayStream:
+    """Message stream served from a recording, in 4-character chunks"""
+
+    def __init__(self, entry: Dict[str, Any], simulate_latency: bool, chunk_size: int = 4):
+        self._message = _deserialize("claude", entry["response"])
+        self._text = entry["response"]["text"]
+        self._chunk_size = chunk_size
+        latency = entry["latency"] if simulate_latency else 0.0
+        self._first_token = min(entry.get("first_token", latency), latency)
+        chunks = max(1, -(-len(self._text) // chunk_size) - 1)
+        self._chunk_latency = max(0.0, latency - self._first_token) / chunks
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        await asyncio.sleep(self._first_token)
+        for i in range(0, len(self._text), self._chunk_size):
+            if i and self._chunk_latency:
+                await asyncio.sleep(self._chunk_latency)
+            yield self._text[i:i + self._chunk_size]
+
+    async def get_final_message(self):
+        return self._message
+
+
+class CassetteClient:
+    """
+    Drop-in wrapper for a Claude ("claude") or GPT ("gpt") client, sync or async
+
+    inner may be None in replay mode, where every call must hit the cassette.
+    """
+
+    def __init__(self, inner: Any, cassette: Cassette, provider: str, is_async: bool):
+        self.inner = inner
+        self.cassette = cassette
+        self.provider = provider
+        create = self._acreate if is_async else self._create
+        if provider == "claude":
+            self.messages = SimpleNamespace(create=create, stream=self._stream)
+        else:
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    def _inner_create(self):
+        if self.inner is None:
+            raise CassetteMissError(f"No recorded {self.provider} response and no live client (LLM_CASSETTE_MODE=replay)")
+        return self.inner.messages.create if self.provider == "claude" else self.inner.chat.completions.create
+
+    def _replayed(self, key: str) -> Optional[Dict[str, Any]]:
+        """Recording for key in replay/auto mode; raises on a miss in replay mode"""
+        if self.cassette.mode == "record":
+            return None
+        entry = self.cassette.lookup(key)
+        if entry is None and self.cassette.mode == "replay":
+            raise CassetteMissError(f"No recorded {self.provider} response for request {key[:12]} in {self.cassette.path}")
+        return entry
+
+    def _create(self, **kwargs):
+        key = request_key(self.provider, kwargs)
+        entry = self._replayed(key)
+        if entry is not None:
+            if self.cassette.simulate_latency:
+                time.sleep(entry["latency"])
+            return _deserialize(self.provider, entry["response"])
+        start = time.perf_counter()
+        response = self._inner_create()(**kwargs)
+        self.cassette.record(key, self.provider, response, time.perf_counter() - start)
+        return response
+
+    async def _acreate(self, **kwargs):
+        key = request_key(self.provider, kwargs)
+        entry = self._replayed(key)
+        if entry is not None:
+            if self.cassette.simulate_latency:
+                await asyncio.sleep(entry["latency"])
+            return _deserialize(self.provider, entry["response"])
+        start = time.perf_counter()
+        response = await self._inner_create()(**kwargs)
+        await self.cassette.arecord(key, self.provider, response, time.perf_counter() - start)
+        return response
+
+    def _stream(self, **kwargs):
+        key = request_key(self.provider, kwargs)
+        entry = self._replayed(key)
+        if entry is not None:
+            return _ReplayStream(entry, self.cassette.simulate_latency)
+        if self.inner is None:
+            raise CassetteMissError("No recorded claude response and no live client (LLM_CASSETTE_MODE=replay)")
+        return _RecordingStream(
+            self.inner.messages.stream(**kwargs),
+            lambda message, latency, first_token: self.cassette.arecord(key, "claude", message, latency, first_token)
+        )
+
+
+def cassette_from_env() -> Optional[Cassette]:
+    """Cassette configured by LLM_CASSETTE_MODE / _PATH / _LATENCY, or None when off"""
+    mode = os.getenv('LLM_CASSETTE_MODE', 'off').strip().lower()
+    if mode == "off":
+        return None
+    return Cassette(
+        path=os.getenv('LLM_CASSETTE_PATH') or DEFAULT_CASSETTE_PATH,
+        mode=mode,
+        simulate_latency=os.getenv('LLM_CASSETTE_LATENCY', 'false').lower() == 'true'
+    )
@@ -0,0 +1,332 @@
+import ast
+import io
+import re
+import textwrap
+import time
+import tokenize
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+
+_EMPTY_BLOCK = re.compile(r"expected an indented block after .* on line (\d+)")
+
+# Whole-run parses tried per comment block; each is linear in the block, so this keeps detection linear
+_MAX_RUN_PARSES = 8
+_CONTINUED = ("(", "[", "{", ",", "\\")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return (len(text or "") + 3) // 4
+
+
+def parse_lenient(code: str, max_fixes: int = 10) -> Optional[ast.Module]:
+    """
+    Parse code that may contain unfinished blocks (e.g. `while l <= r:` with no body)
+
+    Each empty block gets an inline `pass` on its header line, so line numbers of
+    the parsed tree still match the original code.
+    """
+    lines = code.split("\n")
+    for _ in range(max_fixes + 1):
+        try:
+            return ast.parse("\n".join(lines))
+        except (SyntaxError, ValueError) as e:
+            match = _EMPTY_BLOCK.search(getattr(e, "msg", "") or "")
+            if match is None:
+                return None
+            header = int(match.group(1)) - 1
+            if not 0 <= header < len(lines) or not lines[header].rstrip().endswith(":"):
+                return None
+            lines[header] = lines[header].rstrip() + " pass"
+    return None
+
+
+def _is_code_like(text: str) -> bool:
+    """True if comment text parses as Python statements rather than prose"""
+    text = textwrap.dedent(text).strip()
+    if not text or text.lower().startswith(("todo", "fixme", "note", "noqa", "type:")):
+        return False
+    tree = parse_lenient(text, max_fixes=3)
+    if tree is None or not tree.body:
+        return False
+    # A bare word or literal ("# done", "# 42") is prose, not code
+    return not all(isinstance(node, ast.Expr) and isinstance(node.value, (ast.Name, ast.Constant)) for node in tree.body)
+
+
+def _comment_lines(code: str, lines: List[str]) -> List[int]:
+    """Indexes of lines holding only a comment (not inside strings)"""
+    rows = []
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type == tokenize.COMMENT and not tok.line[:tok.start[1]].strip():
+                rows.append(tok.start[0] - 1)
+        return rows
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Incomplete code: fall back to a plain prefix check
+        return [i for i, line in enumerate(lines) if line.lstrip().startswith("#")]
+
+
+def _commented_out_code(code: str, lines: List[str]) -> Set[int]:
+    """Lines of commented-out code, checked as contiguous comment blocks and line by line"""
+    dead: Set[int] = set()
+    rows = _comment_lines(code, lines)
+
+    blocks: List[List[int]] = []
+    for row in rows:
+        if blocks and blocks[-1][-1] == row - 1:
+            blocks[-1].append(row)
+        else:
+            blocks.append([row])
+
+    for block in blocks:
+        bodies = [lines[i].lstrip()[1:] for i in block]
+        # The longest trailing run that parses is code; lines before it (e.g. "# Old attempt:") stay.
+        # A run can only start on a line that is code on its own or opens a continued statement, and
+        # only the first few such starts are parsed as a whole, so prose blocks cost one small parse per line
+        starts = [k for k in range(len(block))
+                  if bodies[k].rstrip().endswith(_CONTINUED) or _is_code_like(bodies[k])]
+        for k in starts[:_MAX_RUN_PARSES]:
+            if _is_code_like("\n".join(bodies[k:])):
+                dead.update(block[k:])
+                break
+    return dead
+
+
+def _span(node: ast.AST) -> Tuple[int, int]:
+    """0-based (first, last) line of a statement, including decorators"""
+    first = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+    return first - 1, node.end_lineno - 1
+
+
+_DRIVER_CALLS = {"print", "main", "unittest.main", "pytest.main", "doctest.testmod"}
+
+
+def _is_driver_call(node: ast.Expr) -> bool:
+    """print(...), main(), unittest.main() or a test_*() call used as a statement"""
+    if not isinstance(node.value, ast.Call):
+        return False
+    name = ast.unparse(node.value.func)
+    return name in _DRIVER_CALLS or name.split(".")[-1].startswith("test")
+
+
+def _is_test_scaffolding(node: ast.stmt) -> bool:
+    """Test classes/functions, __main__ blocks, and asserts and driver calls (for top-level statements)"""
+    if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        return node.name.startswith("test")
+    if isinstance(node, ast.ClassDef):
+        bases = {ast.unparse(base) for base in node.bases}
+        return node.name.startswith("Test") or bool(bases & {"unittest.TestCase", "TestCase"})
+    if isinstance(node, ast.If):
+        return "__name__" in ast.unparse(node.test)
+    if isinstance(node, ast.Assert):
+        return True
+    return isinstance(node, ast.Expr) and _is_driver_call(node)
+
+
+def _referenced_names(node: ast.AST) -> Set[str]:
+    """Bare names and self.<attr> attributes used inside node"""
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.Name):
+            names.add(child.id)
+        elif isinstance(child, ast.Attribute) and isinstance(child.value, ast.Name) and child.value.id in ("self", "cls"):
+            names.add(child.attr)
+    return names
+
+
+def _reachable(roots: List[ast.AST], definitions: Dict[str, ast.AST]) -> Set[str]:
+    """Names of definitions transitively referenced from roots"""
+    seen: Set[str] = set()
+    stack = list(roots)
+    while stack:
+        for name in _referenced_names(stack.pop()):
+            if name in definitions and name not in seen:
+                seen.add(name)
+                stack.append(definitions[name])
+    return seen
+
+
+def _definitions(tree: ast.Module) -> List[ast.stmt]:
+    """Top-level functions and classes that aren't test scaffolding"""
+    return [node for node in tree.body
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)) and not _is_test_scaffolding(node)]
+
+
+def _focal_definitions(tree: ast.Module, lines: List[str]) -> List[ast.stmt]:
+    """
+    The definitions the user is working on, which are never dropped
+
+    The definition holding the cursor, taken as the last empty block parse_lenient
+    filled in (the block being typed) or else the last non-blank line, and
+    `class Solution`; without either, the last definition.
+    """
+    definitions = _definitions(tree)
+    open_blocks = [node.lineno - 1 for node in ast.walk(tree)
+                   if isinstance(getattr(node, "body", None), list) and len(node.body) == 1
+                   and isinstance(node.body[0], ast.Pass) and node.body[0].lineno == node.lineno
+                   and node.lineno <= len(lines) and "pass" not in lines[node.lineno - 1]]
+    cursor = max(open_blocks or [i for i, line in enumerate(lines) if line.strip()] or [-1])
+    focal = [node for node in definitions if _span(node)[0] <= cursor <= _span(node)[1]]
+    focal += [node for node in definitions if isinstance(node, ast.ClassDef) and node.name == "Solution" and node not in focal]
+    if not focal and definitions:
+        focal.append(definitions[-1])
+    return focal
+
+
+def _unrelated_code(tree: ast.Module, lines: List[str]) -> Tuple[Set[int], List[str]]:
+    """
+    Lines of definitions and scaffolding the focal code does not depend on
+
+    Follows the call graph from the definitions being written (and any other
+    top-level statement that is kept) through module-level definitions; imports
+    nothing kept refers to are dropped too.
+    """
+    focal = _focal_definitions(tree, lines)
+    if not focal:
+        return set(), []  # Script-style code: nothing to anchor the call graph on
+    n_lines = len(lines)
+
+    dead: Set[int] = set()
+    removed: List[str] = []
+
+    def drop(node: ast.AST, label: str) -> None:
+        first, last = _span(node)
+        dead.update(range(first, min(last, n_lines - 1) + 1))
+        removed.append(label)
+
+    module_defs = {n.name: n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))}
+    for node in tree.body:
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        module_defs.setdefault(name.id, node)
+
+    statements = [node for node in tree.body
+                  if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Assign, ast.AnnAssign,
+                                           ast.Import, ast.ImportFrom))
+                  and not _is_test_scaffolding(node)]
+    needed = _reachable(focal + statements, module_defs)
+    kept: List[ast.AST] = list(focal)
+    imports = []
+    for node in tree.body:
+        if node in focal:
+            continue
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(node)
+            continue
+        before = len(removed)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            if node.name not in needed:
+                drop(node, node.name)
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            if not any(module_defs.get(name) is node for name in needed):
+                drop(node, ast.unparse(node.targets[0] if isinstance(node, ast.Assign) else node.target))
+        elif _is_test_scaffolding(node):
+            drop(node, "__main__ block" if isinstance(node, ast.If) else type(node).__name__.lower())
+        if len(removed) == before:
+            kept.append(node)
+
+    used = set().union(*(_referenced_names(node) for node in kept))
+    for node in imports:
+        bound = {(alias.asname or alias.name).split(".")[0] for alias in node.names}
+        if "*" not in bound and not bound & used:
+            drop(node, f"import {', '.join(sorted(bound))}")
+    return dead, removed
+
+
+def _drop_leading_comments(lines: List[str], dead: Set[int]) -> None:
+    """Also drop comment lines directly above removed code"""
+    for i in sorted(dead):
+        j = i - 1
+        while j >= 0 and j not in dead and lines[j].lstrip().startswith("#"):
+            dead.add(j)
+            j -= 1
+
+
+def _fit_budget(lines: List[str], token_budget: int, comment: str) -> Tuple[List[str], bool]:
+    """Keep the trailing lines (where the user is typing) that fit token_budget"""
+    if estimate_tokens("\n".join(lines)) <= token_budget:
+        return lines, False
+    kept: List[str] = []
+    used = estimate_tokens(f"{comment} ... (0000 earlier lines omitted)")
+    for line in reversed(lines):
+        cost = estimate_tokens(line + "\n")
+        if used + cost > token_budget and kept:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    return [f"{comment} ... ({len(lines) - len(kept)} earlier lines omitted)"] + kept, True
+
+
+def compact_code(code: str, language: str = "python", token_budget: int = 1500, min_tokens: int = 400) -> Tuple[str, Dict[str, Any]]:
+    """
+    Shrink a large code submission before it goes into the prompts
+
+    Code at or under min_tokens is returned unchanged. For Python, commented-out
+    code and definitions unrelated to the function being written (helpers it never
+    calls, test classes, __main__ drivers) are removed; any language is then cut to
+    the last token_budget tokens.
+
+    Returns:
+        (compacted code, stats) where stats holds token counts, ratio, removed items and timing
+    """
+    start = time.perf_counter()
+    original_tokens = estimate_tokens(code)
+    stats: Dict[str, Any] = {
+        "applied": False,
+        "original_tokens": original_tokens,
+        "compacted_tokens": original_tokens,
+        "ratio": 1.0,
+        "removed": [],
+        "truncated": False,
+        "elapsed_ms": 0.0
+    }
+    if original_tokens <= min_tokens:
+        return code, stats
+
+    is_python = (language or "").strip().lower() == "python"
+    lines = code.split("\n")
+    dead: Set[int] = set()
+    removed: List[str] = []
+
+    if is_python:
+        dead |= _commented_out_code(code, lines)
+        if dead:
+            removed.append(f"{len(dead)} commented-out lines")
+        tree = parse_lenient(code)
+        if tree is not None:
+            unrelated, labels = _unrelated_code(tree, lines)
+            dead |= unrelated
+            removed.extend(labels)
+            _drop_leading_comments(lines, dead)
+
+    kept: List[str] = []
+    for i, line in enumerate(lines):
+        if i in dead or (not line.strip() and kept and not kept[-1].strip()):
+            continue  # Removed, or a second blank line in a row
+        kept.append(line)
+
+    comment = "#" if is_python else "//"
+    omitted = [label for label in removed if "commented-out" not in label]
+    while kept and not kept[0].strip():
+        kept.pop(0)
+    if omitted:
+        kept.insert(0, f"{comment} (omitted unrelated code: {', '.join(omitted)})")
+
+    kept, truncated = _fit_budget(kept, token_budget, comment)
+    compacted = "\n".join(kept).strip("\n") + ("\n" if code.endswith("\n") else "")
+
+    compacted_tokens = estimate_tokens(compacted)
+    stats.update({
+        "applied": compacted != code,
+        "compacted_tokens": compacted_tokens,
+        "ratio": round(compacted_tokens / original_tokens, 3),
+        "removed": removed,
+        "truncated": truncated,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)
+    })
+    return compacted, stats
@@ -0,0 +1,103 @@
+import ast
+import hashlib
+import io
+import tokenize
+from typing import List, Optional
+
+from response_cache import normalize_code
+
+
+def _strip_docstrings(tree: ast.AST) -> None:
+    """Remove module, class and function docstrings in place"""
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            body = node.body
+            if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                    and isinstance(body[0].value.value, str):
+                body.pop(0)
+                if not body:
+                    body.append(ast.Pass())
+
+
+def _parse_python(code: str) -> Optional[ast.AST]:
+    """Parse code, closing a trailing open block (e.g. `while l <= r:`) if needed"""
+    try:
+        return ast.parse(code)
+    except (SyntaxError, ValueError):
+        pass
+
+    lines = code.rstrip().split("\n")
+    last = lines[-1] if lines else ""
+    if last.rstrip().endswith(":"):
+        indent = last[:len(last) - len(last.lstrip())]
+        try:
+            return ast.parse(code.rstrip() + "\n" + indent + "    pass\n")
+        except (SyntaxError, ValueError):
+            pass
+    return None
+
+
+def _token_normalize(code: str) -> str:
+    """Comment- and whitespace-insensitive form for code that does not parse yet"""
+    lines: List[str] = []
+    current: List[str] = []
+    depth = 0
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            if tok.type in (tokenize.COMMENT, tokenize.NL, tokenize.ENCODING, tokenize.ENDMARKER):
+                continue
+            if tok.type == tokenize.INDENT:
+                depth += 1
+            elif tok.type == tokenize.DEDENT:
+                depth -= 1
+            elif tok.type == tokenize.NEWLINE:
+                if current:
+                    lines.append("  " * depth + " ".join(current))
+                current = []
+            else:
+                current.append(tok.string)
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        # Unclosed brackets/strings: keep everything tokenized so far
+        pass
+
+    if current:
+        lines.append("  " * max(depth, 0) + " ".join(current))
+    if not lines:
+        return normalize_code(code)
+    return "\n".join(lines)
+
+
+def canonicalize_python(code: str) -> str:
+    """
+    Canonical form of Python code for near-duplicate detection
+
+    Comments, docstrings, blank lines and formatting are removed by round-tripping
+    through the AST. Identifiers are kept as written: hints quote the user's names.
+    Code that does not parse yet, or is nested too deeply for the parser and
+    unparser (e.g. a long flat expression), falls back to token normalization.
+    """
+    try:
+        tree = _parse_python(code)
+        if tree is not None:
+            _strip_docstrings(tree)
+            return "ast:" + ast.unparse(tree)
+    except (RecursionError, MemoryError):
+        pass
+    return "tok:" + _token_normalize(code)
+
+
+def indent_unit(code: str) -> str:
+    """Leading whitespace of the first indented line (how the user indents)"""
+    for line in (code or "").split("\n"):
+        if line.strip() and line[0] in " \t":
+            return line[:len(line) - len(line.lstrip())]
+    return ""
+
+
+def fingerprint_code(code: str, language: str = "python") -> str:
+    """Stable hash of the canonical form of code"""
+    if (language or "").strip().lower() == "python":
+        canonical = canonicalize_python(code or "")
+    else:
+        canonical = "raw:" + normalize_code(code)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
@@ -0,0 +1,374 @@
+"""
+Deterministic in-process stand-ins for the Claude and GPT SDK clients
+
+They mimic the slice of the SDK surface HintGenerator uses (messages.create,
+messages.stream and chat.completions.create), so the pipeline, the server and
+load tests can run without API keys. Each client has a configurable latency
+distribution, injects rate limits, 5xx errors and timeouts as the real SDK
+exceptions, and answers with canned or templated JSON. All randomness comes
+from a seeded generator, and the answer for a request depends only on its
+prompt, so runs are reproducible.
+
+Set LLM_PROVIDER=fake to make HintGenerator use them (see fake_clients_from_env).
+"""
+
+import asyncio
+import hashlib
+import importlib
+import json
+import math
+import os
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, Optional, Tuple, Union
+
+# Templated answers: {problem_name}, {language} and {first_arg} (first parameter of
+# the user's function) are filled in from the prompt; one is picked per request
+HINT_TEMPLATES = [
+    "Use a hash map from each value to its index so {problem_name} needs only one pass",
+    "Move two pointers inward from both ends and compare their sum with the target",
+    "Keep a sliding window over {first_arg} and shrink it from the left when it breaks the rule",
+    "Sort {first_arg} first so equal or neighbouring values end up next to each other",
+]
+CODE_TEMPLATES = [
+    "    seen = {{}}  # value -> index",
+    "    left, right = 0, len({first_arg}) - 1",
+    "    for i, value in enumerate({first_arg}):",
+    "    {first_arg}.sort()",
+]
+CANNED_EVALUATION = {
+    "overall_score": 4,
+    "is_good": True,
+    "metrics": {
+        "technical_accuracy": 4,
+        "pedagogical_value": 4,
+        "clarity_communication": 4,
+        "contextual_relevance": 4
+    },
+    "mode_compliance": {
+        "follows_mode_requirements": True,
+        "mode_specific_feedback": "Concise next step"
+    },
+    "summary_feedback": "Clear and appropriately scoped",
+    "improvement_advice": None
+}
+
+_TAG = r"<{0}>\n(.*?)\n</{0}>"
+_FIRST_ARG = re.compile(r"def\s+\w+\s*\(\s*(?:self\s*,\s*)?(\w+)")
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+def _text(value: Any) -> str:
+    """Flatten a prompt given as a string, content blocks or messages into text"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return _text(value.get("text", value.get("content", "")))
+    if isinstance(value, list):
+        return "\n".join(_text(item) for item in value)
+    return ""
+
+
+def claude_message(text: str, input_tokens: int, output_tokens: int,
+                   cache_read_input_tokens: int = 0, cache_creation_input_tokens: int = 0) -> SimpleNamespace:
+    """Object shaped like an anthropic Message with one text block"""
+    from anthropic.types import TextBlock
+    usage = SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens,
+                            cache_read_input_tokens=cache_read_input_tokens,
+                            cache_creation_input_tokens=cache_creation_input_tokens)
+    return SimpleNamespace(content=[TextBlock(type="text", text=text)], usage=usage)
+
+
+def gpt_completion(text: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> SimpleNamespace:
+    """Object shaped like an openai ChatCompletion with one choice"""
+    usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                            prompt_tokens_details=SimpleNamespace(cached_tokens=cached_tokens))
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))], usage=usage)
+
+
+class LatencyModel:
+    """
+    Per-call latency in seconds, parsed from a spec
+
+    Specs: a number or "fixed:S", "uniform:LO:HI", "normal:MEAN:SD",
+    "lognormal:MEDIAN:SIGMA" (heavy right tail, like real provider latency) and
+    "exponential:MEAN". Samples never go below 0.
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exponential": 1}
+
+    def __init__(self, spec: Union[str, float] = 0.5):
+        if isinstance(spec, (int, float)):
+            spec = f"fixed:{spec}"
+        kind, _, params = spec.strip().partition(":")
+        if kind not in self.KINDS:
+            kind, params = "fixed", spec  # A bare number
+        try:
+            self.params = [float(p) for p in params.split(":")]
+        except ValueError:
+            raise ValueError(f"Invalid latency spec '{spec}'")
+        if len(self.params) != self.KINDS[kind]:
+            raise ValueError(f"Latency spec '{spec}' needs {self.KINDS[kind]} parameter(s)")
+        self.kind = kind
+        self.spec = spec
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.params[0]
+        elif self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        else:
+            value = rng.expovariate(1 / self.params[0]) if self.params[0] > 0 else 0.0
+        return max(0.0, value)
+
+    @property
+    def mean(self) -> float:
+        """Expected latency (before clamping at 0)"""
+        if self.kind == "uniform":
+            return sum(self.params) / 2
+        if self.kind == "lognormal":
+            return self.params[0] * math.exp(self.params[1] ** 2 / 2)
+        return self.params[0]
+
+
+class _FakeProvider:
+    """Latency sampling, fault injection and call statistics shared by the fake clients"""
+
+    SDK = ""
+
+    def __init__(self, latency: Union[str, float, LatencyModel], error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, timeout_rate: float = 0.0, seed: int = 0):
+        # The SDK supplies the injected exceptions; loading it here keeps the import out of the first call
+        self._sdk = importlib.import_module(self.SDK)
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self._rng = random.Random(seed)
+        self.stats = {"calls": 0, "rate_limited": 0, "errors": 0, "timeouts": 0}
+
+    def _draw(self) -> Tuple[float, Optional[str]]:
+        """(latency, injected fault or None) for the next call"""
+        self.stats["calls"] += 1
+        roll = self._rng.random()
+        fault = None
+        if roll < self.rate_limit_rate:
+            fault = "rate_limited"
+        elif roll < self.rate_limit_rate + self.error_rate:
+            fault = "errors"
+        elif roll < self.rate_limit_rate + self.error_rate + self.timeout_rate:
+            fault = "timeouts"
+        if fault:
+            self.stats[fault] += 1
+        # Rate limits are rejected before any work is done
+        return (0.0 if fault == "rate_limited" else self.latency.sample(self._rng)), fault
+
+    def _raise(self, fault: str) -> None:
+        """Raise the SDK exception the real client raises for this fault"""
+        import httpx
+        sdk = self._sdk
+        request = httpx.Request("POST", self.URL)
+        if fault == "timeouts":
+            raise sdk.APITimeoutError(request=request)
+        status, error = (429, sdk.RateLimitError) if fault == "rate_limited" else (500, sdk.InternalServerError)
+        response = httpx.Response(status, request=request, json={"error": {"message": f"Injected {fault}"}})
+        raise error(f"Error code: {status} - injected by fake provider", response=response, body=None)
+
+
+class _FakeClaude(_FakeProvider):
+    """Claude-shaped answers: templated hint / next_code JSON depending on the prompt's mode"""
+
+    SDK = "anthropic"
+    URL = "https://fake.anthropic.local/v1/messages"
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, hint_template: Optional[str] = None,
+                 code_template: Optional[str] = None, **faults):
+        super().__init__(latency, **faults)
+        self.hint_templates = [hint_template] if hint_template else HINT_TEMPLATES
+        self.code_templates = [code_template] if code_template else CODE_TEMPLATES
+
+    def _message(self, kwargs: Dict[str, Any]) -> SimpleNamespace:
+        system = _text(kwargs.get("system", ""))
+        prompt = _text(kwargs.get("messages", []))
+        fields = {"problem_name": "the problem", "language": "python", "first_arg": "nums"}
+        for tag in ("problem_name", "language"):
+            match = re.search(_TAG.format(tag), prompt, re.S)
+            if match and match.group(1).strip():
+                fields[tag] = match.group(1).strip()
+        code = re.search(_TAG.format("code_so_far"), prompt, re.S)
+        first_arg = _FIRST_ARG.search(code.group(1)) if code else None
+        if first_arg:
+            fields["first_arg"] = first_arg.group(1)
+
+        # The same prompt always gets the same answer; retries with advice get another one
+        key, templates = ("next_code", self.code_templates) if "code snippet" in system else ("hint", self.hint_templates)
+        index = int(hashlib.sha256(prompt.encode()).hexdigest(), 16) % len(templates)
+        text = json.dumps({key: templates[index].format(**fields)})
+        return claude_message(text, _estimate_tokens(system + prompt), _estimate_tokens(text))
+
+
+class FakeAnthropic(_FakeClaude):
+    """Blocking Claude stand-in (time.sleep), like anthropic.Anthropic"""
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        delay, fault = self._draw()
+        time.sleep(delay)
+        if fault:
+            self._raise(fault)
+        return self._message(kwargs)
+
+
+class _FakeMessageStream:
+    """Async context manager shaped like anthropic's MessageStream"""
+
+    def __init__(self, client: "FakeAsyncAnthropic", kwargs: Dict[str, Any], chunk_size: int = 4):
+        self._client = client
+        self._kwargs = kwargs
+        self._chunk_size = chunk_size
+
+    async def __aenter__(self):
+        delay, fault = self._client._draw()
+        first_token = self._client.first_token_latency
+        self._first_token_latency = delay * 0.2 if first_token is None else min(first_token, delay)
+        if fault:
+            # The request fails before any text is sent
+            await asyncio.sleep(self._first_token_latency)
+            self._client._raise(fault)
+        self._message = self._client._message(self._kwargs)
+        chunks = max(1, -(-len(self._message.content[0].text) // self._chunk_size) - 1)
+        self._chunk_latency = max(0.0, delay - self._first_token_latency) / chunks
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        text = self._message.content[0].text
+        await asyncio.sleep(self._first_token_latency)
+        for i in range(0, len(text), self._chunk_size):
+            if i:
+                await asyncio.sleep(self._chunk_latency)
+            yield text[i:i + self._chunk_size]
+
+    async def get_final_message(self):
+        return self._message
+
+
+class FakeAsyncAnthropic(_FakeClaude):
+    """
+    Non-blocking Claude stand-in (asyncio.sleep), like anthropic.AsyncAnthropic
+
+    messages.stream emits the first chunk after first_token_latency (default: 20%
+    of the sampled latency) and spreads the rest evenly over the remaining chunks.
+    """
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, first_token_latency: Optional[float] = None, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.first_token_latency = first_token_latency
+        self.messages = SimpleNamespace(create=self._create, stream=self._stream)
+
+    async def _create(self, **kwargs):
+        delay, fault = self._draw()
+        await asyncio.sleep(delay)
+        if fault:
+            self._raise(fault)
+        return self._message(kwargs)
+
+    def _stream(self, **kwargs):
+        return _FakeMessageStream(self, kwargs)
+
+
+class _FakeGPT(_FakeProvider):
+    """GPT-shaped evaluations; a low_score_rate fraction scores 2/5 (below the retry threshold)"""
+
+    SDK = "openai"
+    URL = "https://fake.openai.local/v1/chat/completions"
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, low_score_rate: float = 0.0, **faults):
+        super().__init__(latency, **faults)
+        self.low_score_rate = low_score_rate
+
+    def _completion(self, kwargs: Dict[str, Any], score: int) -> SimpleNamespace:
+        evaluation = dict(CANNED_EVALUATION, overall_score=score, is_good=score >= 3)
+        if score < 3:
+            evaluation["improvement_advice"] = "Be more specific about the next step"
+        text = json.dumps(evaluation)
+        return gpt_completion(text, _estimate_tokens(_text(kwargs.get("messages", []))), _estimate_tokens(text))
+
+    def _score(self) -> int:
+        return 2 if self._rng.random() < self.low_score_rate else 4
+
+
+class FakeOpenAI(_FakeGPT):
+    """Blocking GPT stand-in (time.sleep), like openai.OpenAI"""
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        score = self._score()
+        delay, fault = self._draw()
+        time.sleep(delay)
+        if fault:
+            self._raise(fault)
+        return self._completion(kwargs, score)
+
+
+class FakeAsyncOpenAI(_FakeGPT):
+    """Non-blocking GPT stand-in (asyncio.sleep), like openai.AsyncOpenAI"""
+
+    def __init__(self, latency: Union[str, float, LatencyModel] = 0.5, **kwargs):
+        super().__init__(latency, **kwargs)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        score = self._score()
+        delay, fault = self._draw()
+        await asyncio.sleep(delay)
+        if fault:
+            self._raise(fault)
+        return self._completion(kwargs, score)
+
+
+def fake_clients_from_env() -> Tuple[FakeAnthropic, FakeAsyncAnthropic, FakeOpenAI, FakeAsyncOpenAI]:
+    """
+    (sync Claude, async Claude, sync GPT, async GPT) fakes configured from FAKE_* settings
+
+    FAKE_CLAUDE_LATENCY / FAKE_GPT_LATENCY take LatencyModel specs; the fault rates
+    (FAKE_RATE_LIMIT_RATE, FAKE_ERROR_RATE, FAKE_TIMEOUT_RATE) apply to every call.
+    """
+    faults = {
+        "error_rate": float(os.getenv('FAKE_ERROR_RATE', '0')),
+        "rate_limit_rate": float(os.getenv('FAKE_RATE_LIMIT_RATE', '0')),
+        "timeout_rate": float(os.getenv('FAKE_TIMEOUT_RATE', '0')),
+        "seed": int(os.getenv('FAKE_SEED', '0')),
+    }
+    claude = {
+        "latency": LatencyModel(os.getenv('FAKE_CLAUDE_LATENCY', 'lognormal:0.8:0.3')),
+        "hint_template": os.getenv('FAKE_HINT_TEMPLATE') or None,
+        "code_template": os.getenv('FAKE_CODE_TEMPLATE') or None,
+        **faults
+    }
+    gpt = {
+        "latency": LatencyModel(os.getenv('FAKE_GPT_LATENCY', 'lognormal:0.5:0.3')),
+        "low_score_rate": float(os.getenv('FAKE_LOW_SCORE_RATE', '0')),
+        **faults
+    }
+    return FakeAnthropic(**claude), FakeAsyncAnthropic(**claude), FakeOpenAI(**gpt), FakeAsyncOpenAI(**gpt)
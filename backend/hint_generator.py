@@ -1,45 +1,273 @@
 import os
 import json
-import re
 import time
+import asyncio
+import logging
 from dotenv import load_dotenv
-import openai
-from openai import OpenAI
-import anthropic
-from anthropic import APIStatusError, RateLimitError, APIConnectionError, APITimeoutError
-from anthropic.types import TextBlock
-from typing import Dict, Optional, Any, Tuple
+from typing import Dict, Optional, Any, Tuple, AsyncIterator, Generator
+from response_cache import ResponseCache, make_cache_key, make_evaluation_key, response_cache_from_env
+from code_fingerprint import fingerprint_code, indent_unit
+from stream_parser import IncrementalFieldExtractor
+from request_coalescing import SingleFlight
+from code_compaction import compact_code
+from prescorer import prescore, prescore_decision, local_evaluation
+from snippet_validator import validate_snippet, SNIPPET_SYNTAX_ERROR
+from fake_providers import fake_clients_from_env
+from cassettes import CassetteClient, cassette_from_env
+from json_extraction import extract_json, repair_gpt_json
+from structured_logging import get_logger, log_event, payload_logging
+from metrics import STAGE_SECONDS, ATTEMPTS, SCHEMA_FAILURES, PROVIDER_ERRORS
+from tracing import span, current_span
+from http_pools import shared_http_client, warm_up, awarm_up
 
 # Load environment variables
 load_dotenv()
 
+logger = get_logger("hint_generator")
+
+# Stage timers for /metrics (children resolved once, off the hot path)
+_PROMPT_BUILD = STAGE_SECONDS.labels("prompt_build")
+_CLAUDE_CALL = STAGE_SECONDS.labels("claude_call")
+_GPT_CALL = STAGE_SECONDS.labels("gpt_call")
+_BACKOFF = STAGE_SECONDS.labels("backoff")
+_JSON_EXTRACTION = STAGE_SECONDS.labels("json_extraction")
+_SCHEMA_VALIDATION = STAGE_SECONDS.labels("schema_validation")
+_GPT_EVALUATION = STAGE_SECONDS.labels("gpt_evaluation")
+_ATTEMPT = STAGE_SECONDS.labels("attempt")
+_GENERATE = STAGE_SECONDS.labels("generate")
+
+
+# The provider SDKs dominate import time, so they are imported when a live client is first needed
+def _anthropic() -> Any:
+    import anthropic
+    return anthropic
+
+
+def _openai() -> Any:
+    import openai
+    return openai
+
+
+def _claude_errors() -> Tuple[type, ...]:
+    """Retried Claude SDK errors (only evaluated once an exception is raised)"""
+    anthropic = _anthropic()
+    return (anthropic.APITimeoutError, anthropic.RateLimitError, anthropic.APIConnectionError, anthropic.APIStatusError)
+
+
+def _gpt_errors() -> Tuple[type, ...]:
+    """Retried OpenAI SDK errors (only evaluated once an exception is raised)"""
+    openai = _openai()
+    return (openai.APITimeoutError, openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+def _claude_usage_attributes(response: Any) -> Dict[str, int]:
+    """Token counts of a Claude message as span attributes"""
+    usage = getattr(response, "usage", None)
+    return {
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_input_tokens", 0) or 0
+    }
+
+
+def _gpt_usage_attributes(response: Any) -> Dict[str, int]:
+    """Token counts of a GPT completion as span attributes"""
+    usage = getattr(response, "usage", None)
+    return {
+        "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "cached_tokens": getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+    }
+
+
+def _attempt_outcome(outcome: str, **attributes: Any) -> None:
+    """Count an attempt outcome and tag the current attempt span with it"""
+    ATTEMPTS.labels(outcome).inc()
+    current_span().set_attributes(outcome=outcome, **attributes)
+
+
+def response_cache_key(problem_name: str, code_so_far: str, language: str, mode: str, use_evaluation: bool, settings: Tuple[Any, ...] = (), strategy: str = "serial") -> str:
+    """
+    Response cache key from the canonical code fingerprint
+
+    settings are the generation parameters that decide which evaluated result is
+    returned (threshold, retry budget): a result that stayed below a lenient
+    threshold must not be served to a stricter caller. Without evaluation any
+    valid response is accepted, so they are left out of the key. strategy
+    ("serial" retries or "fanout" candidates) is always keyed, so the two
+    paths never serve or join each other's results.
+    """
+    # Local names stay in the key: hints and code snippets quote the user's identifiers, so a response
+    # generated for one student's names must not be served to another's. Snippets must also match
+    # the user's indentation
+    code_key = fingerprint_code(code_so_far, language)
+    if mode == "next_code":
+        code_key += repr(indent_unit(code_so_far))
+    return make_cache_key(problem_name, code_key, mode, language, use_evaluation, (strategy,) + (settings if use_evaluation else ()))
+
+
+def _as_cached(cached: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Results served from the response cache (no attempt history), or None on a miss"""
+    if cached is None:
+        return None
+    return {**cached, "attempts": [], "cached": True}
+
+
+def _next_step(steps: Generator, reply: Any) -> Optional[Tuple[Any, ...]]:
+    """Send reply into an attempt-step generator; the next provider request, or None once the loop is done"""
+    try:
+        return steps.send(reply)
+    except StopIteration:
+        return None
+
 class HintGenerator:
-    def __init__(self):
+    def __init__(self, response_cache: Optional[ResponseCache] = None, evaluation_cache: Optional[ResponseCache] = None):
         """Initialize the hint generator with Claude client (GPT client initialized on-demand)"""
         
         # Get API keys
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
         self.claude_api_key = os.getenv('CLAUDE_API_KEY')
         
-        # Claude API key is always required
-        if not self.claude_api_key:
-            raise ValueError("Please set CLAUDE_API_KEY in .env file")
+        # LLM_CASSETTE_MODE=record/replay/auto records or replays every provider call
+        self.cassette = cassette_from_env()
+        
+        # LLM_PROVIDER=fake swaps in deterministic local stand-ins (no keys, no network)
+        self.provider = os.getenv('LLM_PROVIDER', 'live').strip().lower()
+        if self.provider == 'fake':
+            (self.claude_client, self.async_claude_client,
+             self.openai_client, self.async_openai_client) = fake_clients_from_env()
+        elif self.cassette is not None and self.cassette.mode == "replay":
+            # Replay answers every call from the cassette: no live clients or API keys
+            self.claude_client = self.async_claude_client = None
+            self.openai_client = self.async_openai_client = None
+        else:
+            # Claude API key is always required
+            if not self.claude_api_key:
+                raise ValueError("Please set CLAUDE_API_KEY in .env file")
+            
+            # Clients (and the SDKs) are created on first use or by prepare()
+            self.claude_client = self.async_claude_client = None
+            self.openai_client = self.async_openai_client = None
+        
+        if self.cassette is not None:
+            if self.claude_client is not None or self.cassette.mode == "replay":
+                self.claude_client = self._with_cassette(self.claude_client, "claude", False)
+                self.async_claude_client = self._with_cassette(self.async_claude_client, "claude", True)
+            if self.openai_client is not None or self.cassette.mode == "replay":
+                self.openai_client = self._with_cassette(self.openai_client, "gpt", False)
+                self.async_openai_client = self._with_cassette(self.async_openai_client, "gpt", True)
+        
+        # Response cache for repeated requests and GPT evaluation cache for repeated
+        # (problem, code, response) triples; RESPONSE_CACHE_BACKEND=sqlite shares both
+        # across the workers on a host (RESPONSE_CACHE_SIZE=0 / RESPONSE_CACHE_MAX_MB=0 disables them)
+        self.response_cache = response_cache if response_cache is not None else response_cache_from_env("responses")
+        self.evaluation_cache = evaluation_cache if evaluation_cache is not None else response_cache_from_env("evaluations")
         
-        # Initialize Claude client (required for all operations)
-        self.claude_client = anthropic.Anthropic(api_key=self.claude_api_key)
+        # Identical concurrent requests share one in-flight generation
+        self.inflight = SingleFlight()
         
-        # OpenAI client initialized lazily when evaluation is needed
-        self.openai_client = None
+        # Large submissions are compacted before they go into the prompts
+        self.code_token_budget = int(os.getenv('CODE_TOKEN_BUDGET', '1500'))
+        self.code_compaction_min_tokens = int(os.getenv('CODE_COMPACTION_MIN_TOKENS', '400'))
+        
+        # Local pre-score bands outside which the GPT evaluation is skipped. The accept band is off
+        # (above the maximum score of 5) until its agreement with GPT has been measured
+        self.prescore_accept = float(os.getenv('PRESCORE_ACCEPT', '6'))
+        self.prescore_reject = float(os.getenv('PRESCORE_REJECT', '2.0'))
+        self.prescore_stats = {"accept": 0, "reject": 0, "uncertain": 0}
         
         # Initialize system prompts
         self._setup_prompts()
     
+    def _ensure_claude_client(self):
+        """Initialize Claude client (on the shared connection pool) if not already done"""
+        if self.claude_client is None:
+            anthropic = _anthropic()
+            client = anthropic.Anthropic(api_key=self.claude_api_key,
+                                         http_client=shared_http_client("anthropic", anthropic.DefaultHttpxClient, False))
+            self.claude_client = self._with_cassette(client, "claude", False)
+    
+    def _ensure_async_claude_client(self):
+        """Initialize async Claude client (on the shared connection pool) if not already done"""
+        if self.async_claude_client is None:
+            anthropic = _anthropic()
+            client = anthropic.AsyncAnthropic(api_key=self.claude_api_key,
+                                              http_client=shared_http_client("anthropic", anthropic.DefaultAsyncHttpxClient, True))
+            self.async_claude_client = self._with_cassette(client, "claude", True)
+    
     def _ensure_openai_client(self):
         """Initialize OpenAI client if not already done and API key is available"""
         if self.openai_client is None:
             if not self.openai_api_key:
                 raise ValueError("OPENAI_API_KEY is required for evaluation but not set in .env file")
-            self.openai_client = OpenAI(api_key=self.openai_api_key)
+            openai = _openai()
+            client = openai.OpenAI(api_key=self.openai_api_key,
+                                   http_client=shared_http_client("openai", openai.DefaultHttpxClient, False))
+            self.openai_client = self._with_cassette(client, "gpt", False)
+    
+    def _ensure_async_openai_client(self):
+        """Initialize async OpenAI client if not already done and API key is available"""
+        if self.async_openai_client is None:
+            if not self.openai_api_key:
+                raise ValueError("OPENAI_API_KEY is required for evaluation but not set in .env file")
+            openai = _openai()
+            client = openai.AsyncOpenAI(api_key=self.openai_api_key,
+                                        http_client=shared_http_client("openai", openai.DefaultAsyncHttpxClient, True))
+            self.async_openai_client = self._with_cassette(client, "gpt", True)
+    
+    def prepare(self):
+        """
+        Import the provider SDKs and build every client now instead of on the first
+        request (the OpenAI ones only when OPENAI_API_KEY is set); blocking, so the
+        server runs it in a thread
+        """
+        if self.provider == 'fake':
+            return
+        self._ensure_claude_client()
+        self._ensure_async_claude_client()
+        if self.openai_api_key:
+            self._ensure_openai_client()
+            self._ensure_async_openai_client()
+    
+    def _live_clients(self, is_async: bool) -> Dict[str, Any]:
+        """Live SDK clients by provider for warm-up (none for fake or replayed providers)"""
+        if self.provider == 'fake':
+            return {}
+        self.prepare()
+        clients = (self.async_claude_client, self.async_openai_client) if is_async else (self.claude_client, self.openai_client)
+        live = {}
+        for provider, client in zip(("anthropic", "openai"), clients):
+            if isinstance(client, CassetteClient):
+                client = client.inner
+            if client is not None:
+                live[provider] = client
+        return live
+    
+    def warm_up(self, connections: Optional[int] = None) -> Dict[str, int]:
+        """
+        Pre-establish keep-alive connections to both providers (PROVIDER_WARMUP_CONNECTIONS
+        each, default 2) so the first requests skip the TCP/TLS handshake; returns
+        the connections opened per provider
+        """
+        if connections is None:
+            connections = int(os.getenv('PROVIDER_WARMUP_CONNECTIONS', '2'))
+        return {provider: warm_up(client._client, str(client.base_url), connections)
+                for provider, client in self._live_clients(False).items()}
+    
+    async def awarm_up(self, connections: Optional[int] = None) -> Dict[str, int]:
+        """Async version of warm_up, for the async clients the server uses"""
+        if connections is None:
+            connections = int(os.getenv('PROVIDER_WARMUP_CONNECTIONS', '2'))
+        clients = self._live_clients(True)
+        opened = await asyncio.gather(*(awarm_up(client._client, str(client.base_url), connections)
+                                        for client in clients.values()))
+        return dict(zip(clients, opened))
+    
+    def _with_cassette(self, client: Any, provider: str, is_async: bool) -> Any:
+        """client wrapped by the record/replay cassette, if one is configured"""
+        if self.cassette is None or isinstance(client, CassetteClient):
+            return client
+        return CassetteClient(client, self.cassette, provider, is_async)
     
     def _setup_prompts(self):
         """Initialize system prompts"""
@@ -60,6 +288,101 @@ You will receive detailed instructions and the user's coding situation. Follow t
 Return ONLY a single, valid JSON object—no prose."""
 
 
+        # Static per-mode instructions sent as a cacheable prefix ({language} is filled in per request)
+        self.HINT_INSTRUCTIONS = """You are an expert coding mentor.
+
+TASK:
+Given the problem name, the user's current code, and the language (provided at the end of this message), identify exactly the next **conceptual** step they should take — not the full solution.
+
+PROCESS:
+1. Determine the user's current implementation state from these categories:
+   - just_starting
+   - wrong_approach
+   - mid_gap
+   - boundary_issue
+   - performance
+   - edge_case
+   - debug
+   - memo_needed
+   - finalize_output
+   - syntax_fix
+2. If a standard algorithmic pattern applies (DFS, DP, BFS, two_pointers, sliding_window, heap, etc.), briefly name it.
+3. State **only one** concise, plain-English next step.
+
+OUTPUT:
+- One JSON object in the form:
+  {"hint":"<single next step in plain English>"}
+
+RULES:
+- No full solutions.
+- No extra keys or formatting.
+- No commentary outside JSON.
+- Keep the hint under 25 words.
+- If the code is empty or unrelated, suggest the starting step.
+
+EXAMPLES:
+Input: Problem: "Two Sum", Code: def twoSum(nums, target): pass
+Output: {"hint":"Use a hash map to store complements for O(n) lookup"}
+
+Input: Problem: "Binary Search", Code: while left <= right:
+Output: {"hint":"Compute mid as (left + right) // 2 before comparisons"}
+
+Input: Problem: "Valid Parentheses", Code: def isValid(s): stack = []
+Output: {"hint":"Iterate through characters, push opening brackets, pop and check closing ones"}
+
+AVOID (counterexamples):
+❌ {"hint":"You need to solve this problem"} - Too vague
+❌ {"hint":"Create a for loop that iterates through the array and checks each element against every other element"} - Too long and detailed
+❌ {"hint":"Use hash maps", "note":"extra key"} - Extra keys not allowed"""
+
+        self.CODE_INSTRUCTIONS = """You are an expert coding mentor.
+
+TASK:
+Given the problem name, the user's current code, and the language (provided at the end of this message), output exactly the **next small code snippet** (1–3 lines) they should write to progress.
+
+PROCESS:
+1. Identify the user's current progress stage from:
+   - just_starting
+   - wrong_approach
+   - mid_gap
+   - minor_bug
+   - performance
+   - edge_case
+   - debug
+   - memo_needed
+   - finalize_output
+   - syntax_fix
+2. Internally note if a common algorithmic pattern applies (DFS, DP, BFS, two_pointers, sliding_window, heap, etc.), but do **not** mention it in output.
+3. Output only the single most useful next code line(s) in the specified language.
+
+OUTPUT FORMAT:
+- One JSON object only:
+  {"next_code":"<minimal {language} snippet with optional inline comment>"}
+- Keep to **1–3 lines** (≤120 characters per line).
+- Use only the `{language}` provided.
+- Inline comment is optional but encouraged.
+- No full function/class definitions.
+- No markdown, extra keys, or explanations.
+
+EXAMPLES:
+Input: Problem: "Two Sum", Code: def twoSum(nums, target): pass
+Output: {"next_code":"    hashmap = {}  # store num:index for O(1) lookup"}
+
+Input: Problem: "Binary Search", Code: while left <= right:
+Output: {"next_code":"        mid = (left + right) // 2  # midpoint"}
+
+Input: Problem: "Merge Intervals", Code: # done merging, missing final add
+Output: {"next_code":"    if current_interval: merged.append(current_interval)"}
+
+AVOID (counterexamples):
+❌ {"next_code":"def solve_problem():\\n    return solution"} - Too complete, full function
+❌ {"next_code":"# TODO: implement this"} - No actual code
+❌ {"next_code":"x = 1\\ny = 2\\nz = 3\\nresult = x+y+z"} - Too many lines (>3)
+
+CONSTRAINTS:
+- Think step-by-step internally, but output only the JSON.
+- If code is empty or unrelated, start with the most basic setup line."""
+
         self.GPT_EVALUATOR_PROMPT = """You are an expert coding mentor evaluating Claude's response for quality and effectiveness.
 
 EVALUATION FRAMEWORK:
@@ -124,87 +447,11 @@ CRITICAL JSON FORMATTING:
 
     def extract_json_from_response(self, text: str) -> Optional[Dict[str, Any]]:
         """Extract JSON from response with robust parsing and GPT improvement advice handling"""
-        txt = text.strip()
-        
-        # Strip markdown fences
-        if txt.startswith("```"):
-            txt = re.sub(r"^```(?:json)?\s*|\s*```$", "", txt, flags=re.S)
-        
-        # Fast path - try direct parsing
-        try:
-            return json.loads(txt)
-        except json.JSONDecodeError:
-            pass
-        
-        # Special handling for GPT evaluation responses with potential improvement_advice issues
-        if '"improvement_advice"' in txt:
-            # Try to fix common JSON issues in GPT evaluation responses
-            fixed_txt = self._fix_gpt_json_issues(txt)
-            try:
-                return json.loads(fixed_txt)
-            except json.JSONDecodeError:
-                pass
-        
-        # Scan for balanced braces
-        start = txt.find("{")
-        while start != -1:
-            depth = 0
-            for i in range(start, len(txt)):
-                c = txt[i]
-                if c == "{": 
-                    depth += 1
-                elif c == "}":
-                    depth -= 1
-                    if depth == 0:
-                        cand = txt[start:i+1]
-                        try:
-                            return json.loads(cand)
-                        except json.JSONDecodeError:
-                            break
-            start = txt.find("{", start + 1)
-        
-        return None
+        return extract_json(text)
     
     def _fix_gpt_json_issues(self, text: str) -> str:
         """Fix common JSON formatting issues in GPT evaluation responses"""
-        import re
-        
-        # Common fixes for GPT JSON responses
-        fixed = text
-        
-        # Fix improvement_advice field if it's causing issues
-        pattern = r'"improvement_advice":\s*"([^"]*(?:"[^"]*)*)"'
-        match = re.search(pattern, fixed, re.DOTALL)
-        
-        if match:
-            advice_content = match.group(1)
-            # Remove unescaped quotes and newlines that break JSON
-            clean_advice = advice_content.replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
-            # Truncate if too long (common cause of JSON issues)
-            if len(clean_advice) > 300:
-                clean_advice = clean_advice[:300] + "..."
-            fixed = re.sub(pattern, f'"improvement_advice": "{clean_advice}"', fixed, flags=re.DOTALL)
-        
-        # Fix similar issues with feedback field
-        pattern = r'"feedback":\s*"([^"]*(?:"[^"]*)*)"'
-        match = re.search(pattern, fixed, re.DOTALL)
-        
-        if match:
-            feedback_content = match.group(1)
-            clean_feedback = feedback_content.replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
-            if len(clean_feedback) > 400:
-                clean_feedback = clean_feedback[:400] + "..."
-            fixed = re.sub(pattern, f'"feedback": "{clean_feedback}"', fixed, flags=re.DOTALL)
-        
-        # Handle truncated JSON (missing closing brace)
-        if not fixed.rstrip().endswith('}'):
-            # Count opening and closing braces
-            open_braces = fixed.count('{')
-            close_braces = fixed.count('}')
-            if open_braces > close_braces:
-                fixed += '}' * (open_braces - close_braces)
-        
-        return fixed
+        return repair_gpt_json(text)
     
     def _get_mode_specific_criteria(self, mode: str) -> str:
         """Get mode-specific evaluation criteria based on the mode being evaluated"""
@@ -277,18 +524,27 @@ CRITICAL JSON FORMATTING:
             use_evaluation=False
         )
 
-    def get_claude_response(self, problem_name: str, code_so_far: str, language: str, mode: str, advice: Optional[str] = None) -> Dict[str, Any]:
-        """Get response from Claude for either hint or code generation"""
-        
-        # Select system prompt and create detailed user prompt based on mode
+    def _build_claude_prompts(self, problem_name: str, code_so_far: str, language: str, mode: str, advice: Optional[str] = None) -> Tuple[str, str, str]:
+        """
+        Build the prompts for Claude for either hint or code generation
+
+        Returns:
+            (system prompt, static instructions, per-request prompt). The static
+            instructions only depend on mode and language, so they form a cacheable
+            prefix; the problem, code and advice come last.
+        """
+
+        # Select system prompt and static instructions based on mode
         if mode == "hint":
             system_prompt = self.HINT_SYSTEM_PROMPT
-            user_prompt = f"""You are an expert coding mentor.
-
-TASK:
-Given the problem name, the user's current code, and the language, identify exactly the next **conceptual** step they should take — not the full solution.
+            instructions = self.HINT_INSTRUCTIONS
+        elif mode == "next_code":
+            system_prompt = self.CODE_SYSTEM_PROMPT
+            instructions = self.CODE_INSTRUCTIONS.replace("{language}", language)
+        else:
+            raise ValueError("Mode must be 'hint' or 'next_code'")
 
-<problem_name>
+        request_prompt = f"""<problem_name>
 {problem_name}
 </problem_name>
 
@@ -298,150 +554,153 @@ Given the problem name, the user's current code, and the language, identify exac
 
 <language>
 {language}
-</language>
+</language>"""
 
-PROCESS:
-1. Determine the user's current implementation state from these categories:
-   - just_starting
-   - wrong_approach
-   - mid_gap
-   - boundary_issue
-   - performance
-   - edge_case
-   - debug
-   - memo_needed
-   - finalize_output
-   - syntax_fix
-2. If a standard algorithmic pattern applies (DFS, DP, BFS, two_pointers, sliding_window, heap, etc.), briefly name it.
-3. State **only one** concise, plain-English next step.
-
-OUTPUT:
-- One JSON object in the form:
-  {{"hint":"<single next step in plain English>"}}
-
-RULES:
-- No full solutions.
-- No extra keys or formatting.
-- No commentary outside JSON.
-- Keep the hint under 25 words.
-- If the code is empty or unrelated, suggest the starting step.
+        # Add improvement advice if provided (for retrial)
+        if advice:
+            request_prompt += f"\n\n<improvement_advice>\nPrevious attempt was marked as poor. Improvement advice: {advice}\n</improvement_advice>"
 
-EXAMPLES:
-Input: Problem: "Two Sum", Code: def twoSum(nums, target): pass
-Output: {{"hint":"Use a hash map to store complements for O(n) lookup"}}
+        return system_prompt, instructions, request_prompt
 
-Input: Problem: "Binary Search", Code: while left <= right:
-Output: {{"hint":"Compute mid as (left + right) // 2 before comparisons"}}
+    def _claude_request_params(self, system_prompt: str, instructions: str, request_prompt: str, temperature: float = 0.1) -> Dict[str, Any]:
+        """
+        Keyword arguments for a Claude messages.create call
 
-Input: Problem: "Valid Parentheses", Code: def isValid(s): stack = []
-Output: {{"hint":"Iterate through characters, push opening brackets, pop and check closing ones"}}
+        The system prompt and static instructions come first and end in a cache
+        breakpoint, so repeated calls for the same mode/language read that prefix
+        from Anthropic's prompt cache; only the per-request block is new input.
+        """
+        return {
+            "model": "claude-3-5-sonnet-20241022",
+            "max_tokens": 160,  # Reduced for tighter outputs
+            "temperature": temperature,  # Low by default for more deterministic output
+            "timeout": 10.0,  # Per-request timeout
+            "stop_sequences": ["</end>", "---"],  # Prevent extra prose
+            "system": [
+                {"type": "text", "text": system_prompt}
+            ],
+            "messages": [
+                {"role": "user", "content": [
+                    {"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": request_prompt}
+                ]}
+            ]
+        }
 
-AVOID (counterexamples):
-❌ {{"hint":"You need to solve this problem"}} - Too vague
-❌ {{"hint":"Create a for loop that iterates through the array and checks each element against every other element"}} - Too long and detailed
-❌ {{"hint":"Use hash maps", "note":"extra key"}} - Extra keys not allowed"""
-            
-        elif mode == "next_code":
-            system_prompt = self.CODE_SYSTEM_PROMPT
-            user_prompt = f"""You are an expert coding mentor.
+    def get_claude_response(self, problem_name: str, code_so_far: str, language: str, mode: str, advice: Optional[str] = None) -> Dict[str, Any]:
+        """Get response from Claude for either hint or code generation"""
 
-TASK:
-Given the problem name, the user's current code, and the language, output exactly the **next small code snippet** (1–3 lines) they should write to progress.
+        with _PROMPT_BUILD.time():
+            prompts = self._build_claude_prompts(problem_name, code_so_far, language, mode, advice)
 
-<problem_name>
-{problem_name}
-</problem_name>
+        # Retry with exponential backoff
+        self._ensure_claude_client()
+        max_attempts = 3
+        for attempt in range(max_attempts):
+            try:
+                with _CLAUDE_CALL.time(), span("claude.call", mode=mode, retry=attempt) as call_span:
+                    response = self.claude_client.messages.create(
+                        **self._claude_request_params(*prompts)
+                    )
+                    call_span.set_attributes(**_claude_usage_attributes(response))
+                break  # Success, exit retry loop
+            except _claude_errors() as e:
+                PROVIDER_ERRORS.labels("claude", type(e).__name__).inc()
+                if attempt == max_attempts - 1:
+                    return {
+                        "success": False,
+                        "error": f"Claude API error after {max_attempts} attempts: {str(e)}"
+                    }
+                # Exponential backoff
+                with _BACKOFF.time(), span("backoff", provider="claude", seconds=2 ** attempt, error=type(e).__name__):
+                    time.sleep(2 ** attempt)
+                continue
 
-<code_so_far>
-{code_so_far}
-</code_so_far>
+        return self._parse_claude_message(response, prompts, mode)
 
-<language>
-{language}
-</language>
+    async def aget_claude_response(self, problem_name: str, code_so_far: str, language: str, mode: str, advice: Optional[str] = None, temperature: float = 0.1) -> Dict[str, Any]:
+        """Async variant of get_claude_response that never blocks the event loop"""
 
-PROCESS:
-1. Identify the user's current progress stage from:
-   - just_starting
-   - wrong_approach
-   - mid_gap
-   - minor_bug
-   - performance
-   - edge_case
-   - debug
-   - memo_needed
-   - finalize_output
-   - syntax_fix
-2. Internally note if a common algorithmic pattern applies (DFS, DP, BFS, two_pointers, sliding_window, heap, etc.), but do **not** mention it in output.
-3. Output only the single most useful next code line(s) in the specified language.
+        with _PROMPT_BUILD.time():
+            prompts = self._build_claude_prompts(problem_name, code_so_far, language, mode, advice)
 
-OUTPUT FORMAT:
-- One JSON object only:
-  {{"next_code":"<minimal {language} snippet with optional inline comment>"}}
-- Keep to **1–3 lines** (≤120 characters per line).
-- Use only the `{language}` provided.
-- Inline comment is optional but encouraged.
-- No full function/class definitions.
-- No markdown, extra keys, or explanations.
+        # Retry with exponential backoff
+        self._ensure_async_claude_client()
+        max_attempts = 3
+        for attempt in range(max_attempts):
+            try:
+                with _CLAUDE_CALL.time(), span("claude.call", mode=mode, retry=attempt, temperature=temperature) as call_span:
+                    response = await self.async_claude_client.messages.create(
+                        **self._claude_request_params(*prompts, temperature=temperature)
+                    )
+                    call_span.set_attributes(**_claude_usage_attributes(response))
+                break  # Success, exit retry loop
+            except _claude_errors() as e:
+                PROVIDER_ERRORS.labels("claude", type(e).__name__).inc()
+                if attempt == max_attempts - 1:
+                    return {
+                        "success": False,
+                        "error": f"Claude API error after {max_attempts} attempts: {str(e)}"
+                    }
+                # Exponential backoff
+                with _BACKOFF.time(), span("backoff", provider="claude", seconds=2 ** attempt, error=type(e).__name__):
+                    await asyncio.sleep(2 ** attempt)
+                continue
 
-EXAMPLES:
-Input: Problem: "Two Sum", Code: def twoSum(nums, target): pass
-Output: {{"next_code":"    hashmap = {{}}  # store num:index for O(1) lookup"}}
+        return self._parse_claude_message(response, prompts, mode)
 
-Input: Problem: "Binary Search", Code: while left <= right:
-Output: {{"next_code":"        mid = (left + right) // 2  # midpoint"}}
+    async def astream_claude_response(self, problem_name: str, code_so_far: str, language: str, mode: str, advice: Optional[str] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a Claude response, decoding the hint/next_code value as it arrives
 
-Input: Problem: "Merge Intervals", Code: # done merging, missing final add
-Output: {{"next_code":"    if current_interval: merged.append(current_interval)"}}
+        Yields ("delta", text) for each newly decoded piece of the value and finally
+        ("done", claude_result) with the same shape get_claude_response returns.
+        Connection errors are retried with backoff only until the first token is sent.
+        """
 
-AVOID (counterexamples):
-❌ {{"next_code":"def solve_problem():\\n    return solution"}} - Too complete, full function
-❌ {{"next_code":"# TODO: implement this"}} - No actual code
-❌ {{"next_code":"x = 1\\ny = 2\\nz = 3\\nresult = x+y+z"}} - Too many lines (>3)
+        with _PROMPT_BUILD.time():
+            prompts = self._build_claude_prompts(problem_name, code_so_far, language, mode, advice)
+        key = "hint" if mode == "hint" else "next_code"
 
-CONSTRAINTS:
-- Think step-by-step internally, but output only the JSON.
-- If code is empty or unrelated, start with the most basic setup line."""
-            
-        else:
-            raise ValueError("Mode must be 'hint' or 'next_code'")
-        
-        # Add improvement advice if provided (for retrial)
-        if advice:
-            user_prompt += f"\n\n<improvement_advice>\nPrevious attempt was marked as poor. Improvement advice: {advice}\n</improvement_advice>"
-        
-        # Retry with exponential backoff
+        self._ensure_async_claude_client()
         max_attempts = 3
         for attempt in range(max_attempts):
+            extractor = IncrementalFieldExtractor(key)
             try:
-                response = self.claude_client.messages.create(
-                    model="claude-3-5-sonnet-20241022",
-                    max_tokens=160,  # Reduced for tighter outputs
-                    temperature=0.1,  # Lower for more deterministic
-                    timeout=10.0,  # Per-request timeout
-                    stop_sequences=["</end>", "---"],  # Prevent extra prose
-                    system=system_prompt,
-                    messages=[
-                        {"role": "user", "content": user_prompt}
-                    ]
-                )
+                with _CLAUDE_CALL.time(), span("claude.stream", mode=mode, retry=attempt) as call_span:
+                    async with self.async_claude_client.messages.stream(
+                        **self._claude_request_params(*prompts)
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            delta = extractor.feed(text)
+                            if delta:
+                                yield "delta", delta
+                        response = await stream.get_final_message()
+                    call_span.set_attributes(**_claude_usage_attributes(response))
                 break  # Success, exit retry loop
-            except (APITimeoutError, RateLimitError, APIConnectionError, APIStatusError) as e:
-                if attempt == max_attempts - 1:
-                    return {
+            except _claude_errors() as e:
+                PROVIDER_ERRORS.labels("claude", type(e).__name__).inc()
+                if extractor.value or attempt == max_attempts - 1:
+                    yield "done", {
                         "success": False,
-                        "error": f"Claude API error after {max_attempts} attempts: {str(e)}"
+                        "error": f"Claude API error after {attempt + 1} attempts: {str(e)}"
                     }
+                    return
                 # Exponential backoff
-                time.sleep(2 ** attempt)
+                with _BACKOFF.time(), span("backoff", provider="claude", seconds=2 ** attempt, error=type(e).__name__):
+                    await asyncio.sleep(2 ** attempt)
                 continue
-        
+
+        yield "done", self._parse_claude_message(response, prompts, mode)
+
+    def _parse_claude_message(self, response: Any, prompts: Tuple[str, str, str], mode: str) -> Dict[str, Any]:
+        """Turn a Claude message into the result dict used by the attempt loop"""
         try:
-            
-            # Robust content extraction - join only TextBlocks
+
+            # Robust content extraction - join only text blocks
             parts = []
             for blk in response.content:
-                if isinstance(blk, TextBlock):
+                if getattr(blk, "type", None) == "text":
                     parts.append(blk.text)
                 elif isinstance(blk, dict) and blk.get("type") == "text":
                     parts.append(blk.get("text", ""))
@@ -453,15 +712,28 @@ CONSTRAINTS:
                     "error": "No text blocks in Claude response"
                 }
             
-            # Log Claude prediction
-            print(f"\n🤖 Claude Prediction ({mode}):")
-            print(f"   Response: {response_text}")
+            usage = getattr(response, "usage", None)
+            cache_read = getattr(usage, "cache_read_input_tokens", 0) or 0
+            cache_write = getattr(usage, "cache_creation_input_tokens", 0) or 0
             
+            # Log Claude prediction (full text only in sampled DEBUG payload logs)
+            log_event(logger, logging.DEBUG, "claude_response", mode=mode, chars=len(response_text),
+                      cache_read_tokens=cache_read, cache_write_tokens=cache_write)
+            if payload_logging(logger):
+                log_event(logger, logging.DEBUG, "claude_response_payload", mode=mode, response=response_text)
+
+            system_prompt, instructions, request_prompt = prompts
             return {
                 "success": True,
                 "response": response_text,
                 "system_prompt": system_prompt,
-                "user_prompt": user_prompt
+                "user_prompt": f"{instructions}\n\n{request_prompt}",
+                "usage": {
+                    "input_tokens": getattr(usage, "input_tokens", 0) or 0,  # Uncached input only
+                    "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+                    "cache_read_input_tokens": cache_read,
+                    "cache_creation_input_tokens": cache_write
+                }
             }
             
         except Exception as e:
@@ -470,12 +742,9 @@ CONSTRAINTS:
                 "error": str(e)
             }
 
-    def get_gpt_evaluation(self, claude_response: str, problem_name: str, code_so_far: str, mode: str) -> Dict[str, Any]:
-        """Get GPT's evaluation of Claude's response with mode-specific criteria"""
-        
-        # Ensure OpenAI client is initialized (will raise error if API key missing)
-        self._ensure_openai_client()
-        
+    def _gpt_request_params(self, claude_response: str, problem_name: str, code_so_far: str, mode: str) -> Dict[str, Any]:
+        """Keyword arguments for a GPT chat.completions.create evaluation call"""
+
         # Add mode-specific criteria to the prompt
         mode_specific_criteria = self._get_mode_specific_criteria(mode)
         
@@ -486,87 +755,137 @@ CONSTRAINTS:
             "claude_response": claude_response
         }
         
+        # Static evaluator instructions stay ahead of the per-request input so OpenAI's
+        # automatic prompt caching can reuse the shared prefix across evaluations
         prompt = f"{self.GPT_EVALUATOR_PROMPT}\n\n{mode_specific_criteria}\n\nEvaluation Input:\n{json.dumps(evaluation_input, indent=2)}"
-        
+
+        return {
+            "model": "gpt-4o-mini",  # Faster and cheaper
+            "messages": [
+                {"role": "system", "content": "You are an expert coding mentor. Respond with valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.1,
+            "max_tokens": 200,  # Increased to prevent JSON truncation
+            "timeout": 10.0,  # Per-request timeout
+            "extra_headers": {"X-Title": "HintEval"}  # For tracing
+        }
+
+    def get_gpt_evaluation(self, claude_response: str, problem_name: str, code_so_far: str, mode: str, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Get GPT's evaluation of Claude's response with mode-specific criteria
+
+        An identical evaluation request is answered from the evaluation cache
+        (marked "cached", without token usage) unless use_cache is False.
+        """
+
+        params = self._gpt_request_params(claude_response, problem_name, code_so_far, mode)
+        cache_key = make_evaluation_key(params)
+        cached = self.evaluation_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        # Ensure OpenAI client is initialized (will raise error if API key missing)
+        self._ensure_openai_client()
+
         max_attempts = 3
         for attempt in range(max_attempts):
             try:
-                response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",  # Faster and cheaper
-                    messages=[
-                        {"role": "system", "content": "You are an expert coding mentor. Respond with valid JSON only."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.1,
-                    max_tokens=200,  # Increased to prevent JSON truncation
-                    timeout=10.0,  # Per-request timeout
-                    extra_headers={"X-Title": "HintEval"}  # For tracing
-                )
+                with _GPT_CALL.time(), span("gpt.call", retry=attempt) as call_span:
+                    response = self.openai_client.chat.completions.create(**params)
+                    call_span.set_attributes(**_gpt_usage_attributes(response))
                 break  # Success, exit retry loop
-            except (openai.APITimeoutError, openai.RateLimitError, openai.APIConnectionError) as e:
+            except _gpt_errors() as e:
+                PROVIDER_ERRORS.labels("openai", type(e).__name__).inc()
                 if attempt == max_attempts - 1:
                     return {
                         "success": False,
                         "error": f"OpenAI API error after {max_attempts} attempts: {str(e)}"
                     }
                 # Exponential backoff
-                time.sleep(2 ** attempt)
+                with _BACKOFF.time(), span("backoff", provider="openai", seconds=2 ** attempt, error=type(e).__name__):
+                    time.sleep(2 ** attempt)
                 continue
-        
+
+        result = self._parse_gpt_completion(response, claude_response, problem_name, code_so_far)
+        if use_cache and result["success"]:
+            self.evaluation_cache.set(cache_key, {k: v for k, v in result.items() if k != "usage"})
+        return result
+
+    async def aget_gpt_evaluation(self, claude_response: str, problem_name: str, code_so_far: str, mode: str, use_cache: bool = True) -> Dict[str, Any]:
+        """Async variant of get_gpt_evaluation that never blocks the event loop"""
+
+        params = self._gpt_request_params(claude_response, problem_name, code_so_far, mode)
+        cache_key = make_evaluation_key(params)
+        cached = await self.evaluation_cache.aget(cache_key) if use_cache else None
+        if cached is not None:
+            return {**cached, "cached": True}
+
+        # Ensure OpenAI client is initialized (will raise error if API key missing)
+        self._ensure_async_openai_client()
+
+        max_attempts = 3
+        for attempt in range(max_attempts):
+            try:
+                with _GPT_CALL.time(), span("gpt.call", retry=attempt) as call_span:
+                    response = await self.async_openai_client.chat.completions.create(**params)
+                    call_span.set_attributes(**_gpt_usage_attributes(response))
+                break  # Success, exit retry loop
+            except _gpt_errors() as e:
+                PROVIDER_ERRORS.labels("openai", type(e).__name__).inc()
+                if attempt == max_attempts - 1:
+                    return {
+                        "success": False,
+                        "error": f"OpenAI API error after {max_attempts} attempts: {str(e)}"
+                    }
+                # Exponential backoff
+                with _BACKOFF.time(), span("backoff", provider="openai", seconds=2 ** attempt, error=type(e).__name__):
+                    await asyncio.sleep(2 ** attempt)
+                continue
+
+        result = self._parse_gpt_completion(response, claude_response, problem_name, code_so_far)
+        if use_cache and result["success"]:
+            await self.evaluation_cache.aset(cache_key, {k: v for k, v in result.items() if k != "usage"})
+        return result
+
+    def _parse_gpt_completion(self, response: Any, claude_response: str, problem_name: str, code_so_far: str) -> Dict[str, Any]:
+        """Turn a GPT completion into the evaluation result dict used by the attempt loop"""
         try:
-            
+
             response_text = response.choices[0].message.content.strip()
             
-            # Log GPT evaluation
-            print(f"\n⚖️ GPT Evaluation:")
-            print(f"   Input - Problem: {problem_name}")
-            print(f"   Input - Code: {code_so_far[:50]}{'...' if len(code_so_far) > 50 else ''}")
-            print(f"   Input - Claude Response: {claude_response[:50]}{'...' if len(claude_response) > 50 else ''}")
-            print(f"   GPT Raw Response: {response_text}")
-            
             # Parse JSON response with improved handling
-            evaluation = self.extract_json_from_response(response_text)
+            with _JSON_EXTRACTION.time():
+                evaluation = self.extract_json_from_response(response_text)
+            
+            if payload_logging(logger):
+                log_event(logger, logging.DEBUG, "gpt_evaluation_payload", problem=problem_name, code=code_so_far,
+                          claude_response=claude_response, response=response_text)
             
             if evaluation:
-                # Display overall results
-                overall_score = evaluation.get('overall_score', evaluation.get('score', 'N/A'))  # Fallback for old format
-                print(f"   📊 Overall Score: {overall_score}/5")
-                print(f"   ✅ Is Good: {evaluation.get('is_good', 'N/A')}")
-                
-                # Display detailed metrics if available
-                metrics = evaluation.get('metrics', {})
-                if metrics:
-                    print(f"   📈 Detailed Metrics:")
-                    print(f"      Technical Accuracy: {metrics.get('technical_accuracy', 'N/A')}/5")
-                    print(f"      Pedagogical Value: {metrics.get('pedagogical_value', 'N/A')}/5")
-                    print(f"      Clarity & Communication: {metrics.get('clarity_communication', 'N/A')}/5")
-                    print(f"      Contextual Relevance: {metrics.get('contextual_relevance', 'N/A')}/5")
-                
-                # Display mode compliance
-                mode_compliance = evaluation.get('mode_compliance', {})
-                if mode_compliance:
-                    follows_reqs = mode_compliance.get('follows_mode_requirements', 'N/A')
-                    mode_feedback = mode_compliance.get('mode_specific_feedback', '')
-                    print(f"   🎯 Mode Compliance: {follows_reqs}")
-                    if mode_feedback:
-                        print(f"      {mode_feedback[:80]}{'...' if len(mode_feedback) > 80 else ''}")
-                
-                # Display summary feedback
-                summary = evaluation.get('summary_feedback', evaluation.get('feedback', 'No feedback'))  # Fallback for old format
-                print(f"   💬 Summary: {summary[:100]}{'...' if len(summary) > 100 else ''}")
-                
-                # Show improvement advice if available
-                improvement_advice = evaluation.get('improvement_advice')
-                if improvement_advice and improvement_advice != "null":
-                    print(f"   🔧 Improvement Advice: {improvement_advice[:100]}{'...' if len(improvement_advice) > 100 else ''}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    mode_compliance = evaluation.get('mode_compliance') or {}
+                    log_event(logger, logging.DEBUG, "gpt_evaluation",
+                              overall_score=evaluation.get('overall_score', evaluation.get('score')),  # Fallback for old format
+                              is_good=evaluation.get('is_good'),
+                              metrics=evaluation.get('metrics') or None,
+                              follows_mode_requirements=mode_compliance.get('follows_mode_requirements'),
+                              has_improvement_advice=evaluation.get('improvement_advice') not in (None, "null"))
                 
+                usage = getattr(response, "usage", None)
+                details = getattr(usage, "prompt_tokens_details", None)
                 return {
                     "success": True,
-                    "evaluation": evaluation
+                    "evaluation": evaluation,
+                    "usage": {
+                        "input_tokens": getattr(usage, "prompt_tokens", 0) or 0,  # Includes cached tokens
+                        "output_tokens": getattr(usage, "completion_tokens", 0) or 0,
+                        "cached_tokens": getattr(details, "cached_tokens", 0) or 0
+                    }
                 }
             else:
-                print(f"   ❌ Failed to parse GPT evaluation JSON")
-                print(f"   📝 Raw response: {response_text[:300]}...")
+                log_event(logger, logging.WARNING, "gpt_evaluation_unparsable", chars=len(response_text),
+                          response_head=response_text[:300])
                 return {
                     "success": False,
                     "error": f"Invalid JSON from GPT: {response_text[:200]}..."
@@ -578,7 +897,269 @@ CONSTRAINTS:
                 "error": str(e)
             }
 
-    def generate_and_evaluate(self, problem_name: str, code_so_far: str, language: str = "python", mode: str = "hint", threshold: float = 3.0, max_retries: int = 0, use_evaluation: bool = False) -> Dict[str, Any]:
+    def _new_results(self, problem_name: str, code_so_far: str, language: str, mode: str) -> Dict[str, Any]:
+        """Empty result dict shared by the sync and async attempt loops"""
+        return {
+            "problem_name": problem_name,
+            "code_so_far": code_so_far,
+            "language": language,
+            "mode": mode,
+            "attempts": [],
+            "final_response": None,
+            "final_parsed": None,  # Add parsed JSON result
+            "final_evaluation": None,
+            "success": False,
+            "cached": False,
+            "coalesced": False
+        }
+
+    def _validate_claude_result(self, claude_result: Dict[str, Any], mode: str, code_so_far: str = "", language: str = "python") -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Quick local validation of a successful Claude result (JSON, schema and,
+        for next_code, whether the snippet parses where it would be inserted)
+
+        Returns:
+            (parsed JSON, None, None) when valid, otherwise (None, error, advice for the next attempt)
+        """
+        with _JSON_EXTRACTION.time():
+            response_json = self.extract_json_from_response(claude_result["response"])
+
+        if response_json is None:
+            SCHEMA_FAILURES.labels("invalid_json").inc()
+            return None, "Invalid JSON", "Please ensure your response is valid JSON format"
+
+        with _SCHEMA_VALIDATION.time():
+            is_valid, schema_error = self.is_valid_schema(response_json, mode)
+            if is_valid and mode == "next_code":
+                is_valid, syntax_error, syntax_advice = validate_snippet(response_json["next_code"], code_so_far, language)
+                if not is_valid:
+                    SCHEMA_FAILURES.labels("snippet_syntax").inc()
+                    return None, syntax_error, syntax_advice
+        if not is_valid:
+            SCHEMA_FAILURES.labels("schema").inc()
+            return None, f"Schema validation failed: {schema_error}", f"Schema error: {schema_error}. Please fix your response format."
+
+        return response_json, None, None
+
+    def _accept_without_evaluation(self, results: Dict[str, Any], attempt: int, claude_result: Dict[str, Any], response_json: Dict[str, Any], advice: Optional[str]) -> None:
+        """Accept a valid schema response when evaluation is disabled"""
+        no_eval_result = {
+            "score": None,
+            "is_good": True,
+            "feedback": "No evaluation - accepted valid schema response"
+        }
+
+        results["attempts"].append({
+            "attempt": attempt + 1,
+            "claude_result": claude_result,
+            "gpt_evaluation": {"success": True, "evaluation": no_eval_result},
+            "advice_used": advice
+        })
+        _attempt_outcome("accepted")
+        results["final_response"] = claude_result["response"]
+        results["final_parsed"] = response_json  # Store parsed JSON
+        results["final_evaluation"] = no_eval_result
+        results["success"] = True
+
+    def _record_evaluated_attempt(self, results: Dict[str, Any], attempt: int, claude_result: Dict[str, Any], response_json: Dict[str, Any], gpt_result: Dict[str, Any], advice: Optional[str], threshold: float, max_retries: int) -> Tuple[bool, Optional[str]]:
+        """
+        Record a GPT-evaluated attempt
+
+        Returns:
+            (done, advice for the next attempt)
+        """
+        results["attempts"].append({
+            "attempt": attempt + 1,
+            "claude_result": claude_result,
+            "gpt_evaluation": gpt_result,
+            "advice_used": advice
+        })
+
+        if not gpt_result["success"]:
+            # Record negative evaluation and continue
+            _attempt_outcome("evaluation_failed")
+            return False, "GPT evaluation failed - please ensure valid JSON format"
+
+        evaluation = gpt_result["evaluation"]
+        score = evaluation.get("overall_score", evaluation.get("score", 0))  # Handle both old and new format
+
+        _attempt_outcome("accepted" if score >= threshold else "below_threshold", score=score,
+                         prescore=gpt_result.get("prescore"))
+        if score >= threshold or attempt == max_retries:
+            # Either good response or max retries reached
+            results["final_response"] = claude_result["response"]
+            results["final_parsed"] = response_json  # Store parsed JSON
+            results["final_evaluation"] = evaluation
+            results["success"] = True
+            return True, advice
+
+        # Get improvement advice for next attempt
+        return False, evaluation.get("improvement_advice")
+
+    def _prescore_evaluation(self, response_json: Dict[str, Any], mode: str, code_so_far: str, threshold: float) -> Optional[Dict[str, Any]]:
+        """
+        Score a valid response locally
+
+        Returns:
+            A GPT-shaped evaluation result when the local score is decisive (the GPT
+            call is skipped), or None when GPT should evaluate
+        """
+        result = prescore(response_json, mode, code_so_far)
+        decision = prescore_decision(result["score"], threshold, self.prescore_accept, self.prescore_reject)
+        self.prescore_stats[decision] += 1
+        if decision == "uncertain":
+            return None
+
+        log_event(logger, logging.DEBUG, "prescore_decided", score=result['score'], decision=decision)
+        return {"success": True, "evaluation": local_evaluation(result, threshold), "prescore": decision}
+
+    def _cache_key(self, problem_name: str, code_so_far: str, language: str, mode: str, use_evaluation: bool, settings: Tuple[Any, ...] = (), strategy: str = "serial") -> str:
+        """Response cache key for a generation request (see response_cache_key)"""
+        return response_cache_key(problem_name, code_so_far, language, mode, use_evaluation, settings, strategy)
+
+    def _cached_results(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of cached results for cache_key, or None on a miss"""
+        return _as_cached(self.response_cache.get(cache_key))
+
+    async def _acached_results(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Async variant of _cached_results; a SQLite lookup runs off the event loop"""
+        return _as_cached(await self.response_cache.aget(cache_key))
+
+    def _store_results(self, cache_key: str, results: Dict[str, Any]) -> None:
+        """Cache successful results without the per-attempt prompt/response history"""
+        if results["success"]:
+            self.response_cache.set(cache_key, {k: v for k, v in results.items() if k != "attempts"})
+
+    async def _astore_results(self, cache_key: str, results: Dict[str, Any]) -> None:
+        """Async variant of _store_results; a SQLite write runs off the event loop"""
+        if results["success"]:
+            await self.response_cache.aset(cache_key, {k: v for k, v in results.items() if k != "attempts"})
+
+    async def _cached_or_coalesced(self, cache_key: str, use_cache: bool, generate) -> Dict[str, Any]:
+        """Serve from the response cache, join an identical in-flight generation, or run generate()"""
+        if not use_cache:
+            return await generate()
+
+        cached = await self._acached_results(cache_key)
+        if cached is not None:
+            return cached
+
+        results, shared = await self.inflight.do(cache_key, generate)
+        if shared:
+            return {**results, "coalesced": True}
+        return results
+
+    def _usage_totals(self, attempts: list) -> Dict[str, int]:
+        """Sum provider token usage over all attempts"""
+        totals = {"claude_input_tokens": 0, "claude_output_tokens": 0, "gpt_input_tokens": 0, "gpt_output_tokens": 0,
+                  "claude_cache_read_tokens": 0, "claude_cache_write_tokens": 0, "gpt_cached_tokens": 0}
+        for attempt in attempts:
+            claude_usage = (attempt.get("claude_result") or {}).get("usage") or {}
+            gpt_usage = (attempt.get("gpt_evaluation") or {}).get("usage") or {}
+            totals["claude_input_tokens"] += claude_usage.get("input_tokens", 0)
+            totals["claude_output_tokens"] += claude_usage.get("output_tokens", 0)
+            totals["gpt_input_tokens"] += gpt_usage.get("input_tokens", 0)
+            totals["gpt_output_tokens"] += gpt_usage.get("output_tokens", 0)
+            totals["claude_cache_read_tokens"] += claude_usage.get("cache_read_input_tokens", 0)
+            totals["claude_cache_write_tokens"] += claude_usage.get("cache_creation_input_tokens", 0)
+            totals["gpt_cached_tokens"] += gpt_usage.get("cached_tokens", 0)
+        return totals
+
+    def _summarize_results(self, results: Dict[str, Any], started: Optional[float]) -> None:
+        """Attach token usage; started (perf_counter) times the attempt loop"""
+        if started is not None:
+            _GENERATE.observe(time.perf_counter() - started)
+        results["usage"] = self._usage_totals(results["attempts"])
+        current_span().set_attributes(attempts=len(results["attempts"]), success=results["success"], **results["usage"])
+
+    def _finish_results(self, cache_key: str, results: Dict[str, Any], use_cache: bool, started: Optional[float] = None) -> Dict[str, Any]:
+        """Attach token usage and cache successful results"""
+        self._summarize_results(results, started)
+        if use_cache:
+            self._store_results(cache_key, results)
+        return results
+
+    async def _afinish_results(self, cache_key: str, results: Dict[str, Any], use_cache: bool, started: Optional[float] = None) -> Dict[str, Any]:
+        """Async variant of _finish_results"""
+        self._summarize_results(results, started)
+        if use_cache:
+            await self._astore_results(cache_key, results)
+        return results
+
+    def _compact_for_prompt(self, code_so_far: str, language: str) -> Tuple[str, Dict[str, Any]]:
+        """Compacted code for the Claude/GPT prompts plus compaction stats for the results"""
+        prompt_code, stats = compact_code(code_so_far, language, self.code_token_budget, self.code_compaction_min_tokens)
+        if stats["applied"]:
+            log_event(logger, logging.DEBUG, "code_compacted", original_tokens=stats['original_tokens'],
+                      compacted_tokens=stats['compacted_tokens'], ratio=stats['ratio'], elapsed_ms=stats['elapsed_ms'])
+        return prompt_code, stats
+
+    async def _acompact_for_prompt(self, code_so_far: str, language: str) -> Tuple[str, Dict[str, Any]]:
+        """Async variant of _compact_for_prompt; compaction parses the code, so it runs off the event loop"""
+        return await asyncio.to_thread(self._compact_for_prompt, code_so_far, language)
+
+    def _attempt_steps(self, results: Dict[str, Any], problem_name: str, code_so_far: str, prompt_code: str, language: str, mode: str, threshold: float, max_retries: int, use_evaluation: bool) -> Generator[Tuple[Any, ...], Dict[str, Any], None]:
+        """
+        Attempt/retry/evaluate loop shared by the sync, async and streaming APIs
+
+        Provider calls are left to the caller: the generator yields
+        ("claude", attempt, advice) and ("gpt", claude_response) requests and is sent
+        back the provider result, recording every attempt in results.
+        """
+        advice = None
+
+        last_attempt = max_retries
+        for attempt in range(max_retries + 2):  # One extra attempt is reserved for a snippet syntax fix
+            if attempt > last_attempt:
+                break
+
+            with _ATTEMPT.time(), span("attempt", attempt=attempt + 1, mode=mode):
+                # Get Claude response
+                claude_result = yield "claude", attempt, advice
+
+                if not claude_result["success"]:
+                    _attempt_outcome("provider_error")
+                    results["attempts"].append({
+                        "attempt": attempt + 1,
+                        "claude_result": claude_result,
+                        "gpt_evaluation": None,
+                        "advice_used": advice
+                    })
+                    continue
+
+                # Quick local validation first (JSON + schema), skip evaluation on failure
+                response_json, local_error, local_advice = self._validate_claude_result(claude_result, mode, code_so_far, language)
+                if response_json is None:
+                    _attempt_outcome("invalid", error=local_error)
+                    results["attempts"].append({
+                        "attempt": attempt + 1,
+                        "claude_result": claude_result,
+                        "gpt_evaluation": {"success": False, "error": local_error},
+                        "advice_used": advice
+                    })
+                    advice = local_advice
+                    if local_error.startswith(SNIPPET_SYNTAX_ERROR) and attempt == max_retries:
+                        last_attempt = max_retries + 1  # Broken snippet: one immediate retry with the precise error
+                    continue
+
+                # If evaluation is disabled, accept any valid schema response
+                if not use_evaluation:
+                    self._accept_without_evaluation(results, attempt, claude_result, response_json, advice)
+                    break
+
+                # Local pre-score first; GPT only evaluates responses it can't call
+                gpt_result = self._prescore_evaluation(response_json, mode, prompt_code, threshold)
+                if gpt_result is None:
+                    with _GPT_EVALUATION.time(), span("gpt.evaluation"):
+                        gpt_result = yield "gpt", claude_result["response"]
+
+                done, advice = self._record_evaluated_attempt(
+                    results, attempt, claude_result, response_json, gpt_result, advice, threshold, last_attempt
+                )
+                if done:
+                    break
+
+    def generate_and_evaluate(self, problem_name: str, code_so_far: str, language: str = "python", mode: str = "hint", threshold: float = 3.0, max_retries: int = 0, use_evaluation: bool = False, use_cache: bool = True) -> Dict[str, Any]:
         """
         Generate hint/code with Claude and optionally evaluate with GPT, with optional retrial
         
@@ -590,117 +1171,238 @@ CONSTRAINTS:
             threshold: Score threshold below which to retry (default: 3.0)
             max_retries: Maximum number of retries (default: 0)
             use_evaluation: Whether to use GPT evaluation (default: False)
+            use_cache: Whether to serve/store results from the response cache (default: True)
         
         Returns:
             Dictionary with final response and evaluation details
         """
-        
-        results = {
-            "problem_name": problem_name,
-            "code_so_far": code_so_far,
-            "language": language,
-            "mode": mode,
-            "attempts": [],
-            "final_response": None,
-            "final_parsed": None,  # Add parsed JSON result
-            "final_evaluation": None,
-            "success": False
-        }
-        
-        advice = None
-        
-        for attempt in range(max_retries + 1):
-            # Get Claude response
-            claude_result = self.get_claude_response(problem_name, code_so_far, language, mode, advice)
-            
-            if not claude_result["success"]:
-                results["attempts"].append({
-                    "attempt": attempt + 1,
-                    "claude_result": claude_result,
-                    "gpt_evaluation": None,
-                    "advice_used": advice
-                })
-                continue
-            
-            # Quick local validation first
-            response_json = self.extract_json_from_response(claude_result["response"])
-            
-            if response_json is None:
-                # Invalid JSON, skip evaluation and continue to next attempt
-                results["attempts"].append({
-                    "attempt": attempt + 1,
-                    "claude_result": claude_result,
-                    "gpt_evaluation": {"success": False, "error": "Invalid JSON"},
-                    "advice_used": advice
-                })
-                advice = "Please ensure your response is valid JSON format"
-                continue
-            
-            # Schema validation
-            is_valid, schema_error = self.is_valid_schema(response_json, mode)
-            if not is_valid:
-                # Failed schema check, skip evaluation and continue
-                results["attempts"].append({
-                    "attempt": attempt + 1,
-                    "claude_result": claude_result,
-                    "gpt_evaluation": {"success": False, "error": f"Schema validation failed: {schema_error}"},
-                    "advice_used": advice
-                })
-                advice = f"Schema error: {schema_error}. Please fix your response format."
-                continue
-            
-            # If evaluation is disabled, accept any valid schema response
-            if not use_evaluation:
-                no_eval_result = {
+
+        cache_key = self._cache_key(problem_name, code_so_far, language, mode, use_evaluation, (float(threshold), max_retries))
+        # One trace per request: the attempts and provider calls below are children of this span
+        with span("generate", mode=mode, use_evaluation=use_evaluation) as generate_span:
+            if use_cache:
+                cached = self._cached_results(cache_key)
+                if cached is not None:
+                    generate_span.set_attributes(cached=True, coalesced=False)
+                    return cached
+
+            results = self._new_results(problem_name, code_so_far, language, mode)
+            prompt_code, results["compaction"] = self._compact_for_prompt(code_so_far, language)
+            started = time.perf_counter()
+
+            steps = self._attempt_steps(results, problem_name, code_so_far, prompt_code, language, mode, threshold, max_retries, use_evaluation)
+            request = _next_step(steps, None)
+            while request is not None:
+                if request[0] == "claude":
+                    reply = self.get_claude_response(problem_name, prompt_code, language, mode, request[2])
+                else:
+                    reply = self.get_gpt_evaluation(request[1], problem_name, prompt_code, mode, use_cache)
+                request = _next_step(steps, reply)
+
+            generate_span.set_attributes(cached=False, coalesced=False)
+            return self._finish_results(cache_key, results, use_cache, started)
+
+    async def agenerate_and_evaluate(self, problem_name: str, code_so_far: str, language: str = "python", mode: str = "hint", threshold: float = 3.0, max_retries: int = 0, use_evaluation: bool = False, use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Async variant of generate_and_evaluate
+
+        Same arguments and return value, but every provider call and backoff sleep is
+        awaited so many requests can be in flight on a single event loop.
+        """
+
+        cache_key = self._cache_key(problem_name, code_so_far, language, mode, use_evaluation, (float(threshold), max_retries))
+        with span("generate", mode=mode, use_evaluation=use_evaluation) as generate_span:
+            results = await self._cached_or_coalesced(cache_key, use_cache, lambda: self._agenerate_attempts(
+                cache_key, problem_name, code_so_far, language, mode, threshold, max_retries, use_evaluation, use_cache
+            ))
+            generate_span.set_attributes(cached=results.get("cached", False), coalesced=results.get("coalesced", False))
+        return results
+
+    async def _agenerate_attempts(self, cache_key: str, problem_name: str, code_so_far: str, language: str, mode: str, threshold: float, max_retries: int, use_evaluation: bool, use_cache: bool) -> Dict[str, Any]:
+        """Attempt loop behind agenerate_and_evaluate (cache lookup already done)"""
+        results = None
+        async for event, payload in self._aattempt_events(cache_key, problem_name, code_so_far, language, mode, threshold, max_retries, use_evaluation, use_cache, stream=False):
+            if event == "complete":
+                results = payload
+        return results
+
+    async def _aattempt_events(self, cache_key: str, problem_name: str, code_so_far: str, language: str, mode: str, threshold: float, max_retries: int, use_evaluation: bool, use_cache: bool, stream: bool) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Run _attempt_steps with the async providers
+
+        With stream, Claude responses are streamed and ("token", text) / ("reset", info)
+        events are yielded as they arrive; the last event is always ("complete", results).
+        """
+        results = self._new_results(problem_name, code_so_far, language, mode)
+        prompt_code, results["compaction"] = await self._acompact_for_prompt(code_so_far, language)
+        started = time.perf_counter()
+
+        steps = self._attempt_steps(results, problem_name, code_so_far, prompt_code, language, mode, threshold, max_retries, use_evaluation)
+        request = _next_step(steps, None)
+        while request is not None:
+            if request[0] == "gpt":
+                reply = await self.aget_gpt_evaluation(request[1], problem_name, prompt_code, mode, use_cache)
+            elif not stream:
+                reply = await self.aget_claude_response(problem_name, prompt_code, language, mode, request[2])
+            else:
+                _, attempt, advice = request
+                if attempt > 0:
+                    yield "reset", {"attempt": attempt + 1, "advice": advice}
+                async for event, payload in self.astream_claude_response(problem_name, prompt_code, language, mode, advice):
+                    if event == "delta":
+                        yield "token", payload
+                    else:
+                        reply = payload
+            request = _next_step(steps, reply)
+
+        yield "complete", await self._afinish_results(cache_key, results, use_cache, started)
+
+    async def astream_generate_and_evaluate(self, problem_name: str, code_so_far: str, language: str = "python", mode: str = "hint", threshold: float = 3.0, max_retries: int = 0, use_evaluation: bool = False, use_cache: bool = True) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Streaming variant of agenerate_and_evaluate
+
+        Yields ("token", text) as the hint/next_code value is decoded, ("reset", info)
+        when an attempt is discarded and a new one starts streaming, and finally
+        ("complete", results) with the same results dict agenerate_and_evaluate returns.
+        """
+
+        cache_key = self._cache_key(problem_name, code_so_far, language, mode, use_evaluation, (float(threshold), max_retries))
+        if use_cache:
+            cached = await self._acached_results(cache_key)
+            if cached is not None:
+                key = "hint" if mode == "hint" else "next_code"
+                yield "token", (cached.get("final_parsed") or {}).get(key, "")
+                yield "complete", cached
+                return
+
+        async for event, payload in self._aattempt_events(cache_key, problem_name, code_so_far, language, mode, threshold, max_retries, use_evaluation, use_cache, stream=True):
+            yield event, payload
+
+    async def agenerate_fanout(self, problem_name: str, code_so_far: str, language: str = "python", mode: str = "hint", threshold: float = 3.0, num_candidates: int = 3, use_evaluation: bool = False, use_cache: bool = True, early_exit: bool = True) -> Dict[str, Any]:
+        """
+        Generate candidates concurrently instead of retrying serially
+
+        Starts num_candidates Claude calls at once with increasing temperature,
+        validates each locally as it arrives and evaluates the survivors with GPT
+        concurrently. Returns the best-scoring candidate, or the first one that
+        clears threshold when early_exit is set (outstanding calls are cancelled).
+        Without evaluation the first valid candidate wins.
+
+        Returns:
+            Same dictionary as agenerate_and_evaluate, plus a "fanout" summary
+        """
+
+        cache_key = self._cache_key(problem_name, code_so_far, language, mode, use_evaluation, (float(threshold), num_candidates, early_exit), strategy="fanout")
+        with span("generate.fanout", mode=mode, use_evaluation=use_evaluation, candidates=num_candidates) as generate_span:
+            results = await self._cached_or_coalesced(cache_key, use_cache, lambda: self._agenerate_candidates(
+                cache_key, problem_name, code_so_far, language, mode, threshold, num_candidates, use_evaluation, use_cache, early_exit
+            ))
+            generate_span.set_attributes(cached=results.get("cached", False), coalesced=results.get("coalesced", False))
+        return results
+
+    async def _agenerate_candidates(self, cache_key: str, problem_name: str, code_so_far: str, language: str, mode: str, threshold: float, num_candidates: int, use_evaluation: bool, use_cache: bool, early_exit: bool) -> Dict[str, Any]:
+        """Candidate fan-out behind agenerate_fanout (cache lookup already done)"""
+
+        start = time.perf_counter()
+        results = self._new_results(problem_name, code_so_far, language, mode)
+        prompt_code, results["compaction"] = await self._acompact_for_prompt(code_so_far, language)
+        temperatures = [round(min(1.0, 0.1 + 0.3 * i), 2) for i in range(max(1, num_candidates))]
+
+        pending = {}
+        for index, temperature in enumerate(temperatures):
+            task = asyncio.create_task(
+                self.aget_claude_response(problem_name, prompt_code, language, mode, temperature=temperature)
+            )
+            pending[task] = ("claude", index)
+
+        candidates: Dict[int, Dict[str, Any]] = {}
+        parsed: Dict[int, Dict[str, Any]] = {}
+        best = None  # (score, index)
+        stopped_early = False
+
+        try:
+            while pending and not stopped_early:
+                done, _ = await asyncio.wait(pending.keys(), return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    kind, index = pending.pop(task)
+
+                    if kind == "claude":
+                        claude_result = task.result()
+                        candidates[index] = {
+                            "attempt": index + 1,
+                            "temperature": temperatures[index],
+                            "claude_result": claude_result,
+                            "gpt_evaluation": None,
+                            "advice_used": None
+                        }
+                        if not claude_result["success"]:
+                            continue
+
+                        # Quick local validation first (JSON + schema), skip evaluation on failure
+                        response_json, local_error, _ = self._validate_claude_result(claude_result, mode, code_so_far, language)
+                        if response_json is None:
+                            candidates[index]["gpt_evaluation"] = {"success": False, "error": local_error}
+                            continue
+                        parsed[index] = response_json
+
+                        if not use_evaluation:
+                            # First valid candidate wins
+                            best = (None, index)
+                            stopped_early = True
+                            break
+
+                        # Local pre-score first; GPT only evaluates candidates it can't call
+                        gpt_result = self._prescore_evaluation(response_json, mode, prompt_code, threshold)
+                        if gpt_result is None:
+                            eval_task = asyncio.create_task(
+                                self.aget_gpt_evaluation(claude_result["response"], problem_name, prompt_code, mode, use_cache)
+                            )
+                            pending[eval_task] = ("gpt", index)
+                            continue
+                    else:
+                        gpt_result = task.result()
+
+                    candidates[index]["gpt_evaluation"] = gpt_result
+                    if not gpt_result["success"]:
+                        continue
+
+                    evaluation = gpt_result["evaluation"]
+                    score = evaluation.get("overall_score", evaluation.get("score", 0))  # Handle both old and new format
+                    if best is None or score > best[0]:
+                        best = (score, index)
+                    if early_exit and score >= threshold:
+                        stopped_early = True
+                        break
+        finally:
+            # Cancel outstanding provider calls after an early exit (or on error)
+            for task in pending:
+                task.cancel()
+
+        results["attempts"] = [candidates[i] for i in sorted(candidates)]
+
+        if best is not None:
+            _, index = best
+            winner = candidates[index]
+            if use_evaluation:
+                evaluation = winner["gpt_evaluation"]["evaluation"]
+            else:
+                evaluation = {
                     "score": None,
                     "is_good": True,
                     "feedback": "No evaluation - accepted valid schema response"
                 }
-                
-                attempt_data = {
-                    "attempt": attempt + 1,
-                    "claude_result": claude_result,
-                    "gpt_evaluation": {"success": True, "evaluation": no_eval_result},
-                    "advice_used": advice
-                }
-                results["attempts"].append(attempt_data)
-                results["final_response"] = claude_result["response"]
-                results["final_parsed"] = response_json  # Store parsed JSON
-                results["final_evaluation"] = no_eval_result
-                results["success"] = True
-                break
-            
-            # Get GPT evaluation
-            gpt_result = self.get_gpt_evaluation(
-                claude_result["response"], problem_name, code_so_far, mode
-            )
-            
-            attempt_data = {
-                "attempt": attempt + 1,
-                "claude_result": claude_result,
-                "gpt_evaluation": gpt_result,
-                "advice_used": advice
-            }
-            results["attempts"].append(attempt_data)
-            
-            if not gpt_result["success"]:
-                # Record negative evaluation and continue
-                advice = "GPT evaluation failed - please ensure valid JSON format"
-                continue
-            
-            evaluation = gpt_result["evaluation"]
-            score = evaluation.get("overall_score", evaluation.get("score", 0))  # Handle both old and new format
-            is_good = evaluation.get("is_good", False)
-            
-            if score >= threshold or attempt == max_retries:
-                # Either good response or max retries reached
-                results["final_response"] = claude_result["response"]
-                results["final_parsed"] = response_json  # Store parsed JSON
-                results["final_evaluation"] = evaluation
-                results["success"] = True
-                break
-            else:
-                # Get improvement advice for next attempt
-                advice = evaluation.get("improvement_advice")
-        
-        return results 
\ No newline at end of file
+                winner["gpt_evaluation"] = {"success": True, "evaluation": evaluation}
+            results["final_response"] = winner["claude_result"]["response"]
+            results["final_parsed"] = parsed[index]
+            results["final_evaluation"] = evaluation
+            results["success"] = True
+
+        results["fanout"] = {
+            "candidates": len(temperatures),
+            "completed": len(candidates),
+            "cancelled": len(pending),
+            "early_exit": stopped_early,
+            "winner": best[1] + 1 if best is not None else None,
+            "latency_s": round(time.perf_counter() - start, 4)
+        }
+        return await self._afinish_results(cache_key, results, use_cache, start)
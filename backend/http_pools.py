@@ -0,0 +1,196 @@
+"""
+Shared, tuned HTTP connection pools for the provider SDK clients
+
+One httpx client per provider and sync/async flavour is created on first use
+and handed to the Anthropic/OpenAI SDKs as http_client, so every SDK client in
+the process reuses the same keep-alive connections. Limits come from the
+environment, and HTTP/2 is used when the h2 package is installed (concurrent
+requests multiplex over one connection instead of opening one each).
+awarm_up() opens connections ahead of the first real request, and every pool
+reports its connections, in-flight requests, cold connects and saturation to
+/metrics (metrics.py).
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from metrics import POOL_CONNECTIONS, POOL_MAX_CONNECTIONS, POOL_IN_FLIGHT, POOL_COLD_REQUESTS, POOL_SATURATED
+
+
+def http2_available() -> bool:
+    return importlib.util.find_spec("h2") is not None
+
+
+class PoolSettings:
+    """Connection-pool limits for the provider HTTP clients"""
+
+    def __init__(self, max_connections: int = 100, max_keepalive: int = 20, keepalive_expiry: float = 60.0,
+                 http2: bool = False):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        # httpx closes idle connections after 5s by default, so a quiet minute meant a fresh TLS handshake
+        self.keepalive_expiry = keepalive_expiry
+        self.http2 = http2
+
+    @classmethod
+    def from_env(cls) -> "PoolSettings":
+        """
+        PROVIDER_MAX_CONNECTIONS, PROVIDER_MAX_KEEPALIVE, PROVIDER_KEEPALIVE_EXPIRY
+        (seconds) and PROVIDER_HTTP2 (auto | true | false; auto uses HTTP/2 when h2
+        is installed)
+        """
+        http2 = os.getenv("PROVIDER_HTTP2", "auto").strip().lower()
+        return cls(
+            max_connections=int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100")),
+            max_keepalive=int(os.getenv("PROVIDER_MAX_KEEPALIVE", "20")),
+            keepalive_expiry=float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "60")),
+            http2=http2_available() if http2 == "auto" else http2 == "true"
+        )
+
+
+def _httpx_module(client_class: type) -> Any:
+    """The httpx module an SDK's default client class is built on (httpx, or a fork with its API)"""
+    for base in client_class.__mro__:
+        if base.__name__ in ("Client", "AsyncClient"):
+            return importlib.import_module(base.__module__.split(".")[0])
+    raise TypeError(f"{client_class.__name__} is not an httpx client class")
+
+
+class _PoolStats:
+    """Saturation bookkeeping for one pool, exported through the POOL_* metrics"""
+
+    def __init__(self, provider: str, flavour: str, pool: Any, max_connections: int):
+        self.pool = pool
+        self.max_connections = max_connections
+        self.in_flight = POOL_IN_FLIGHT.labels(provider, flavour)
+        self.cold = POOL_COLD_REQUESTS.labels(provider, flavour)
+        self.saturated = POOL_SATURATED.labels(provider, flavour)
+        POOL_MAX_CONNECTIONS.labels(provider, flavour).set(max_connections)
+        POOL_CONNECTIONS.labels(provider, flavour, "active").set_function(lambda: self.connections()[0])
+        POOL_CONNECTIONS.labels(provider, flavour, "idle").set_function(lambda: self.connections()[1])
+
+    def connections(self) -> Tuple[int, int]:
+        """(active, idle) connections currently in the pool"""
+        connections = self.pool.connections
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return len(connections) - idle, idle
+
+    def started(self) -> None:
+        if self.in_flight.value >= self.max_connections:
+            self.saturated.inc()
+        elif not any(connection.is_available() for connection in self.pool.connections):
+            self.cold.inc()
+        self.in_flight.inc()
+
+    def finished(self) -> None:
+        self.in_flight.dec()
+
+
+class _TrackedTransport:
+    """Delegates to an httpx transport, counting requests until their response headers arrive"""
+
+    def __init__(self, transport: Any, stats: _PoolStats):
+        self.transport = transport
+        self.stats = stats
+
+    def handle_request(self, request: Any) -> Any:
+        self.stats.started()
+        try:
+            return self.transport.handle_request(request)
+        finally:
+            self.stats.finished()
+
+    def close(self) -> None:
+        self.transport.close()
+
+    def __enter__(self) -> "_TrackedTransport":
+        self.transport.__enter__()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.transport.__exit__(*exc)
+
+
+class _AsyncTrackedTransport:
+    """Async counterpart of _TrackedTransport"""
+
+    def __init__(self, transport: Any, stats: _PoolStats):
+        self.transport = transport
+        self.stats = stats
+
+    async def handle_async_request(self, request: Any) -> Any:
+        self.stats.started()
+        try:
+            return await self.transport.handle_async_request(request)
+        finally:
+            self.stats.finished()
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    async def __aenter__(self) -> "_AsyncTrackedTransport":
+        await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.transport.__aexit__(*exc)
+
+
+def make_http_client(provider: str, default_client_class: type, is_async: bool,
+                     settings: Optional[PoolSettings] = None) -> Any:
+    """
+    New http_client of default_client_class (e.g. anthropic.DefaultAsyncHttpxClient,
+    keeping the SDK's defaults) on a pool with settings, reporting to /metrics
+    under provider
+    """
+    settings = settings or PoolSettings.from_env()
+    httpx = _httpx_module(default_client_class)
+    limits = httpx.Limits(max_connections=settings.max_connections,
+                          max_keepalive_connections=settings.max_keepalive,
+                          keepalive_expiry=settings.keepalive_expiry)
+    transport_class = httpx.AsyncHTTPTransport if is_async else httpx.HTTPTransport
+    transport = transport_class(limits=limits, http2=settings.http2)
+    stats = _PoolStats(provider, "async" if is_async else "sync", transport._pool, settings.max_connections)
+    tracked = _AsyncTrackedTransport(transport, stats) if is_async else _TrackedTransport(transport, stats)
+    return default_client_class(transport=tracked)
+
+
+_shared: Dict[Tuple[str, bool], Any] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_http_client(provider: str, default_client_class: type, is_async: bool) -> Any:
+    """Process-wide http_client for provider (see make_http_client), created on first use"""
+    with _shared_lock:
+        client = _shared.get((provider, is_async))
+        if client is None:
+            client = _shared[(provider, is_async)] = make_http_client(provider, default_client_class, is_async)
+        return client
+
+
+def warm_up(http_client: Any, url: str, connections: int = 2, timeout: float = 5.0) -> int:
+    """
+    Open up to connections keep-alive connections to url's host with concurrent
+    HEAD requests (no auth, no tokens); returns how many succeeded
+    """
+    def head(_) -> bool:
+        try:
+            http_client.head(url, timeout=timeout)
+            return True
+        except Exception:
+            return False
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        return sum(executor.map(head, range(connections)))
+
+
+async def awarm_up(http_client: Any, url: str, connections: int = 2, timeout: float = 5.0) -> int:
+    """Async version of warm_up for an async http_client"""
+    results = await asyncio.gather(*(http_client.head(url, timeout=timeout) for _ in range(connections)),
+                                   return_exceptions=True)
+    return sum(1 for result in results if not isinstance(result, BaseException))
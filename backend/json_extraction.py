@@ -0,0 +1,164 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from metrics import JSON_PARSES
+
+_DECODER = json.JSONDecoder()
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$", re.S)
+_SPECIAL = re.compile(r'[{}"\\]')
+_OBJECT_START = re.compile(r'\{\s*["}]')
+
+# Parse outcomes counted per extract_json call
+_PARSED_DIRECT = JSON_PARSES.labels("direct")
+_PARSED_REPAIRED = JSON_PARSES.labels("repaired")
+_PARSED_EMBEDDED = JSON_PARSES.labels("embedded")
+_PARSE_FAILED = JSON_PARSES.labels("failed")
+
+# Nested candidates are only tried within this many characters of decoding per input character
+NESTED_DECODE_BUDGET = 4
+
+
+def _object_spans(text: str) -> List[Tuple[int, int, int]]:
+    """
+    (start, end, depth) of every balanced {...} in text, in order of start, from one pass
+
+    Quotes are only tracked inside braces, so prose such as `say "hi" {...}` before
+    the JSON does not shift the string state, while braces inside JSON strings
+    (e.g. "seen = {}") are ignored.
+    """
+    spans = []
+    starts: List[int] = []
+    in_string = False
+    pos = 0
+    while True:
+        # Jump straight to the next brace, quote or backslash
+        match = _SPECIAL.search(text, pos)
+        if match is None:
+            break
+        i = match.start()
+        c = text[i]
+        pos = i + 1
+        if in_string:
+            if c == "\\":
+                pos = i + 2  # Skip the escaped character
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = bool(starts)
+        elif c == "{":
+            starts.append(i)
+        elif c == "}" and starts:
+            start = starts.pop()
+            spans.append((start, i + 1, len(starts)))
+    spans.sort()
+    return spans
+
+
+def _decode_at(text: str, start: int) -> Optional[Any]:
+    """The JSON object starting at text[start], or None"""
+    if _OBJECT_START.match(text, start) is None:
+        return None  # Not even `{"` or `{}`: skip the decoder
+    try:
+        value, _ = _DECODER.raw_decode(text, start)
+        return value
+    except json.JSONDecodeError:
+        return None
+
+
+def find_json_object(text: str) -> Optional[Any]:
+    """
+    First decodable {...} object embedded in text (e.g. after prose or before a trailing note)
+
+    Outermost objects are tried first with JSONDecoder.raw_decode; if none decodes,
+    objects nested inside them are tried in order. Outermost spans are disjoint, so
+    that pass is linear, and the nested pass stops after NESTED_DECODE_BUDGET
+    characters of decoding per input character.
+    """
+    spans = _object_spans(text)
+    for start, _, depth in spans:
+        if depth == 0:
+            value = _decode_at(text, start)
+            if value is not None:
+                return value
+
+    budget = NESTED_DECODE_BUDGET * len(text)
+    for start, end, depth in spans:
+        if depth == 0:
+            continue
+        budget -= end - start
+        if budget < 0:
+            break
+        value = _decode_at(text, start)
+        if value is not None:
+            return value
+    return None
+
+
+def _repair_string_field(text: str, field: str, max_length: int) -> str:
+    """
+    Re-escape a string field whose value contains raw quotes or newlines
+
+    The value is taken to run from its opening quote to the last quote in the text
+    (a model that forgets to escape quotes can end it anywhere before that).
+    """
+    match = re.search(rf'"{field}":\s*"', text)
+    if match is None:
+        return text
+    close = text.rfind('"')
+    if close < match.end():
+        return text
+    clean = text[match.end():close].replace('"', '\\"').replace('\n', ' ').replace('\r', ' ')
+    if len(clean) > max_length:
+        clean = clean[:max_length] + "..."
+    return f'{text[:match.start()]}"{field}": "{clean}"{text[close + 1:]}'
+
+
+def repair_gpt_json(text: str) -> str:
+    """Fix common JSON formatting issues in GPT evaluation responses"""
+    # Unescaped quotes/newlines in the free-text fields, and very long advice
+    fixed = _repair_string_field(text, "improvement_advice", 300)
+    fixed = _repair_string_field(fixed, "feedback", 400)
+
+    # Handle truncated JSON (missing closing brace)
+    if not fixed.rstrip().endswith('}'):
+        missing = fixed.count('{') - fixed.count('}')
+        if missing > 0:
+            fixed += '}' * missing
+    return fixed
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON object in a model response
+
+    Tries the whole (fence-stripped) text, then the GPT evaluation repairs when the
+    response has an improvement_advice field, then the first object embedded in
+    surrounding text.
+    """
+    txt = text.strip()
+
+    # Strip markdown fences
+    if txt.startswith("```"):
+        txt = _FENCE.sub("", txt)
+
+    # Fast path - try direct parsing
+    try:
+        value = json.loads(txt)
+        _PARSED_DIRECT.inc()
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    # Special handling for GPT evaluation responses with potential improvement_advice issues
+    if '"improvement_advice"' in txt:
+        try:
+            value = json.loads(repair_gpt_json(txt))
+            _PARSED_REPAIRED.inc()
+            return value
+        except json.JSONDecodeError:
+            pass
+
+    value = find_json_object(txt)
+    (_PARSED_EMBEDDED if value is not None else _PARSE_FAILED).inc()
+    return value
@@ -0,0 +1,289 @@
+"""
+In-process metrics with a Prometheus text exposition
+
+Counters, gauges and histograms are plain Python objects guarded by one lock each;
+a labelled child is resolved once (e.g. STAGE_SECONDS.labels("claude_call"))
+and can be kept in a module-level name so the hot path only pays for the
+observation itself. render() produces the text format served at /metrics.
+"""
+
+import bisect
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Upper bounds in seconds: sub-millisecond local stages up to multi-second provider calls and backoffs
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Child for one combination of label values (created on first use)"""
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh child holding one label combination's value"""
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """Exposition lines for every child"""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """Monotonic count, optionally per label combination"""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+                for values, child in sorted(self._children.items())]
+
+
+class _GaugeChild:
+    __slots__ = ("value", "_function", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Report function() at render time instead of the stored value"""
+        self._function = function
+
+    def get(self) -> float:
+        return self._function() if self._function is not None else self.value
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, set directly or read from a callback at render time"""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.get())}"
+                for values, child in sorted(self._children.items())]
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._child.observe(time.perf_counter() - self._start)
+
+
+class _HistogramChild:
+    __slots__ = ("upper_bounds", "counts", "sum", "count", "_lock")
+
+    def __init__(self, upper_bounds: Tuple[float, ...]):
+        self.upper_bounds = upper_bounds
+        self.counts = [0] * (len(upper_bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> _Timer:
+        """Context manager observing the seconds spent inside it"""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (seconds by default)"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.upper_bounds = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.upper_bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self) -> _Timer:
+        return self.labels().time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for values, child in sorted(self._children.items()):
+            with child._lock:
+                counts, total, count = list(child.counts), child.sum, child.count
+            cumulative = 0
+            for bound, bucket_count in zip(self.upper_bounds + (math.inf,), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, values, ('le', _format_value(bound)))} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "sensai_stage_seconds",
+    "Time spent per generation stage (prompt_build, claude_call, gpt_call, backoff, json_extraction, "
+    "schema_validation, gpt_evaluation, attempt, generate)",
+    labelnames=("stage",)
+))
+ATTEMPTS = REGISTRY.register(Counter(
+    "sensai_attempts_total",
+    "Attempts in the generate/evaluate loop by outcome",
+    labelnames=("outcome",)
+))
+SCHEMA_FAILURES = REGISTRY.register(Counter(
+    "sensai_schema_failures_total",
+    "Claude responses rejected by local validation, by reason",
+    labelnames=("reason",)
+))
+JSON_PARSES = REGISTRY.register(Counter(
+    "sensai_json_parse_total",
+    "Model responses by the extraction path that parsed them (direct, repaired, embedded, failed)",
+    labelnames=("path",)
+))
+PROVIDER_ERRORS = REGISTRY.register(Counter(
+    "sensai_provider_errors_total",
+    "Failed provider calls by provider and exception type",
+    labelnames=("provider", "error")
+))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "sensai_http_request_seconds",
+    "HTTP request latency by route and status",
+    labelnames=("method", "route", "status")
+))
+POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    "sensai_provider_pool_connections",
+    "Open provider connections by state (active, idle) per shared HTTP pool",
+    labelnames=("provider", "client", "state")
+))
+POOL_MAX_CONNECTIONS = REGISTRY.register(Gauge(
+    "sensai_provider_pool_max_connections",
+    "Connection limit of each shared provider HTTP pool",
+    labelnames=("provider", "client")
+))
+POOL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "sensai_provider_requests_in_flight",
+    "Provider requests waiting for a connection or for response headers",
+    labelnames=("provider", "client")
+))
+POOL_COLD_REQUESTS = REGISTRY.register(Counter(
+    "sensai_provider_cold_requests_total",
+    "Provider requests that found no reusable keep-alive connection and had to connect (TCP + TLS)",
+    labelnames=("provider", "client")
+))
+POOL_SATURATED = REGISTRY.register(Counter(
+    "sensai_provider_pool_saturated_total",
+    "Provider requests started while the pool was at its connection limit (they queue for a connection)",
+    labelnames=("provider", "client")
+))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,175 @@
+import re
+from typing import Any, Dict, List, Optional, Set
+
+# Hints that restate the task instead of pointing at a next step
+VAGUE_PHRASES = [
+    "you need to solve",
+    "solve this problem",
+    "solve the problem",
+    "think about the problem",
+    "think about it",
+    "try harder",
+    "figure it out",
+    "figure out the solution",
+    "keep going",
+    "keep trying",
+    "fix your code",
+    "debug your code",
+    "write the code",
+    "implement the solution",
+    "complete the function",
+    "finish the implementation",
+    "use the right approach",
+    "use a better approach",
+    "optimize your code",
+]
+
+# Named techniques a good conceptual hint usually points at
+PATTERN_TERMS = [
+    "hash map", "hashmap", "hash set", "hash table", "two pointer", "sliding window", "binary search",
+    "monotonic stack", "priority queue", "heap", "deque", "dfs", "bfs", "depth-first search",
+    "breadth-first search", "topological sort", "union find", "union-find", "trie", "recursion",
+    "memoization", "dynamic programming", "prefix sum", "greedy", "backtracking", "bit manipulation"
+]
+
+# Code constructs that should not appear in a conceptual hint
+_CODE_IN_HINT = re.compile(
+    r"`|\bdef\s+\w+\s*\(|\breturn\s+\S|\bfor\s+\w+\s+in\s+\w+.*:|\bwhile\s+.+:|==|!=|\+=|-=|\[\s*\w+\s*\]\s*=|;\s*\w"
+)
+_WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_RETURN_VALUE = re.compile(r"^return\s+\S")
+
+_STOPWORDS = {
+    "the", "a", "an", "to", "of", "and", "or", "in", "on", "for", "with", "is", "it", "its", "as", "by", "be",
+    "use", "your", "you", "each", "this", "that", "from", "if", "then", "when", "at", "into", "before", "after",
+    "self", "none", "true", "false", "int", "str", "list", "len", "range", "return", "def", "class", "import", "from"
+}
+
+
+def _identifiers(code: str) -> Set[str]:
+    """Identifiers used in code, minus keywords/builtins that say nothing about relevance"""
+    return {w.lower() for w in _WORD.findall(code or "") if len(w) > 1 and w.lower() not in _STOPWORDS}
+
+
+def _code_lines(code: str) -> Set[str]:
+    return {line.strip() for line in (code or "").splitlines() if line.strip()}
+
+
+def prescore(response_json: Dict[str, Any], mode: str, code_so_far: str) -> Dict[str, Any]:
+    """
+    Deterministic local score (1-5) for a schema-valid Claude response
+
+    Starts from a neutral 4.0 and applies penalties for rule violations (hint over
+    25 words, solution leakage, vague restatements, snippets that repeat existing
+    code or write several lines / the final return) and a small bonus for
+    responses grounded in the user's code or a named technique.
+
+    Returns:
+        {"score", "checks", "reasons"} where reasons explain each penalty
+    """
+    score = 4.0
+    reasons: List[str] = []
+    checks: Dict[str, Any] = {}
+    code_ids = _identifiers(code_so_far)
+
+    if mode == "hint":
+        hint = response_json.get("hint", "").strip()
+        lowered = hint.lower()
+        words = len(hint.split())
+        checks["word_count"] = words
+        if words > 25:
+            score -= 1.5
+            reasons.append(f"Hint has {words} words; keep it under 25")
+        elif words < 4:
+            score -= 1.0
+            reasons.append("Hint is too short to be actionable")
+
+        leakage = len(_CODE_IN_HINT.findall(hint))
+        checks["code_constructs"] = leakage
+        if leakage >= 2:
+            score -= 2.0
+            reasons.append("Hint contains code; give conceptual guidance, not the implementation")
+        elif leakage == 1:
+            score -= 0.5
+
+        hint_ids = _identifiers(hint)
+        overlap = sorted(hint_ids & code_ids)
+        checks["code_overlap"] = overlap
+        has_pattern = any(re.search(rf"\b{re.escape(term)}s?\b", lowered) for term in PATTERN_TERMS)
+        checks["names_pattern"] = has_pattern
+
+        # A stock phrase only makes a hint vague when nothing concrete (a technique or one of the
+        # user's identifiers) comes with it: "use binary search to solve the problem" is a real hint
+        vague = [p for p in VAGUE_PHRASES if re.search(rf"\b{re.escape(p)}\b", lowered)]
+        checks["vague_phrases"] = vague
+        if overlap or has_pattern:
+            score += 0.5
+        elif vague:
+            score -= 2.0
+            reasons.append(f"Hint is vague (\"{vague[0]}\"); name the concrete next step")
+
+    else:
+        snippet = response_json.get("next_code", "")
+        snippet_lines = [line.strip() for line in snippet.splitlines() if line.strip()]
+        repeated = [line for line in snippet_lines if line in _code_lines(code_so_far)]
+        checks["lines"] = len(snippet_lines)
+        checks["repeated_lines"] = len(repeated)
+        if snippet_lines and len(repeated) == len(snippet_lines):
+            score -= 2.5
+            reasons.append("Snippet repeats code the user already wrote; give the next new line")
+        elif repeated:
+            score -= 1.0
+            reasons.append("Snippet partly repeats existing code")
+
+        body = [line for line in snippet_lines if not line.startswith("#")]
+        checks["comment_only"] = not body
+        if not body:
+            score -= 2.0
+            reasons.append("Snippet is only a comment; give actual code")
+
+        defines_function = any(line.startswith(("def ", "class ")) for line in body)
+        checks["redefines_function"] = defines_function and bool(re.search(r"^\s*(def|class)\s", code_so_far or "", re.M))
+        if checks["redefines_function"]:
+            score -= 1.5
+            reasons.append("Snippet starts a new function instead of continuing the current one")
+
+        # A next step is one or two lines; more, or returning the result, hands over the solution
+        checks["returns_value"] = any(_RETURN_VALUE.match(line) for line in body)
+        checks["completes_solution"] = len(body) >= 3
+        if checks["returns_value"]:
+            score -= 1.0
+            reasons.append("Snippet returns the result; leave finishing the solution to the user")
+        if checks["completes_solution"]:
+            score -= 0.5
+            reasons.append(f"Snippet has {len(body)} lines of code; give only the next line or two")
+
+        overlap = sorted(_identifiers(snippet) & code_ids)
+        checks["code_overlap"] = overlap
+        if overlap and not repeated and body and not checks["returns_value"] and not checks["completes_solution"]:
+            score += 0.5
+
+    score = max(1.0, min(5.0, score))
+    return {"score": round(score, 2), "checks": checks, "reasons": reasons}
+
+
+def prescore_decision(score: float, threshold: float, accept_at: float, reject_at: float) -> str:
+    """'accept' / 'reject' when the local score is decisive, otherwise 'uncertain'"""
+    if score >= max(accept_at, threshold):
+        return "accept"
+    if score <= min(reject_at, threshold):
+        return "reject"
+    return "uncertain"
+
+
+def local_evaluation(result: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    """Evaluation dict shaped like GPT's for a response decided by the pre-scorer"""
+    score = result["score"]
+    advice: Optional[str] = "; ".join(result["reasons"]) if score < threshold and result["reasons"] else None
+    return {
+        "overall_score": score,
+        "is_good": score >= threshold,
+        "summary_feedback": "Local pre-score: " + ("; ".join(result["reasons"]) or "passes all local checks"),
+        "improvement_advice": advice,
+        "prescored": True,
+        "local_checks": result["checks"]
+    }
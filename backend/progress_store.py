@@ -0,0 +1,660 @@
+import asyncio
+import base64
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sketches import QuantileSketch
+from structured_logging import get_logger, log_event
+
+logger = get_logger("progress_store")
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "progress.db")
+
+# Upper bound for the per-record counters (attempts, hints_used, time_spent): small enough that the
+# per-user and per-problem sums stay inside SQLite's 64-bit INTEGER
+MAX_COUNTER = 2 ** 31 - 1
+
+PROGRESS_FIELDS = ["user_id", "problem_id", "problem_title", "problem_url", "completed", "attempts",
+                   "hints_used", "time_spent", "last_attempted", "completed_at"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    user_id TEXT NOT NULL,
+    problem_id TEXT NOT NULL,
+    problem_title TEXT NOT NULL,
+    problem_url TEXT NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    hints_used INTEGER NOT NULL DEFAULT 0,
+    time_spent INTEGER NOT NULL DEFAULT 0,
+    last_attempted TEXT,
+    completed_at TEXT,
+    PRIMARY KEY (user_id, problem_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_progress_user_last_attempted ON progress (user_id, last_attempted);
+CREATE INDEX IF NOT EXISTS idx_progress_last_attempted ON progress (last_attempted);
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    hints_used INTEGER NOT NULL DEFAULT 0,
+    time_spent INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS problem_stats (
+    problem_id TEXT PRIMARY KEY,
+    attempted INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    hints_used INTEGER NOT NULL DEFAULT 0,
+    time_spent INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS problem_sketch (
+    problem_id TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (problem_id, metric, bucket)
+) WITHOUT ROWID;
+"""
+
+# PRAGMA user_version of a database whose aggregate tables are up to date
+SCHEMA_VERSION = 2
+
+# Counters are cumulative totals from the extension, so MAX keeps replays and
+# out-of-order events harmless; completion is sticky and keeps its first timestamp
+_UPSERT = """
+INSERT INTO progress (user_id, problem_id, problem_title, problem_url, completed, attempts,
+                      hints_used, time_spent, last_attempted, completed_at)
+VALUES (:user_id, :problem_id, :problem_title, :problem_url, :completed, :attempts,
+        :hints_used, :time_spent, :last_attempted, :completed_at)
+ON CONFLICT (user_id, problem_id) DO UPDATE SET
+    problem_title = excluded.problem_title,
+    problem_url = excluded.problem_url,
+    completed = MAX(progress.completed, excluded.completed),
+    attempts = MAX(progress.attempts, excluded.attempts),
+    hints_used = MAX(progress.hints_used, excluded.hints_used),
+    time_spent = MAX(progress.time_spent, excluded.time_spent),
+    last_attempted = MAX(COALESCE(progress.last_attempted, ''), COALESCE(excluded.last_attempted, '')),
+    completed_at = COALESCE(progress.completed_at, excluded.completed_at)
+"""
+
+_SELECT_PROGRESS = f"""
+SELECT {', '.join(PROGRESS_FIELDS)} FROM progress
+WHERE user_id = ?
+ORDER BY last_attempted DESC, problem_id
+"""
+
+# Keyset page: rows after (last_attempted, problem_id) in _SELECT_PROGRESS order
+_SELECT_PAGE = """
+SELECT {columns} FROM progress
+WHERE user_id = :user_id {after}
+ORDER BY last_attempted DESC, problem_id
+LIMIT :limit
+"""
+_AFTER_CURSOR = "AND (last_attempted < :last_attempted OR (last_attempted = :last_attempted AND problem_id > :problem_id))"
+
+_SELECT_ROW = f"SELECT {', '.join(PROGRESS_FIELDS)} FROM progress WHERE user_id = ? AND problem_id = ?"
+
+# Aggregates are kept as running totals; each write adds the difference it makes.
+# user_stats.version counts the transactions that changed a user's records (ETags)
+_USER_DELTA = """
+INSERT INTO user_stats (user_id, attempted, completed, hints_used, time_spent, version) VALUES (?, ?, ?, ?, ?, 1)
+ON CONFLICT (user_id) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    completed = completed + excluded.completed,
+    hints_used = hints_used + excluded.hints_used,
+    time_spent = time_spent + excluded.time_spent,
+    version = version + 1
+"""
+
+_PROBLEM_DELTA = """
+INSERT INTO problem_stats (problem_id, attempted, completed, hints_used, time_spent) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (problem_id) DO UPDATE SET
+    attempted = attempted + excluded.attempted,
+    completed = completed + excluded.completed,
+    hints_used = hints_used + excluded.hints_used,
+    time_spent = time_spent + excluded.time_spent
+"""
+
+_SKETCH_DELTA = """
+INSERT INTO problem_sketch (problem_id, metric, bucket, count) VALUES (?, ?, ?, ?)
+ON CONFLICT (problem_id, metric, bucket) DO UPDATE SET count = count + excluded.count
+"""
+
+_SELECT_STATS = "SELECT attempted, completed, hints_used, time_spent FROM user_stats WHERE user_id = ?"
+_SELECT_VERSION = "SELECT version FROM user_stats WHERE user_id = ?"
+_SELECT_PROBLEM_STATS = "SELECT attempted, completed, hints_used, time_spent FROM problem_stats WHERE problem_id = ?"
+_SELECT_SKETCH = "SELECT bucket, count FROM problem_sketch WHERE problem_id = ? AND metric = ? AND count != 0"
+
+# Per-problem distributions of each user's hints_used and time_spent
+SKETCH_METRICS = ("hints_used", "time_spent")
+SKETCH_ALPHA = 0.01
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """ISO-8601 text that sorts chronologically (aware datetimes are converted to naive UTC)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+def _row_params(progress: Dict[str, Any]) -> Dict[str, Any]:
+    """Statement parameters for one UserProgress dict"""
+    return {
+        "user_id": progress["user_id"],
+        "problem_id": progress["problem_id"],
+        "problem_title": progress.get("problem_title", ""),
+        "problem_url": progress.get("problem_url", ""),
+        "completed": int(bool(progress.get("completed"))),
+        "attempts": int(progress.get("attempts") or 0),
+        "hints_used": int(progress.get("hints_used") or 0),
+        "time_spent": int(progress.get("time_spent") or 0),
+        "last_attempted": _timestamp(progress.get("last_attempted")) or _timestamp(datetime.now(timezone.utc)),
+        "completed_at": _timestamp(progress.get("completed_at"))
+    }
+
+
+def _row_dict(row: tuple, fields: List[str] = PROGRESS_FIELDS) -> Dict[str, Any]:
+    item = dict(zip(fields, row))
+    if "completed" in item:
+        item["completed"] = bool(item["completed"])
+    return item
+
+
+def _encode_cursor(last_attempted: str, problem_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([last_attempted, problem_id]).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(last_attempted, problem_id) from a next_cursor value; ValueError if malformed"""
+    try:
+        last_attempted, problem_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(last_attempted, str) or not isinstance(problem_id, str):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return last_attempted, problem_id
+
+
+class _AggregateDeltas:
+    """Changes to user/problem totals and sketch buckets accumulated over one write transaction"""
+
+    def __init__(self):
+        self.users: Dict[str, List[int]] = {}
+        self.problems: Dict[str, List[int]] = {}
+        self.buckets: Dict[tuple, int] = {}
+        self._sketch = QuantileSketch(SKETCH_ALPHA)
+
+    def apply(self, old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> bool:
+        """Account for a progress row going from old (None if new) to new; False if nothing changed"""
+        if old == new:
+            return False
+        delta = [
+            0 if old else 1,
+            new["completed"] - (old["completed"] if old else 0),
+            new["hints_used"] - (old["hints_used"] if old else 0),
+            new["time_spent"] - (old["time_spent"] if old else 0)
+        ]
+        for totals, key in ((self.users, new["user_id"]), (self.problems, new["problem_id"])):
+            current = totals.setdefault(key, [0, 0, 0, 0])
+            for i, value in enumerate(delta):
+                current[i] += value
+        for metric in SKETCH_METRICS:
+            if old is not None and old[metric] == new[metric]:
+                continue
+            if old is not None:
+                self._count(new["problem_id"], metric, old[metric], -1)
+            self._count(new["problem_id"], metric, new[metric], 1)
+        return True
+
+    def _count(self, problem_id: str, metric: str, value: int, count: int) -> None:
+        key = (problem_id, metric, self._sketch.bucket(value))
+        self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def write(self, conn: sqlite3.Connection) -> None:
+        conn.executemany(_USER_DELTA, [(key, *values) for key, values in self.users.items()])
+        conn.executemany(_PROBLEM_DELTA, [(key, *values) for key, values in self.problems.items()])
+        conn.executemany(_SKETCH_DELTA, [(*key, count) for key, count in self.buckets.items() if count])
+
+
+class ProgressStore:
+    """
+    Embedded SQLite store for UserProgress records
+
+    The database runs in WAL mode so reads never wait for the writer. Writes go
+    through one connection under a lock (SQLite allows a single writer) and reads
+    through a small pool of connections; each connection caches its prepared
+    statements. The a* methods run the blocking calls on the store's own threads
+    (one writer thread, one thread per reader connection), so they never block
+    the event loop and a burst of reads cannot starve writes, or vice versa.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH, pool_size: int = 4):
+        self.path = path
+        self._writer = self._connect()
+        self._writer.executescript(_SCHEMA)
+        self._write_lock = threading.Lock()
+        if self._writer.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._migrate()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(max(1, pool_size)):
+            self._readers.put(self._connect())
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="progress-write")
+        self._read_executor = ThreadPoolExecutor(max_workers=max(1, pool_size), thread_name_prefix="progress-read")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes; fsync at checkpoints
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    @contextmanager
+    def _reader(self) -> Iterator[sqlite3.Connection]:
+        conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """The writer connection inside BEGIN IMMEDIATE ... COMMIT"""
+        with self._write_lock:
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._writer
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._writer.execute("COMMIT")
+
+    def upsert(self, progress: Dict[str, Any]) -> None:
+        """Insert or merge one progress record"""
+        self._upsert_rows([_row_params(progress)])
+
+    def upsert_many(self, records: List[Dict[str, Any]]) -> int:
+        """Insert or merge many progress records in one transaction; returns the count"""
+        return self._upsert_rows([_row_params(p) for p in records])
+
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        """upsert_many for rows already normalized by _row_params; updates the aggregates in the same transaction"""
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        for row in rows:
+            key = (row["user_id"], row["problem_id"])
+            merged[key] = row if key not in merged else _merge_rows(merged[key], row)
+
+        with self._transaction() as conn:
+            deltas = _AggregateDeltas()
+            changed = []
+            for key, row in merged.items():
+                stored = conn.execute(_SELECT_ROW, key).fetchone()
+                old = dict(zip(PROGRESS_FIELDS, stored)) if stored else None
+                if deltas.apply(old, row if old is None else _merge_rows(old, row)):
+                    changed.append(row)
+            conn.executemany(_UPSERT, changed)
+            deltas.write(conn)
+        return len(rows)
+
+    def _migrate(self) -> None:
+        """Bring a database written by an older version up to SCHEMA_VERSION"""
+        columns = {row[1] for row in self._writer.execute("PRAGMA table_info(user_stats)")}
+        if "version" not in columns:
+            self._writer.execute("ALTER TABLE user_stats ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self.rebuild_aggregates()
+
+    def rebuild_aggregates(self) -> None:
+        """Recompute user/problem totals and sketches from the progress table (schema upgrades)"""
+        with self._transaction() as conn:
+            # user_stats rows are zeroed rather than deleted so versions keep increasing
+            conn.execute("UPDATE user_stats SET attempted = 0, completed = 0, hints_used = 0, time_spent = 0")
+            for table in ("problem_stats", "problem_sketch"):
+                conn.execute(f"DELETE FROM {table}")
+            deltas = _AggregateDeltas()
+            for stored in conn.execute(f"SELECT {', '.join(PROGRESS_FIELDS)} FROM progress"):
+                deltas.apply(None, dict(zip(PROGRESS_FIELDS, stored)))
+            deltas.write(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def get_version(self, user_id: str) -> int:
+        """
+        Number of write transactions that changed the user's records (0 if none)
+
+        Read from user_stats on every call (one primary-key lookup), so the value is
+        current whichever worker process wrote last.
+        """
+        with self._reader() as conn:
+            row = conn.execute(_SELECT_VERSION, (user_id,)).fetchone()
+        return row[0] if row else 0
+
+    def get_progress(self, user_id: str) -> List[Dict[str, Any]]:
+        """All progress records of a user, most recently attempted first"""
+        with self._reader() as conn:
+            return [_row_dict(row) for row in conn.execute(_SELECT_PROGRESS, (user_id,))]
+
+    def get_progress_page(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                          fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        One page of a user's progress records in get_progress order
+
+        Pages are keyset-paginated on (last_attempted, problem_id): pass the returned
+        next_cursor to get the following page (None on the last one). fields limits
+        each record to the given PROGRESS_FIELDS. Raises ValueError for an unknown
+        field or a malformed cursor.
+        """
+        fields = list(fields or PROGRESS_FIELDS)
+        unknown = [f for f in fields if f not in PROGRESS_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        columns = fields + [f for f in ("last_attempted", "problem_id") if f not in fields]
+        params: Dict[str, Any] = {"user_id": user_id, "limit": limit + 1 if limit else -1}
+        if cursor:
+            params["last_attempted"], params["problem_id"] = _decode_cursor(cursor)
+        sql = _SELECT_PAGE.format(columns=", ".join(columns), after=_AFTER_CURSOR if cursor else "")
+        with self._reader() as conn:
+            rows = [_row_dict(row, columns) for row in conn.execute(sql, params)]
+
+        next_cursor = None
+        if limit and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1]["last_attempted"], rows[-1]["problem_id"])
+        return {
+            "progress": [{f: row[f] for f in fields} for row in rows],
+            "next_cursor": next_cursor
+        }
+
+    def get_stats(self, user_id: str) -> Dict[str, Any]:
+        """Totals across a user's progress records (one row read, whatever the history length)"""
+        with self._reader() as conn:
+            attempted, completed, hints, time_spent = conn.execute(_SELECT_STATS, (user_id,)).fetchone() or (0, 0, 0, 0)
+        return {
+            "user_id": user_id,
+            "total_problems_attempted": attempted,
+            "total_problems_completed": completed,
+            "total_hints_used": hints,
+            "total_time_spent": time_spent
+        }
+
+    def get_problem_stats(self, problem_id: str) -> Dict[str, Any]:
+        """Completion rate, hints and time-spent distribution across all users of a problem"""
+        with self._reader() as conn:
+            attempted, completed, hints, time_spent = conn.execute(_SELECT_PROBLEM_STATS, (problem_id,)).fetchone() or (0, 0, 0, 0)
+            sketches = {
+                metric: QuantileSketch.from_buckets(conn.execute(_SELECT_SKETCH, (problem_id, metric)), SKETCH_ALPHA)
+                for metric in SKETCH_METRICS
+            }
+
+        def quantile(metric: str, q: float) -> Optional[float]:
+            value = sketches[metric].quantile(q)
+            return round(value, 1) if value is not None else None
+
+        return {
+            "problem_id": problem_id,
+            "users_attempted": attempted,
+            "users_completed": completed,
+            "completion_rate": round(completed / attempted, 4) if attempted else None,
+            "avg_hints_used": round(hints / attempted, 2) if attempted else None,
+            "median_hints_used": quantile("hints_used", 0.5),
+            "avg_time_spent": round(time_spent / attempted, 1) if attempted else None,
+            "time_spent_percentiles": {f"p{int(q * 100)}": quantile("time_spent", q) for q in (0.5, 0.9, 0.99)}
+        }
+
+    async def aupsert(self, progress: Dict[str, Any]) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._write_executor, self.upsert, progress)
+
+    async def aupsert_many(self, records: List[Dict[str, Any]]) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self._write_executor, self.upsert_many, records)
+
+    async def _aupsert_rows(self, rows: List[Dict[str, Any]]) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self._write_executor, self._upsert_rows, rows)
+
+    async def aget_progress(self, user_id: str) -> List[Dict[str, Any]]:
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, self.get_progress, user_id)
+
+    async def aget_progress_page(self, user_id: str, limit: Optional[int] = None, cursor: Optional[str] = None,
+                                 fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._read_executor, self.get_progress_page, user_id, limit, cursor, fields)
+
+    async def aget_version(self, user_id: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, self.get_version, user_id)
+
+    async def aget_stats(self, user_id: str) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, self.get_stats, user_id)
+
+    async def aget_problem_stats(self, problem_id: str) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(self._read_executor, self.get_problem_stats, problem_id)
+
+    def close(self) -> None:
+        """Checkpoint the WAL and close all connections"""
+        self._write_executor.shutdown(wait=True)
+        self._read_executor.shutdown(wait=True)
+        with self._write_lock:
+            self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._writer.close()
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+
+def _merge_rows(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Two normalized rows for the same (user, problem) merged like the SQL upsert"""
+    return {
+        **new,
+        "completed": max(old["completed"], new["completed"]),
+        "attempts": max(old["attempts"], new["attempts"]),
+        "hints_used": max(old["hints_used"], new["hints_used"]),
+        "time_spent": max(old["time_spent"], new["time_spent"]),
+        "last_attempted": max(old["last_attempted"] or "", new["last_attempted"] or "") or None,
+        "completed_at": old["completed_at"] or new["completed_at"]
+    }
+
+
+class WriteBehindQueue:
+    """
+    Buffers progress events in memory and writes them to a ProgressStore in batches
+
+    Events for the same (user_id, problem_id) are merged while they wait, so a
+    burst of updates costs one row write. A background task flushes everything
+    pending in one transaction when flush_size rows are waiting or flush_interval
+    seconds after the first pending event, whichever comes first. When
+    max_pending rows are waiting, add() flushes before returning (backpressure).
+    If a batch fails, its rows are written one by one and rows the database
+    rejects are dead-lettered, so one bad row cannot block the queue.
+    Events are acknowledged before they are written: close() flushes what is
+    left, but a crash loses up to one flush interval of events.
+    """
+
+    def __init__(self, store: ProgressStore, flush_size: int = 500, flush_interval: float = 0.2, max_pending: int = 20000):
+        self.store = store
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Dict[tuple, Dict[str, Any]] = {}
+        self._pending_users: Set[str] = set()
+        self._inflight_users: Set[str] = set()  # Users in the batch being written, until it commits
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._started = time.perf_counter()
+        self._events = 0
+        self._rows_written = 0
+        self._flushes = 0
+        self._flush_latencies: "deque[float]" = deque(maxlen=1000)
+        self._dead_letters: "deque[Dict[str, Any]]" = deque(maxlen=100)
+        self._dead_lettered = 0
+
+    def _ensure_started(self) -> None:
+        """Start the flush task on first use (needs a running event loop)"""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+            self._started = time.perf_counter()
+
+    async def add(self, records: List[Dict[str, Any]]) -> int:
+        """Queue progress events; returns how many were accepted"""
+        if self._closed:
+            raise RuntimeError("Progress write queue is closed")
+        self._ensure_started()
+        was_empty = not self._pending
+        for progress in records:
+            row = _row_params(progress)
+            key = (row["user_id"], row["problem_id"])
+            old = self._pending.get(key)
+            self._pending[key] = row if old is None else _merge_rows(old, row)
+            self._pending_users.add(row["user_id"])
+        self._events += len(records)
+
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        elif len(self._pending) >= self.flush_size or (was_empty and self._pending):
+            self._wakeup.set()  # Flush now, or start the interval timer for the first pending events
+        return len(records)
+
+    def has_pending(self, user_id: str) -> bool:
+        """True if events of user_id are waiting to be written or in a flush that has not committed yet"""
+        return user_id in self._pending_users or user_id in self._inflight_users
+
+    async def flush(self) -> int:
+        """Write everything pending in one transaction; returns the rows written"""
+        if self._flush_lock is None:
+            return 0
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            rows, self._pending = list(self._pending.values()), {}
+            self._inflight_users, self._pending_users = self._pending_users, set()
+            start = time.perf_counter()
+            try:
+                await self.store._aupsert_rows(rows)
+                written = len(rows)
+            except Exception:
+                # One bad row fails the whole transaction: write the rows one by one instead
+                written = await self._flush_each(rows)
+            finally:
+                # Written, dead-lettered or requeued (back in _pending_users): no longer in flight
+                self._inflight_users = set()
+            self._flush_latencies.append(time.perf_counter() - start)
+            self._rows_written += written
+            self._flushes += 1
+            return written
+
+    async def _flush_each(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Write rows in separate transactions after a failed batch; returns the rows written
+
+        Rows the database rejects (e.g. OverflowError, IntegrityError) are dead-lettered.
+        On an OperationalError (locked, disk full) the database itself is failing, so
+        that row and the rest are put back to be retried and the error is raised.
+        """
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                await self.store._aupsert_rows([row])
+                written += 1
+            except sqlite3.OperationalError:
+                self._requeue(rows[index:])
+                self._rows_written += written
+                raise
+            except Exception as e:
+                self._dead_letters.append({"row": row, "error": repr(e)})
+                self._dead_lettered += 1
+                log_event(logger, logging.WARNING, "progress_row_dead_lettered", user_id=row["user_id"],
+                          problem_id=row["problem_id"], error=repr(e))
+        return written
+
+    def _requeue(self, rows: List[Dict[str, Any]]) -> None:
+        """Put rows back (merged with anything queued meanwhile) so they are retried"""
+        for row in rows:
+            key = (row["user_id"], row["problem_id"])
+            newer = self._pending.get(key)
+            self._pending[key] = row if newer is None else _merge_rows(row, newer)
+            self._pending_users.add(row["user_id"])
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """The most recent rows the database rejected, with the error"""
+        return list(self._dead_letters)
+
+    async def _run(self) -> None:
+        """Flush on size immediately, otherwise flush_interval after the first pending event"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if len(self._pending) < self.flush_size:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                    self._wakeup.clear()
+                except asyncio.TimeoutError:
+                    pass
+            try:
+                await self.flush()
+            except Exception as e:
+                log_event(logger, logging.WARNING, "progress_flush_failed", error=str(e), pending=len(self._pending))
+                await asyncio.sleep(self.flush_interval)
+                self._wakeup.set()
+
+    async def close(self) -> None:
+        """Stop the flush task and write everything still pending"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        try:
+            await self.flush()
+        except Exception as e:
+            log_event(logger, logging.ERROR, "progress_final_flush_failed", error=str(e), pending=len(self._pending))
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self._started
+        latencies = sorted(self._flush_latencies)
+        return {
+            "events": self._events,
+            "events_per_second": round(self._events / elapsed, 1) if elapsed else 0.0,
+            "rows_written": self._rows_written,
+            "coalesced": self._events - self._rows_written - self._dead_lettered - len(self._pending),
+            "dead_lettered": self._dead_lettered,
+            "pending": len(self._pending),
+            "flushes": self._flushes,
+            "avg_rows_per_flush": round(self._rows_written / self._flushes, 1) if self._flushes else 0.0,
+            "flush_latency_ms": {
+                "p50": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else 0.0,
+                "p99": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 2) if latencies else 0.0,
+                "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+            }
+        }
+
+
+def progress_store_from_env() -> ProgressStore:
+    """ProgressStore at PROGRESS_DB_PATH with PROGRESS_DB_POOL_SIZE reader connections"""
+    return ProgressStore(
+        path=os.getenv('PROGRESS_DB_PATH') or DEFAULT_DB_PATH,
+        pool_size=int(os.getenv('PROGRESS_DB_POOL_SIZE', '4'))
+    )
+
+
+def write_queue_from_env(store: ProgressStore) -> WriteBehindQueue:
+    """WriteBehindQueue configured by PROGRESS_FLUSH_SIZE / _INTERVAL_MS / PROGRESS_MAX_PENDING"""
+    return WriteBehindQueue(
+        store,
+        flush_size=int(os.getenv('PROGRESS_FLUSH_SIZE', '500')),
+        flush_interval=float(os.getenv('PROGRESS_FLUSH_INTERVAL_MS', '200')) / 1000,
+        max_pending=int(os.getenv('PROGRESS_MAX_PENDING', '20000'))
+    )
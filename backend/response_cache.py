@@ -0,0 +1,374 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Any, Sequence, Tuple
+
+from structured_logging import get_logger, log_event
+
+logger = get_logger("response_cache")
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "response_cache.db")
+
+
+def normalize_title(title: str) -> str:
+    """Case-fold and collapse whitespace in a problem title"""
+    return " ".join((title or "").split()).casefold()
+
+
+def normalize_code(code: str) -> str:
+    """Normalize line endings, trailing whitespace and blank lines in user code"""
+    lines = (code or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines if line.strip())
+
+
+def make_cache_key(problem_name: str, code_key: str, mode: str, language: str, use_evaluation: bool, settings: Sequence[Any] = ()) -> str:
+    """
+    Stable cache key for a generation request; code_key is normalized or fingerprinted code
+
+    settings holds the generation parameters that change which result is
+    accepted (e.g. score threshold and retry budget).
+    """
+    payload = json.dumps([
+        normalize_title(problem_name),
+        code_key,
+        mode,
+        (language or "").strip().lower(),
+        bool(use_evaluation),
+        list(settings)
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_evaluation_key(params: Dict[str, Any]) -> str:
+    """Evaluation cache key from the exact GPT request (model, prompt and sampling settings)"""
+    payload = json.dumps([params["model"], params["messages"], params.get("temperature"), params.get("max_tokens")])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache(ABC):
+    """Interface for response cache backends used by HintGenerator"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for key, or None on a miss"""
+
+    @abstractmethod
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store value under key"""
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """get for async callers; backends that do I/O run it off the event loop"""
+        return self.get(key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """set for async callers; backends that do I/O run it off the event loop"""
+        self.set(key, value)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and size information"""
+
+
+class InMemoryResponseCache(ResponseCache):
+    """
+    Size-bounded LRU cache with a per-entry TTL, safe to share across threads
+
+    Values are deep-copied on the way in and out, so callers can mutate what
+    they stored or were served without corrupting the cached entry.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_size <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """
+    Response cache in a SQLite file shared by every worker process on the host
+
+    Each set() is one transaction (value, byte total and eviction together), so
+    other processes never read a partial entry, and the file outlives worker
+    restarts. Entries expire after ttl_seconds of wall-clock time; once values
+    exceed max_bytes the least recently read ones are evicted down to 90% of
+    the budget. A hit refreshes the entry's read time at most every
+    touch_interval seconds, so most hits never take the write lock. Several
+    caches (tables) can share one file. Hit/miss counters are per process.
+
+    aget/aset run on the cache's own threads, each with its own connection. A
+    SQLite error (locked past busy_timeout, disk full, corrupt file) counts as a
+    miss or a skipped write rather than failing the request; stats() and clear()
+    log it and carry on too.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, table: str = "responses", max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 3600.0, touch_interval: float = 60.0):
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", table):
+            raise ValueError(f"Invalid cache table name {table!r}")
+        self.path = path
+        self.table = table
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.touch_interval = touch_interval
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"cache-{table}")
+        self._counter_lock = threading.Lock()  # get/set run on both executor threads
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+        self._connection().executescript(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at);
+            CREATE TABLE IF NOT EXISTS cache_bytes (name TEXT PRIMARY KEY, total INTEGER NOT NULL);
+            INSERT OR IGNORE INTO cache_bytes VALUES ('{table}', 0);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """This thread's connection (sqlite3 connections are not shared across threads)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, cached_statements=32)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # A lost tail after power loss only costs cache misses
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def _error(self, operation: str, key: str, error: sqlite3.Error) -> None:
+        self._count("errors")
+        log_event(logger, logging.WARNING, "response_cache_error", table=self.table, operation=operation,
+                  key=key[:12], error=str(error))
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            conn = self._connection()
+            row = conn.execute(f"SELECT value, expires_at, accessed_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None:
+                self._count("misses")
+                return None
+
+            value, expires_at, accessed_at = row
+            if expires_at <= now:
+                self._delete(conn, key)
+                self._count("expirations")
+                self._count("misses")
+                return None
+
+            if now - accessed_at >= self.touch_interval:
+                conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            self._error("get", key, e)
+            self._count("misses")
+            return None
+        self._count("hits")
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.max_bytes <= 0:
+            return
+        blob = json.dumps(value, separators=(",", ":")).encode("utf-8")
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                old = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                conn.execute(f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?, ?)",
+                             (key, blob, len(blob), now + self.ttl_seconds, now))
+                total = self._add_bytes(conn, len(blob) - (old[0] if old else 0))
+                if total > self.max_bytes:
+                    self._evict(conn, total, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._error("set", key, e)  # The write is skipped; the next request regenerates it
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.get, key)
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.set, key, value)
+
+    def _add_bytes(self, conn: sqlite3.Connection, delta: int) -> int:
+        conn.execute("UPDATE cache_bytes SET total = total + ? WHERE name = ?", (delta, self.table))
+        return conn.execute("SELECT total FROM cache_bytes WHERE name = ?", (self.table,)).fetchone()[0]
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(f"SELECT size FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._add_bytes(conn, -row[0])
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self, conn: sqlite3.Connection, total: int, now: float) -> None:
+        """Drop expired entries, then the least recently read, until under 90% of max_bytes (inside set's transaction)"""
+        count, freed = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table} WHERE expires_at <= ?",
+                                    (now,)).fetchone()
+        if count:
+            conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+            self._count("expirations", count)
+        target = total - int(self.max_bytes * 0.9)
+        while freed < target:
+            batch = conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed_at LIMIT 64").fetchall()
+            if not batch:
+                break
+            for key, size in batch:
+                if freed >= target:
+                    break
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                freed += size
+                self._count("evictions")
+        self._add_bytes(conn, -freed)
+
+    def clear(self) -> None:
+        try:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(f"DELETE FROM {self.table}")
+                conn.execute("UPDATE cache_bytes SET total = 0 WHERE name = ?", (self.table,))
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            self._error("clear", "", e)
+
+    def stats(self) -> Dict[str, Any]:
+        # size and bytes are None when the database cannot be read; the counters are still reported
+        size = total = None
+        try:
+            conn = self._connection()
+            size = conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            total = conn.execute("SELECT total FROM cache_bytes WHERE name = ?", (self.table,)).fetchone()[0]
+        except sqlite3.Error as e:
+            self._error("stats", "", e)
+        with self._counter_lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "size": size,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "errors": self.errors
+            }
+
+
+def response_cache_from_env(table: str = "responses") -> ResponseCache:
+    """
+    Cache backend from RESPONSE_CACHE_BACKEND: memory (per process; RESPONSE_CACHE_SIZE
+    entries) or sqlite (shared by the workers on a host; RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_MAX_MB). RESPONSE_CACHE_TTL applies to both; table names the
+    cache within the SQLite file.
+    """
+    backend = os.getenv('RESPONSE_CACHE_BACKEND', 'memory').strip().lower()
+    ttl_seconds = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+    if backend == 'sqlite':
+        return SQLiteResponseCache(
+            path=os.getenv('RESPONSE_CACHE_PATH') or DEFAULT_CACHE_PATH,
+            table=table,
+            max_bytes=int(float(os.getenv('RESPONSE_CACHE_MAX_MB', '64')) * 1024 * 1024),
+            ttl_seconds=ttl_seconds
+        )
+    if backend != 'memory':
+        raise ValueError(f"RESPONSE_CACHE_BACKEND must be memory or sqlite, got {backend!r}")
+    return InMemoryResponseCache(max_size=int(os.getenv('RESPONSE_CACHE_SIZE', '1024')), ttl_seconds=ttl_seconds)
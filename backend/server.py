@@ -1,21 +1,105 @@
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.datastructures import MutableHeaders
+from pydantic import BaseModel, conint
 from dotenv import load_dotenv
 import os
 import json
-import sys
+import hashlib
+import logging
+import re
+import uuid
+import time
+import asyncio
 from hint_generator import HintGenerator
+from progress_store import MAX_COUNTER, ProgressStore, WriteBehindQueue, progress_store_from_env, write_queue_from_env
+from metrics import REGISTRY, REQUEST_SECONDS, PROMETHEUS_CONTENT_TYPE
+from structured_logging import configure_logging, get_logger, log_event, logging_stats, request_id_var
+from tracing import configure_tracing, parse_traceparent, start_trace, tracing_stats
 import traceback
-from typing import Optional, List
+from typing import Optional, List, Tuple
 from datetime import datetime
 
 # Load environment variables from .env file
 load_dotenv()
 
+# JSON logs through a background writer thread (LOG_LEVEL, LOG_FORMAT, LOG_PAYLOAD_SAMPLE_RATE)
+configure_logging()
+logger = get_logger("server")
+
+# Span tracing per request (TRACE_EXPORTER=off|file|otlp, TRACE_SAMPLE_RATE)
+configure_tracing()
+
 # Initialize FastAPI app
 app = FastAPI(title="SensAI Code Learning Assistant")
 
+# Incoming X-Request-ID / X-Correlation-ID values (e.g. from the Node proxy) are reused
+# when they look like an ID, otherwise one is generated
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+class RequestContextMiddleware:
+    """
+    Tag every log record of a request with its request ID, open the request's root
+    trace span (continuing a W3C traceparent if sent), log one summary line and
+    record the latency per route template for /metrics
+
+    A plain ASGI middleware rather than @app.middleware("http"): that returns as
+    soon as the response headers are ready, so streamed bodies (/process/stream,
+    /process/batch) would be timed and logged before they were sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        incoming = request.headers.get("x-request-id") or request.headers.get("x-correlation-id") or ""
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else uuid.uuid4().hex[:16]
+        token = request_id_var.set(request_id)
+        trace_id, parent_id = parse_traceparent(request.headers.get("traceparent"))
+        start = time.perf_counter()
+        status = 500
+        with start_trace(request.method, trace_id, parent_id, request_id=request_id) as root_span:
+
+            headers_ms = None
+            body_complete = False
+
+            async def send_with_headers(message):
+                nonlocal status, headers_ms, body_complete
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    headers_ms = round((time.perf_counter() - start) * 1000, 2)
+                    headers = MutableHeaders(scope=message)
+                    headers["X-Request-ID"] = request_id
+                    if root_span.trace_id:
+                        headers["X-Trace-ID"] = root_span.trace_id
+                elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                    body_complete = True
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                elapsed = time.perf_counter() - start
+                route = getattr(scope.get("route"), "path", "unmatched")
+                root_span.set_name(f"{request.method} {route}")
+                # The root span ends with the body, so the provider spans of a streamed response nest
+                # inside it; headers_ms is the time to the first byte, body_complete is False when
+                # the client disconnected mid-stream
+                root_span.set_attributes(**{"http.route": route, "http.status_code": status,
+                                            "http.headers_ms": headers_ms, "http.body_complete": body_complete})
+                REQUEST_SECONDS.labels(request.method, route, str(status)).observe(elapsed)
+                log_event(logger, logging.INFO, "request", method=request.method, path=request.url.path,
+                          status=status, duration_ms=round(elapsed * 1000, 2), trace_id=root_span.trace_id)
+                request_id_var.reset(token)
+
+app.add_middleware(RequestContextMiddleware)
+
 # Add CORS middleware to allow requests from the extension
 app.add_middleware(
     CORSMiddleware,
@@ -31,14 +115,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize HintGenerator for the Claude + GPT pipeline
+# Initialize HintGenerator for the Claude + GPT pipeline. This is cheap: the provider SDKs
+# are loaded in the background after startup. A configuration error keeps the process up
+# with /ready reporting it and the generation endpoints answering 503.
+hint_generator: Optional[HintGenerator] = None
+generator_error: Optional[str] = None
 try:
     hint_generator = HintGenerator()
 except Exception as e:
+    generator_error = f"HintGenerator initialization failed: {e}"
+    log_event(logger, logging.ERROR, "hint_generator_init_failed", error=str(e),
+              hint="Make sure CLAUDE_API_KEY and OPENAI_API_KEY are set in .env file")
+
+# Set once the provider clients are built and their connections warmed (see /ready)
+providers_ready = False
+
+# Provider connections are opened at startup and refreshed every PROVIDER_WARMUP_INTERVAL
+# seconds (0 = startup only) so requests after a quiet spell skip the TCP/TLS handshake
+PROVIDER_WARMUP_INTERVAL = float(os.getenv('PROVIDER_WARMUP_INTERVAL', '30'))
+provider_task: Optional[asyncio.Task] = None
+
+def require_generator() -> HintGenerator:
+    """Dependency for endpoints that need HintGenerator: 503 when it failed to initialize"""
+    if hint_generator is None:
+        raise HTTPException(status_code=503, detail=generator_error)
+    return hint_generator
 
-    print(f"Error: HintGenerator initialization failed: {e}")
-    print("Make sure CLAUDE_API_KEY and OPENAI_API_KEY are set in .env file.")
-    sys.exit(1)
+# Embedded SQLite store for /api/progress and /api/stats (PROGRESS_DB_PATH), opened at startup.
+# A database that cannot be opened keeps the process up with /ready reporting it and the
+# progress endpoints answering 503.
+progress_store: Optional[ProgressStore] = None
+progress_error: Optional[str] = None
+
+# Progress events are buffered and written in batches unless PROGRESS_WRITE_BEHIND=false
+PROGRESS_WRITE_BEHIND = os.getenv('PROGRESS_WRITE_BEHIND', 'true').lower() == 'true'
+progress_queue: Optional[WriteBehindQueue] = None
+
+def require_progress_store() -> ProgressStore:
+    """Dependency for the progress endpoints: 503 until the progress database is open"""
+    if progress_store is None:
+        raise HTTPException(status_code=503, detail=progress_error or "Progress database not open yet")
+    return progress_store
+
+# Upper bound on events per /api/progress/bulk request
+MAX_PROGRESS_BULK = 5000
+
+# Upper bound on records per /api/progress page (?limit=)
+MAX_PROGRESS_PAGE = 500
 
 class ProcessRequest(BaseModel):
     problem: dict  # Contains title, description, code from extension
@@ -46,6 +169,20 @@ class ProcessRequest(BaseModel):
     use_evaluation: bool = False  # Whether to use GPT evaluation (default: False for speed)
     max_retries: int = None  # Override default retry count (None = use default based on use_evaluation)
     user_id: Optional[str] = None
+    bypass_cache: bool = False  # Skip the response cache and force a fresh generation
+    num_candidates: Optional[int] = None  # >1 generates candidates concurrently (fan-out) instead of serial retries
+
+# Upper bound on concurrent candidates per fan-out request
+MAX_FANOUT_CANDIDATES = 5
+
+class BatchRequest(BaseModel):
+    items: List[ProcessRequest]
+    concurrency: Optional[int] = None  # Items generated at once (None = BATCH_CONCURRENCY)
+
+# Batch limits: default/maximum items in flight and items per batch
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
+MAX_BATCH_CONCURRENCY = 32
+MAX_BATCH_ITEMS = 1000
 
 class UserProgress(BaseModel):
     user_id: str
@@ -53,9 +190,9 @@ class UserProgress(BaseModel):
     problem_title: str
     problem_url: str
     completed: bool = False
-    attempts: int = 0
-    hints_used: int = 0
-    time_spent: int = 0
+    attempts: conint(ge=0, le=MAX_COUNTER) = 0
+    hints_used: conint(ge=0, le=MAX_COUNTER) = 0
+    time_spent: conint(ge=0, le=MAX_COUNTER) = 0
     last_attempted: Optional[datetime] = None
     completed_at: Optional[datetime] = None
 
@@ -66,95 +203,143 @@ class UserStats(BaseModel):
     total_hints_used: int
     total_time_spent: int
 
-@app.post("/process")
-async def process_request(request: ProcessRequest):
+def _generation_settings(request: ProcessRequest) -> Tuple[str, str, str, str, int]:
     """
-    Main endpoint called by the extension.
-    Uses Claude + GPT pipeline with evaluation and retry logic.
+    Map an extension request to HintGenerator arguments
+    Returns (problem_name, code_so_far, language, gen_mode, retry_count)
     """
-    try:
-        # Extract data from extension request
-        problem_name = request.problem.get('title', 'Unknown Problem')
-        code_so_far = request.problem.get('code', '')
-        language = "python"  # Default to Python for now
+    # Extract data from extension request
+    problem_name = request.problem.get('title', 'Unknown Problem')
+    code_so_far = request.problem.get('code', '')
+    language = "python"  # Default to Python for now
+    
+    # Convert extension mode to generator mode
+    if request.mode == "code":
+        gen_mode = "next_code"
+    elif request.mode == "hint":
+        gen_mode = "hint"
+    else:
+        raise HTTPException(status_code=400, detail="Mode must be 'code' or 'hint'")
+    
+    # Determine retry count: explicit override, or default based on evaluation setting
+    if request.max_retries is not None:
+        retry_count = request.max_retries
+    else:
+        retry_count = 2 if request.use_evaluation else 0
+    
+    return problem_name, code_so_far, language, gen_mode, retry_count
+
+def _build_process_response(result: dict, gen_mode: str, use_evaluation: bool) -> dict:
+    """
+    Turn HintGenerator results into the /process response body
+    Raises HTTPException(500) with per-attempt error details when generation failed
+    """
+    if result['success'] and result['final_response']:
         
-        # Convert extension mode to generator mode
-        if request.mode == "code":
-            gen_mode = "next_code"
-        elif request.mode == "hint":
-            gen_mode = "hint"
-        else:
-            raise HTTPException(status_code=400, detail="Mode must be 'code' or 'hint'")
+        # Parse the final response to extract just the content
+        final_response = result['final_response']
         
-        # Determine retry count: explicit override, or default based on evaluation setting
-        if request.max_retries is not None:
-            retry_count = request.max_retries
-        else:
-            retry_count = 2 if request.use_evaluation else 0
+        # Try to parse JSON and extract the relevant field
+        try:
+            response_json = json.loads(final_response)
+            if gen_mode == "hint" and "hint" in response_json:
+                final_content = response_json["hint"]
+            elif gen_mode == "next_code" and "next_code" in response_json:
+                final_content = response_json["next_code"]
+            else:
+                final_content = final_response
+        except json.JSONDecodeError:
+            # If not JSON, use the response as-is
+            final_content = final_response
         
-        result = hint_generator.generate_and_evaluate(
+        pipeline_desc = "Claude only" if not use_evaluation else "Claude + GPT with evaluation"
+        
+        # Build response with optional detailed evaluation
+        response_data = {
+            "success": True,
+            "response": final_content,
+            "final_parsed": result.get('final_parsed'),  # Include parsed JSON
+            "evaluation_score": result['final_evaluation'].get('overall_score', result['final_evaluation'].get('score', 0)) if result['final_evaluation'] else None,
+            "attempts": len(result['attempts']),
+            "pipeline": pipeline_desc,
+            "cached": result.get('cached', False),
+            "coalesced": result.get('coalesced', False)
+        }
+        
+        # Only include detailed evaluation if evaluation was actually performed
+        if use_evaluation and result.get('final_evaluation'):
+            response_data["detailed_evaluation"] = result['final_evaluation']
+        
+        if result.get('fanout'):
+            response_data["fanout"] = result['fanout']
+        
+        if (result.get('compaction') or {}).get('applied'):
+            response_data["compaction"] = result['compaction']
+        
+        return response_data
+    else:
+        # Provide detailed error information from attempts
+        error_details = []
+        for attempt in result['attempts']:
+            claude_error = attempt['claude_result'].get('error')
+            gpt_error = attempt['gpt_evaluation'].get('error') if attempt['gpt_evaluation'] else None
+            
+            if claude_error:
+                error_details.append(f"Claude: {claude_error}")
+            if gpt_error:
+                error_details.append(f"Evaluation: {gpt_error}")
+        
+        detailed_error = "; ".join(error_details) if error_details else "Unknown failure"
+        
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to generate satisfactory response. Details: {detailed_error}"
+        )
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def _generate_response(request: ProcessRequest) -> dict:
+    """
+    Run one ProcessRequest through HintGenerator and build the /process response body
+    Raises HTTPException on invalid requests or failed generation
+    """
+    problem_name, code_so_far, language, gen_mode, retry_count = _generation_settings(request)
+    
+    if request.num_candidates and request.num_candidates > 1:
+        result = await hint_generator.agenerate_fanout(
+            problem_name=problem_name,
+            code_so_far=code_so_far,
+            language=language,
+            mode=gen_mode,
+            threshold=3.0,  # Stop early once a candidate scores >= 3.0
+            num_candidates=min(request.num_candidates, MAX_FANOUT_CANDIDATES),
+            use_evaluation=request.use_evaluation,
+            use_cache=not request.bypass_cache
+        )
+    else:
+        result = await hint_generator.agenerate_and_evaluate(
             problem_name=problem_name,
             code_so_far=code_so_far,
             language=language,
             mode=gen_mode,
             threshold=3.0,  # Retry if score < 3.0
             max_retries=retry_count,
-            use_evaluation=request.use_evaluation
+            use_evaluation=request.use_evaluation,
+            use_cache=not request.bypass_cache
         )
-        
-        if result['success'] and result['final_response']:
-            
-            # Parse the final response to extract just the content
-            final_response = result['final_response']
-            
-            # Try to parse JSON and extract the relevant field
-            try:
-                response_json = json.loads(final_response)
-                if gen_mode == "hint" and "hint" in response_json:
-                    final_content = response_json["hint"]
-                elif gen_mode == "next_code" and "next_code" in response_json:
-                    final_content = response_json["next_code"]
-                else:
-                    final_content = final_response
-            except json.JSONDecodeError:
-                # If not JSON, use the response as-is
-                final_content = final_response
-            
-            pipeline_desc = "Claude only" if not request.use_evaluation else "Claude + GPT with evaluation"
-            
-            # Build response with optional detailed evaluation
-            response_data = {
-                "success": True,
-                "response": final_content,
-                "final_parsed": result.get('final_parsed'),  # Include parsed JSON
-                "evaluation_score": result['final_evaluation'].get('overall_score', result['final_evaluation'].get('score', 0)) if result['final_evaluation'] else None,
-                "attempts": len(result['attempts']),
-                "pipeline": pipeline_desc
-            }
-            
-            # Only include detailed evaluation if evaluation was actually performed
-            if request.use_evaluation and result.get('final_evaluation'):
-                response_data["detailed_evaluation"] = result['final_evaluation']
-            
-            return response_data
-        else:
-            # Provide detailed error information from attempts
-            error_details = []
-            for attempt in result['attempts']:
-                claude_error = attempt['claude_result'].get('error')
-                gpt_error = attempt['gpt_evaluation'].get('error') if attempt['gpt_evaluation'] else None
-                
-                if claude_error:
-                    error_details.append(f"Claude: {claude_error}")
-                if gpt_error:
-                    error_details.append(f"Evaluation: {gpt_error}")
-            
-            detailed_error = "; ".join(error_details) if error_details else "Unknown failure"
-            
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to generate satisfactory response. Details: {detailed_error}"
-            )
+    
+    return _build_process_response(result, gen_mode, request.use_evaluation)
+
+@app.post("/process", dependencies=[Depends(require_generator)])
+async def process_request(request: ProcessRequest):
+    """
+    Main endpoint called by the extension.
+    Uses Claude + GPT pipeline with evaluation and retry logic.
+    """
+    try:
+        return await _generate_response(request)
         
     except Exception as e:
         error_msg = f"Error processing request: {str(e)}"
@@ -162,20 +347,174 @@ async def process_request(request: ProcessRequest):
             status_code=500,
             detail=error_msg
         )
+
+@app.post("/process/batch", dependencies=[Depends(require_generator)])
+async def process_batch(batch: BatchRequest):
+    """
+    Run many ProcessRequest items concurrently (bounded by "concurrency").
+    Identical items are generated once. Streams NDJSON lines in completion order:
+    {"index", "success", "result"} or {"index", "success": false, "status_code", "error"}
+    per item (with "deduplicated": true for repeats), then a final {"summary": {...}} line.
+    """
+    if not batch.items:
+        raise HTTPException(status_code=400, detail="Batch must contain at least one item")
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Batch too large ({len(batch.items)} items), maximum {MAX_BATCH_ITEMS}")
+    
+    concurrency = max(1, min(batch.concurrency or BATCH_CONCURRENCY, MAX_BATCH_CONCURRENCY))
+    
+    # Group identical items (user_id does not affect the generated result)
+    groups = {}
+    for index, item in enumerate(batch.items):
+        key = json.dumps(item.dict(exclude={"user_id"}), sort_keys=True, default=str)
+        groups.setdefault(key, []).append(index)
+    
+    async def event_stream():
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(concurrency)
+        succeeded = failed = 0
+        
+        async def run(indexes):
+            async with semaphore:
+                try:
+                    return indexes, {"success": True, "result": await _generate_response(batch.items[indexes[0]])}
+                except HTTPException as e:
+                    return indexes, {"success": False, "status_code": e.status_code, "error": e.detail}
+                except Exception as e:
+                    return indexes, {"success": False, "status_code": 500, "error": f"Error processing request: {str(e)}"}
+        
+        tasks = [asyncio.create_task(run(indexes)) for indexes in groups.values()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                indexes, outcome = await next_done
+                for position, index in enumerate(indexes):
+                    line = {"index": index, **outcome}
+                    if position:
+                        line["deduplicated"] = True
+                    if outcome["success"]:
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield json.dumps(line) + "\n"
+            
+            yield json.dumps({"summary": {
+                "items": len(batch.items),
+                "unique": len(groups),
+                "succeeded": succeeded,
+                "failed": failed,
+                "concurrency": concurrency,
+                "elapsed_s": round(time.perf_counter() - start, 3)
+            }}) + "\n"
+        finally:
+            # Client went away (or the stream finished): stop outstanding generations
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@app.post("/process/stream", dependencies=[Depends(require_generator)])
+async def process_stream(request: ProcessRequest):
+    """
+    Streaming variant of /process using Server-Sent Events.
+    Events: "token" ({"delta": text}) as the hint/next_code value is generated,
+    "reset" ({"attempt", "advice"}) when a retry replaces the streamed text,
+    then "result" (same body as /process) or "error" ({"detail"}).
+    """
+    problem_name, code_so_far, language, gen_mode, retry_count = _generation_settings(request)
+    
+    async def event_stream():
+        try:
+            async for event, payload in hint_generator.astream_generate_and_evaluate(
+                problem_name=problem_name,
+                code_so_far=code_so_far,
+                language=language,
+                mode=gen_mode,
+                threshold=3.0,  # Retry if score < 3.0
+                max_retries=retry_count,
+                use_evaluation=request.use_evaluation,
+                use_cache=not request.bypass_cache
+            ):
+                if event == "token":
+                    yield _sse_event("token", {"delta": payload})
+                elif event == "reset":
+                    yield _sse_event("reset", payload)
+                else:
+                    yield _sse_event("result", _build_process_response(payload, gen_mode, request.use_evaluation))
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            yield _sse_event("error", {"detail": f"Error processing request: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "pipeline": "Claude + GPT"}
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    Readiness probe: 503 until the progress database is open and the provider SDKs
+    are loaded and connections warmed (generation requests before that still work,
+    they just pay the cold start), or for good when HintGenerator could not be
+    initialized or the progress database could not be opened
+    """
+    if hint_generator is None:
+        response.status_code = 503
+        return {"ready": False, "reason": generator_error}
+    if progress_store is None:
+        response.status_code = 503
+        return {"ready": False, "reason": progress_error or "Opening progress database"}
+    if not providers_ready:
+        response.status_code = 503
+        return {"ready": False, "reason": generator_error or "Loading provider clients"}
+    return {"ready": True}
+
+@app.get("/cache/stats", dependencies=[Depends(require_generator)])
+async def cache_stats():
+    """
+    Response and evaluation cache hit/miss counters (per worker; size is shared
+    with RESPONSE_CACHE_BACKEND=sqlite), in-flight request coalescing counters,
+    local pre-score decisions (accept/reject skip the GPT evaluation) and the
+    record/replay cassette counters when LLM_CASSETTE_MODE is set, the log
+    queue depth / dropped records and the span exporter counters
+    """
+    stats = {
+        "success": True,
+        "cache": await asyncio.to_thread(hint_generator.response_cache.stats),
+        "evaluation_cache": await asyncio.to_thread(hint_generator.evaluation_cache.stats),
+        "coalescing": hint_generator.inflight.stats(),
+        "prescore": hint_generator.prescore_stats
+    }
+    if hint_generator.cassette is not None:
+        stats["cassette"] = hint_generator.cassette.stats()
+    stats["logging"] = logging_stats()
+    stats["tracing"] = tracing_stats()
+    return stats
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus text exposition: per-stage latency histograms, attempt outcomes,
+    schema failures, JSON parse paths, provider errors and HTTP latency per route
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 # User progress tracking endpoints
-@app.post("/api/progress/track")
+@app.post("/api/progress/track", dependencies=[Depends(require_progress_store)])
 async def track_progress(progress: UserProgress):
     """
-    Track user progress on a problem
-    Note: In a real implementation, this would connect to Firebase or another database
+    Track user progress on a problem (merged into the stored record)
     """
     try:
-        # Here you would save to your database
-        # For now, we'll just return success
+        if progress_queue is not None:
+            await progress_queue.add([progress.dict()])
+        else:
+            await progress_store.aupsert(progress.dict())
         return {
             "success": True,
             "message": "Progress tracked successfully",
@@ -184,53 +523,187 @@ async def track_progress(progress: UserProgress):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to track progress: {e}")
 
-@app.get("/api/progress/{user_id}")
-async def get_user_progress(user_id: str):
+@app.post("/api/progress/bulk", dependencies=[Depends(require_progress_store)])
+async def track_progress_bulk(events: List[UserProgress]):
     """
-    Get all progress for a specific user
+    Track an array of progress events (queued for a batched write when write-behind is on)
     """
+    if len(events) > MAX_PROGRESS_BULK:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PROGRESS_BULK} events per request")
     try:
-        # Here you would fetch from your database
-        # For now, return mock data
-        mock_progress = [
-            {
-                "problem_id": "two-sum",
-                "problem_title": "Two Sum",
-                "completed": True,
-                "attempts": 2,
-                "hints_used": 1,
-                "last_attempted": datetime.now().isoformat()
-            }
-        ]
-        
+        records = [event.dict() for event in events]
+        if progress_queue is not None:
+            accepted = await progress_queue.add(records)
+        else:
+            accepted = await progress_store.aupsert_many(records)
         return {
             "success": True,
-            "progress": mock_progress
+            "accepted": accepted
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to get progress: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to track progress: {e}")
+
+@app.get("/api/progress/bulk/stats", dependencies=[Depends(require_progress_store)])
+async def progress_write_stats():
+    """
+    Write-behind queue counters: events/sec, coalesced events, pending rows and flush latency
+    """
+    return {
+        "success": True,
+        "write_behind": progress_queue is not None,
+        "stats": progress_queue.stats() if progress_queue is not None else None
+    }
 
-@app.get("/api/stats/{user_id}")
-async def get_user_stats(user_id: str):
+async def _flush_pending(user_id: str) -> None:
     """
-    Get user statistics
+    Write a user's queued events before reading, so reads see their own writes
+
+    has_pending also covers a background flush that has not committed yet: flush()
+    then waits for it, so the ETag version read afterwards includes every
+    acknowledged write and a 304 never hides one.
+    """
+    if progress_queue is not None and progress_queue.has_pending(user_id):
+        await progress_queue.flush()
+
+def _user_etag(user_id: str, version: int, *variant) -> str:
+    """Weak ETag for one representation (endpoint, query) of a user's data at a version"""
+    digest = hashlib.sha1(json.dumps([user_id, *variant]).encode()).hexdigest()[:16]
+    return f'W/"{version}-{digest}"'
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Set the validator headers; a bare 304 if If-None-Match already has this ETag"""
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    response.headers.update(headers)
+    tags = [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag in tags or "*" in tags:
+        return Response(status_code=304, headers=headers)
+    return None
+
+@app.get("/api/progress/{user_id}", dependencies=[Depends(require_progress_store)])
+async def get_user_progress(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PROGRESS_PAGE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+):
+    """
+    Get progress for a specific user, most recently attempted first
+
+    With `limit`, returns one page and a `next_cursor` to pass as `cursor` for the
+    next one. `fields` is a comma-separated subset of the record fields. Responses
+    carry an ETag derived from the user's version, so an unchanged If-None-Match
+    gets a 304 after a single primary-key read instead of the full query.
     """
     try:
-        # Here you would calculate from your database
-        mock_stats = {
-            "total_problems_attempted": 5,
-            "total_problems_completed": 3,
-            "total_hints_used": 7,
-            "total_time_spent": 3600  # in seconds
+        await _flush_pending(user_id)
+        field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        etag = _user_etag(user_id, await progress_store.aget_version(user_id), "progress", limit, cursor, field_list)
+        not_modified = _not_modified(request, response, etag)
+        if not_modified is not None:
+            return not_modified
+        page = await progress_store.aget_progress_page(user_id, limit, cursor, field_list)
+        return {
+            "success": True,
+            "progress": page["progress"],
+            "next_cursor": page["next_cursor"]
         }
-        
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get progress: {e}")
+
+@app.get("/api/stats/{user_id}", dependencies=[Depends(require_progress_store)])
+async def get_user_stats(user_id: str, request: Request, response: Response):
+    """
+    Get user statistics (ETag / If-None-Match like /api/progress)
+    """
+    try:
+        await _flush_pending(user_id)
+        etag = _user_etag(user_id, await progress_store.aget_version(user_id), "stats")
+        not_modified = _not_modified(request, response, etag)
+        if not_modified is not None:
+            return not_modified
         return {
             "success": True,
-            "stats": mock_stats
+            "stats": UserStats(**await progress_store.aget_stats(user_id)).dict()
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {e}")
 
+@app.get("/api/stats/problem/{problem_id}", dependencies=[Depends(require_progress_store)])
+async def get_problem_stats(problem_id: str):
+    """
+    Get global statistics for a problem (completion rate, median hints, time-spent percentiles)
+
+    Queued progress events are not flushed first, so with write-behind on the
+    numbers can lag by up to one flush interval.
+    """
+    try:
+        return {
+            "success": True,
+            "stats": await progress_store.aget_problem_stats(problem_id)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get problem stats: {e}")
+
+async def prepare_providers():
+    """Build the provider clients off the event loop, warm their connections, then keep them warm"""
+    global providers_ready, generator_error
+    try:
+        await asyncio.to_thread(hint_generator.prepare)
+        opened = await hint_generator.awarm_up()
+    except Exception as e:
+        generator_error = f"Provider client setup failed: {e}"
+        log_event(logger, logging.ERROR, "provider_setup_failed", error=str(e))
+        return
+    providers_ready = True
+    log_event(logger, logging.INFO, "providers_ready", **opened)
+    while opened and PROVIDER_WARMUP_INTERVAL > 0:
+        await asyncio.sleep(PROVIDER_WARMUP_INTERVAL)
+        try:
+            await hint_generator.awarm_up()
+        except Exception as e:
+            # A failed ping (e.g. the provider is briefly unreachable) must not end keep-warm
+            log_event(logger, logging.WARNING, "provider_warmup_failed", error=str(e))
+
+@app.on_event("startup")
+async def open_progress_store():
+    """Open the progress database (and its write-behind queue) off the event loop"""
+    global progress_store, progress_queue, progress_error
+    try:
+        store = await asyncio.to_thread(progress_store_from_env)
+    except Exception as e:
+        progress_error = f"Progress database could not be opened: {e}"
+        log_event(logger, logging.ERROR, "progress_store_open_failed", error=str(e))
+        return
+    progress_queue = write_queue_from_env(store) if PROGRESS_WRITE_BEHIND else None
+    progress_store = store
+
+@app.on_event("startup")
+async def start_provider_preparation():
+    """Start accepting requests right away; providers are prepared in the background"""
+    global provider_task
+    if hint_generator is not None:
+        provider_task = asyncio.create_task(prepare_providers())
+
+@app.on_event("shutdown")
+async def stop_provider_preparation():
+    if provider_task is not None:
+        provider_task.cancel()
+
+@app.on_event("shutdown")
+async def close_progress_store():
+    """Flush queued progress events, then checkpoint and close the progress database"""
+    try:
+        if progress_queue is not None:
+            await progress_queue.close()
+    finally:
+        # Close (and checkpoint the WAL) even when the final flush failed
+        if progress_store is not None:
+            progress_store.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001) 
\ No newline at end of file
@@ -0,0 +1,72 @@
+import math
+from typing import Dict, Iterable, Optional, Tuple
+
+# Bucket key for values <= 0 (log-spaced buckets only cover positive values)
+ZERO_BUCKET = -(1 << 40)
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (DDSketch-style)
+
+    Positive values fall into log-spaced buckets, so any quantile is estimated
+    within `alpha` relative error using a number of buckets that grows only with
+    log(max / min), not with the number of values. Bucket counts simply add up,
+    which makes sketches mergeable and lets a value be removed again (count -1)
+    when a tracked total changes.
+    """
+
+    def __init__(self, alpha: float = 0.01, buckets: Optional[Dict[int, int]] = None):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = dict(buckets or {})
+
+    def bucket(self, value: float) -> int:
+        """Bucket key holding value"""
+        if value <= 0:
+            return ZERO_BUCKET
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, count: int = 1) -> None:
+        key = self.bucket(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if self.buckets[key] == 0:
+            del self.buckets[key]
+
+    def remove(self, value: float) -> None:
+        self.add(value, -1)
+
+    def merge(self, other: "QuantileSketch") -> None:
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+            if self.buckets[key] == 0:
+                del self.buckets[key]
+
+    @property
+    def count(self) -> int:
+        return sum(self.buckets.values())
+
+    def _value(self, key: int) -> float:
+        """Representative value of a bucket (within alpha of every value in it)"""
+        if key == ZERO_BUCKET:
+            return 0.0
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated q-quantile (0 <= q <= 1), or None when empty"""
+        total = self.count
+        if total <= 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.buckets))
+
+    @classmethod
+    def from_buckets(cls, rows: Iterable[Tuple[int, int]], alpha: float = 0.01) -> "QuantileSketch":
+        """Sketch rebuilt from stored (bucket, count) pairs"""
+        return cls(alpha, {key: count for key, count in rows if count})
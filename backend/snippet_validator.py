@@ -0,0 +1,133 @@
+import ast
+import textwrap
+from typing import List, Optional, Tuple
+
+from code_compaction import parse_lenient
+from code_fingerprint import indent_unit
+
+# Prefix of the local validation error for snippets that don't parse in place
+SNIPPET_SYNTAX_ERROR = "Snippet does not parse"
+
+# Trailing placeholder lines the snippet replaces rather than follows
+_PLACEHOLDERS = {"pass", "...", "# todo", "# your code here", "# code here"}
+
+
+def _indent_of(line: str) -> str:
+    return line[:len(line) - len(line.lstrip())]
+
+
+def _reindent(snippet: str, indent: str) -> str:
+    """Snippet re-based to indent, keeping its relative indentation"""
+    return textwrap.indent(textwrap.dedent(snippet), indent, lambda line: bool(line.strip()))
+
+
+def _indent_levels(lines: List[str], unit: str) -> List[str]:
+    """Indentation a next line could plausibly have, innermost first"""
+    last = lines[-1]
+    levels = [_indent_of(last) + unit] if last.rstrip().endswith(":") else []
+    levels.append(_indent_of(last))
+    # Dedenting out of the current block(s): every shallower indentation above
+    for line in reversed(lines):
+        indent = _indent_of(line)
+        if line.strip() and len(indent) < len(levels[-1]):
+            levels.append(indent)
+    return levels
+
+
+def _compiles(source: str) -> Optional[SyntaxError]:
+    """None if source parses (unfinished trailing blocks allowed) and compiles, else the error"""
+    tree = parse_lenient(source)
+    if tree is None:
+        try:
+            ast.parse(source)
+        except SyntaxError as e:
+            return e
+        return SyntaxError("invalid syntax")
+    try:
+        compile(tree, "<spliced>", "exec")
+    except SyntaxError as e:
+        return e
+    return None
+
+
+def _describe_indent(indent: str) -> str:
+    """Indentation in the user's own terms, e.g. indented 8 spaces or indented 2 tabs"""
+    if not indent:
+        return "not indented"
+    for char, name in ((" ", "space"), ("\t", "tab")):
+        if indent == char * len(indent):
+            return f"indented {len(indent)} {name}{'s' if len(indent) > 1 else ''}"
+    return f"indented {indent!r}"
+
+
+def _splices(code: str, snippet: str) -> List[Tuple[str, int, Optional[str]]]:
+    """
+    Candidate (source, first snippet line, indent) triples: as written (indent None),
+    then re-indented to each plausible level, innermost first
+    """
+    lines = code.rstrip().split("\n") if code.strip() else []
+    if not lines:
+        return [(textwrap.dedent(snippet), 1, None)]
+
+    if lines[-1].strip().lower() in _PLACEHOLDERS and len(lines) > 1:
+        # Replace a `pass` / `...` body the user left as a placeholder
+        placeholder_indent = _indent_of(lines[-1])
+        lines = lines[:-1]
+        levels = [placeholder_indent]
+    else:
+        levels = _indent_levels(lines, indent_unit(code) or "    ")
+
+    prefix = "\n".join(lines) + "\n"
+    start = len(lines) + 1
+    candidates = [(prefix + snippet.rstrip() + "\n", start, None)]
+    for indent in levels:
+        candidates.append((prefix + _reindent(snippet.rstrip(), indent) + "\n", start, indent))
+    return candidates
+
+
+def validate_snippet(snippet: str, code_so_far: str, language: str = "python") -> Tuple[bool, Optional[str], Optional[str]]:
+    """
+    Check that a next_code snippet is valid Python where the user would insert it
+
+    The snippet is spliced after the user's code (replacing a trailing `pass`
+    placeholder), tried as written and re-indented to each plausible block level,
+    and every splice is compiled; an unfinished trailing block such as a
+    `for ...:` header is allowed. If the user's own code does not parse, the
+    snippet is only checked on its own. Other languages are not checked.
+
+    Returns:
+        (True, None, None) when valid, otherwise (False, error, advice for a retry)
+    """
+    if (language or "").strip().lower() != "python" or not snippet.strip():
+        return True, None, None
+
+    if code_so_far.strip() and parse_lenient(code_so_far) is None:
+        error = _compiles(textwrap.dedent(snippet))
+        if error is None or error.msg.startswith(("'return' outside", "'break' outside", "'continue' outside", "'yield' outside", "'await' outside")):
+            return True, None, None
+        return False, f"{SNIPPET_SYNTAX_ERROR}: {error.msg}", (
+            f"The snippet is not valid Python on its own ({error.msg}). "
+            "Return 1-3 complete, syntactically valid lines."
+        )
+
+    errors = []
+    for source, start, indent in _splices(code_so_far, snippet):
+        error = _compiles(source)
+        if error is None:
+            return True, None, None
+        errors.append((error, start, indent))
+
+    # Report the error at the most plausible placement: re-indented to the innermost level
+    reindented = [entry for entry in errors if entry[2] is not None]
+    first_error, first_line, indent = reindented[0] if reindented else errors[0]
+
+    # Report the error against the snippet as written
+    snippet_lines = snippet.rstrip().split("\n")
+    offset = (first_error.lineno or first_line) - first_line
+    culprit = snippet_lines[offset].strip() if 0 <= offset < len(snippet_lines) else None
+    where = f" in `{culprit}`" if culprit else ""
+    return False, f"{SNIPPET_SYNTAX_ERROR} after the user's code: {first_error.msg}{where}", (
+        f"Your previous snippet was not valid Python when added after the user's code: {first_error.msg}{where}. "
+        f"Return 1-3 complete lines that continue the current block ({_describe_indent(indent or '')}) "
+        "with balanced brackets and quotes."
+    )
@@ -0,0 +1,130 @@
+import json
+import re
+from typing import Optional
+
+_HEX = re.compile(r"[0-9a-fA-F]{4}")
+
+
+class IncrementalFieldExtractor:
+    """
+    Incrementally decode the string value of one JSON key from streamed text
+
+    Feed raw model output as it arrives; each call returns the newly decoded
+    characters of the value (escapes resolved), so a response like
+    {"hint":"Use a hash map"} can be shown token by token before it is complete.
+    """
+
+    SEEK_KEY, SEEK_COLON, SEEK_QUOTE, IN_VALUE, DONE = range(5)
+
+    def __init__(self, key: str):
+        self.key = key
+        self._needle = json.dumps(key)
+        self._buf = ""
+        self._pos = 0
+        self._state = self.SEEK_KEY
+        self.value = ""
+
+    @property
+    def done(self) -> bool:
+        """True once the closing quote of the value has been seen"""
+        return self._state == self.DONE
+
+    @property
+    def started(self) -> bool:
+        """True once the opening quote of the value has been seen"""
+        return self._state >= self.IN_VALUE
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of model output and return newly decoded value text"""
+        self._buf += chunk
+        out = []
+
+        while self._state != self.DONE:
+            if self._state == self.SEEK_KEY:
+                idx = self._buf.find(self._needle, self._pos)
+                if idx == -1:
+                    # Keep a tail in case the key is split across chunks
+                    self._pos = max(self._pos, len(self._buf) - len(self._needle) + 1)
+                    break
+                self._pos = idx + len(self._needle)
+                self._state = self.SEEK_COLON
+
+            elif self._state in (self.SEEK_COLON, self.SEEK_QUOTE):
+                while self._pos < len(self._buf) and self._buf[self._pos].isspace():
+                    self._pos += 1
+                if self._pos >= len(self._buf):
+                    break
+                expected = ":" if self._state == self.SEEK_COLON else '"'
+                if self._buf[self._pos] != expected:
+                    # The key text appeared somewhere else (e.g. inside a value); keep looking
+                    self._state = self.SEEK_KEY
+                    continue
+                self._pos += 1
+                self._state = self.SEEK_QUOTE if self._state == self.SEEK_COLON else self.IN_VALUE
+
+            else:  # IN_VALUE
+                decoded = self._decode_available()
+                if decoded is None:
+                    break
+                out.append(decoded)
+                if self._state != self.DONE:
+                    break
+
+        text = "".join(out)
+        self.value += text
+        return text
+
+    def _decode_available(self) -> Optional[str]:
+        """Decode value characters up to the end of the buffer or the closing quote"""
+        out = []
+        buf = self._buf
+        i = self._pos
+        n = len(buf)
+        while i < n:
+            c = buf[i]
+            if c == '"':
+                self._state = self.DONE
+                i += 1
+                break
+            if c != "\\":
+                # Copy the run of plain characters in one slice
+                j = i
+                while j < n and buf[j] not in '"\\':
+                    j += 1
+                out.append(buf[i:j])
+                i = j
+                continue
+
+            escape = self._read_escape(buf, i)
+            if escape is None:
+                break  # Incomplete escape sequence; wait for more text
+            text, i = escape
+            out.append(text)
+
+        self._pos = i
+        return "".join(out)
+
+    def _read_escape(self, buf: str, i: int):
+        """Decode the escape at buf[i]; None if it is not complete yet"""
+        if i + 1 >= len(buf):
+            return None
+        if buf[i + 1] != "u":
+            try:
+                return json.loads(f'"{buf[i:i + 2]}"'), i + 2
+            except json.JSONDecodeError:
+                return buf[i + 1], i + 2  # Invalid escape: keep the character
+        if i + 6 > len(buf):
+            return None
+        if not _HEX.fullmatch(buf[i + 2:i + 6]):
+            return buf[i:i + 6], i + 6
+        code = int(buf[i + 2:i + 6], 16)
+        if 0xD800 <= code <= 0xDBFF:
+            # High surrogate: wait for its low surrogate partner
+            if i + 12 > len(buf):
+                return None
+            pair = buf[i:i + 12]
+            try:
+                return json.loads(f'"{pair}"'), i + 12
+            except json.JSONDecodeError:
+                return json.loads(f'"{buf[i:i + 6]}"', strict=False), i + 6
+        return chr(code), i + 6
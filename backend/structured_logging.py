@@ -0,0 +1,147 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+# Request ID of the request being handled (set by the server middleware, inherited by tasks it starts)
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+ROOT_LOGGER = "sensai"
+
+# Attributes every LogRecord has; anything else was passed as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, event, request_id and the event's fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update((k, v) for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    """`time level [request_id] event key=value ...` for reading logs in a terminal"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{k}={v!r}" for k, v in vars(record).items() if k not in _RECORD_ATTRS)
+        request_id = getattr(record, "request_id", None)
+        line = (f"{time.strftime('%H:%M:%S', time.localtime(record.created))} {record.levelname:<7} "
+                f"{f'[{request_id}] ' if request_id else ''}{record.getMessage()} {fields}").rstrip()
+        return f"{line}\n{record.exc_text}" if record.exc_text else line
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the caller
+
+    The request ID is captured here, on the logging thread, before the record is
+    handed to the listener thread. When the queue is full the record is dropped
+    and counted rather than waiting for the writer to catch up.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Render the message now; args and exc_info may not survive the trip to another thread
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+_payload_sample_rate = 0.0
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> logging.Logger:
+    """
+    Route the sensai.* loggers through a background writer thread (idempotent)
+
+    LOG_LEVEL sets the level (default INFO), LOG_FORMAT json|text the output format,
+    LOG_QUEUE_SIZE the records buffered before new ones are dropped, and
+    LOG_PAYLOAD_SAMPLE_RATE the fraction of DEBUG payload logs (full prompts and
+    model responses) that are written.
+    """
+    global _listener, _handler, _payload_sample_rate
+    root = logging.getLogger(ROOT_LOGGER)
+    root.setLevel((level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    _payload_sample_rate = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", "0.1"))
+    if _listener is not None:
+        return root
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(TextFormatter() if (fmt or os.getenv("LOG_FORMAT", "json")).lower() == "text" else JsonFormatter())
+    _handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=False)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    root.addHandler(_handler)
+    root.propagate = False
+    return root
+
+
+def shutdown_logging() -> None:
+    """Write out queued records and stop the writer thread"""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _listener = _handler = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the sensai namespace, e.g. get_logger("hint_generator")"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields: Any) -> None:
+    """Log an event with structured fields; returns at once when the level is disabled"""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra=fields)
+
+
+def payload_logging(logger: logging.Logger) -> bool:
+    """
+    Whether to log a verbose payload now: DEBUG must be enabled and the call is
+    sampled at LOG_PAYLOAD_SAMPLE_RATE. Check this before building the payload.
+    """
+    return logger.isEnabledFor(logging.DEBUG) and random.random() < _payload_sample_rate
+
+
+def logging_stats() -> Dict[str, Any]:
+    """Queue depth and records dropped because the queue was full"""
+    if _handler is None:
+        return {"configured": False}
+    return {"configured": True, "queued": _handler.queue.qsize(), "dropped": _handler.dropped}
@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cassettes import Cassette
+from fake_providers import gpt_completion
+
+
+def record(cassette: Cassette, key: str, text: str) -> None:
+    cassette.record(key, "gpt", gpt_completion(text, prompt_tokens=1, completion_tokens=1), latency=0.01)
+
+
+def test_record_session_appends_after_earlier_recordings(tmp_path):
+    path = str(tmp_path / "calls.jsonl.gz")
+    first = Cassette(path, mode="record")
+    record(first, "k", "one")
+    record(first, "k", "two")
+
+    second = Cassette(path, mode="record")
+    assert second.stats()["recordings"] == 2
+    record(second, "k", "three")
+    assert [entry["response"]["text"] for entry in second._entries["k"]] == ["one", "two", "three"]
+
+    replay = Cassette(path, mode="replay")
+    assert [replay.lookup("k")["response"]["text"] for _ in range(3)] == ["one", "two", "three"]
+
+
+def test_truncated_plain_cassette_keeps_complete_lines(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    cassette = Cassette(str(path), mode="record")
+    record(cassette, "k", "one")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "k", "resp')
+
+    assert Cassette(str(path), mode="replay").stats()["recordings"] == 1
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from prescorer import prescore, prescore_decision
+
+CODE = """def two_sum(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        complement = target - n
+"""
+
+
+def decision(hint: str) -> str:
+    result = prescore({"hint": hint}, "hint", CODE)
+    return prescore_decision(result["score"], 3.0, 4.5, 2.0)
+
+
+def test_concrete_hint_naming_a_technique_is_not_vague():
+    result = prescore({"hint": "Use binary search on the sorted array to solve the problem in O(log n)"}, "hint", CODE)
+    assert result["checks"]["vague_phrases"] == ["solve the problem"]
+    assert result["score"] == 4.5
+    assert decision("Use binary search on the sorted array to solve the problem in O(log n)") != "reject"
+
+
+def test_concrete_hint_quoting_user_code_is_not_vague():
+    hint = "Store each number in seen, then write the code that checks the complement"
+    assert prescore({"hint": hint}, "hint", CODE)["score"] == 4.5
+    assert decision(hint) != "reject"
+
+
+def test_restatement_without_a_next_step_is_vague():
+    result = prescore({"hint": "Think about the problem and keep trying"}, "hint", CODE)
+    assert result["checks"]["vague_phrases"] == ["think about the problem", "keep trying"]
+    assert result["score"] == 2.0
+    assert decision("Think about the problem and keep trying") == "reject"
+
+
+def test_vague_phrases_match_whole_words_only():
+    result = prescore({"hint": "Rewrite the codec loop so it keeps going past duplicates"}, "hint", CODE)
+    assert result["checks"]["vague_phrases"] == []
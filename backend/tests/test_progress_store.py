@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from progress_store import ProgressStore, WriteBehindQueue
+
+
+def test_read_waits_for_an_inflight_flush(tmp_path):
+    async def scenario():
+        store = ProgressStore(path=str(tmp_path / "progress.db"))
+        queue = WriteBehindQueue(store)
+        write_rows = store._aupsert_rows
+        writing, release = asyncio.Event(), asyncio.Event()
+
+        async def slow_write(rows):
+            writing.set()
+            await release.wait()
+            return await write_rows(rows)
+
+        store._aupsert_rows = slow_write
+        await queue.add([{"user_id": "alice", "problem_id": "1", "problem_title": "Two Sum", "attempts": 2}])
+        background = asyncio.create_task(queue.flush())
+        await writing.wait()
+
+        # The batch has left _pending but is not committed: alice still counts as pending
+        assert queue.has_pending("alice")
+
+        async def read():
+            if queue.has_pending("alice"):
+                await queue.flush()
+            return await store.aget_progress("alice")
+
+        reader = asyncio.create_task(read())
+        await asyncio.sleep(0.05)
+        assert not reader.done()
+
+        release.set()
+        await background
+        progress = await reader
+        assert [row["attempts"] for row in progress] == [2]
+        assert not queue.has_pending("alice")
+        await queue.close()
+        store.close()
+
+    asyncio.run(scenario())
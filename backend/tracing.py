@@ -0,0 +1,316 @@
+"""
+Request-scoped span tracing
+
+A root span is opened per HTTP request (or per generation when HintGenerator is
+used on its own) and child spans for attempts, provider calls, backoffs and
+evaluations nest under whatever span is current in the task. Finished spans are
+handed to a background exporter thread that appends them to a JSONL file
+(TRACE_EXPORTER=file) or POSTs them as OTLP/HTTP JSON to a collector
+(TRACE_EXPORTER=otlp, e.g. benchmark_eval/trace_collector.py). With tracing
+off, or for an unsampled trace, span() returns a shared no-op scope.
+"""
+
+import atexit
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TRACE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "traces.jsonl")
+DEFAULT_OTLP_ENDPOINT = "http://localhost:4318/v1/traces"
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """One timed operation with attributes; parent_id is None for a trace's root"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = "ok"
+
+    def set_name(self, name: str) -> None:
+        self.name = name
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_ns / 1e9,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class _NoopSpan:
+    """Stand-in returned when tracing is off or the trace is not sampled"""
+
+    __slots__ = ()
+
+    trace_id = None
+    span_id = None
+
+    def set_name(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+_current: contextvars.ContextVar[Any] = contextvars.ContextVar("current_span", default=None)
+
+
+class _SpanScope:
+    """Makes a span current for the duration of a with block and exports it at the end"""
+
+    __slots__ = ("span", "_parent")
+
+    def __init__(self, span: Any):
+        self.span = span
+
+    def __enter__(self) -> Any:
+        self._parent = _current.get()
+        _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        span = self.span
+        if span is not NOOP_SPAN:
+            span.end_ns = time.time_ns()
+            if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+                span.status = "cancelled" if exc_type.__name__ == "CancelledError" else "error"
+                span.attributes["error"] = f"{exc_type.__name__}: {exc}"
+            if _exporter is not None:
+                _exporter.export(span)
+        # Set (not reset) so a scope left in another context, e.g. by an async generator, cannot fail
+        _current.set(self._parent)
+        return False
+
+
+class _NoopScope:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+class SpanExporter(ABC):
+    """
+    Drains finished spans on a background thread and writes them in batches
+
+    export() never blocks: when the queue is full the span is dropped and counted.
+    """
+
+    def __init__(self, batch_size: int = 256, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self.exported = 0
+        self.dropped = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._write(batch)
+                    self.exported += len(batch)
+                except Exception:
+                    self.failed += len(batch)
+            if stop:
+                return
+
+    @abstractmethod
+    def _write(self, batch: List[Span]) -> None:
+        """Deliver one batch of finished spans"""
+
+    def shutdown(self) -> None:
+        """Write out queued spans and stop the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"exporter": type(self).__name__, "exported": self.exported, "dropped": self.dropped,
+                "failed": self.failed, "queued": self._queue.qsize()}
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends one JSON object per span (Span.to_dict) to a file"""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE, **kwargs):
+        self.path = path
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[Span]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(span.to_dict(), default=str) + "\n" for span in batch))
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_payload(spans: List[Span], service_name: str = "sensai-backend") -> Dict[str, Any]:
+    """OTLP/HTTP JSON ExportTraceServiceRequest body for spans"""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "sensai.tracing"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 2 if span.parent_id is None else 1,  # SERVER for roots, INTERNAL otherwise
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items() if v is not None],
+                "status": {"code": 2 if span.status == "error" else 1}
+            } for span in spans]
+        }]
+    }]}
+
+
+class OTLPSpanExporter(SpanExporter):
+    """POSTs batches as OTLP/HTTP JSON to a collector"""
+
+    def __init__(self, endpoint: str = DEFAULT_OTLP_ENDPOINT, timeout: float = 5.0, **kwargs):
+        self.endpoint = endpoint
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def _write(self, batch: List[Span]) -> None:
+        request = urllib.request.Request(self.endpoint, data=json.dumps(otlp_payload(batch)).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+_exporter: Optional[SpanExporter] = None
+_sample_rate = 1.0
+
+
+def configure_tracing(exporter: Optional[SpanExporter] = None) -> Optional[SpanExporter]:
+    """
+    Enable tracing with exporter, or from the environment: TRACE_EXPORTER
+    (off | file | otlp), TRACE_FILE, TRACE_OTLP_ENDPOINT and TRACE_SAMPLE_RATE
+    (fraction of root spans traced, default 1)
+    """
+    global _exporter, _sample_rate
+    _sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    if exporter is None:
+        kind = os.getenv("TRACE_EXPORTER", "off").strip().lower()
+        if kind == "file":
+            exporter = FileSpanExporter(os.getenv("TRACE_FILE", DEFAULT_TRACE_FILE))
+        elif kind == "otlp":
+            exporter = OTLPSpanExporter(os.getenv("TRACE_OTLP_ENDPOINT", DEFAULT_OTLP_ENDPOINT))
+        elif kind not in ("", "off"):
+            raise ValueError(f"TRACE_EXPORTER must be off, file or otlp, got {kind!r}")
+    if _exporter is not None:
+        _exporter.shutdown()
+    _exporter = exporter
+    if exporter is not None:
+        atexit.register(exporter.shutdown)
+    return exporter
+
+
+def tracing_stats() -> Dict[str, Any]:
+    if _exporter is None:
+        return {"enabled": False}
+    return {"enabled": True, "sample_rate": _sample_rate, **_exporter.stats()}
+
+
+def parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """(trace_id, parent span id) from a W3C traceparent header, or (None, None)"""
+    match = _TRACEPARENT.match((header or "").strip().lower())
+    if match is None or match.group(1) == "0" * 32:
+        return None, None
+    return match.group(1), match.group(2)
+
+
+def start_trace(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes: Any):
+    """
+    Scope for a new root span (continuing an upstream trace when trace_id/parent_id
+    come from a traceparent header); sampled at TRACE_SAMPLE_RATE
+    """
+    if _exporter is None:
+        return _NOOP_SCOPE
+    if trace_id is None and random.random() >= _sample_rate:
+        return _SpanScope(NOOP_SPAN)  # Unsampled: children see NOOP_SPAN and stay no-ops
+    return _SpanScope(Span(name, trace_id or f"{random.getrandbits(128):032x}", parent_id, attributes))
+
+
+def span(name: str, **attributes: Any):
+    """Scope for a child of the current span (a new trace if there is none)"""
+    parent = _current.get()
+    if parent is None:
+        return start_trace(name, **attributes)
+    if parent is NOOP_SPAN:
+        return _NOOP_SCOPE
+    return _SpanScope(Span(name, parent.trace_id, parent.span_id, attributes))
+
+
+def current_span() -> Any:
+    """The span of the enclosing scope (NOOP_SPAN outside any traced scope)"""
+    return _current.get() or NOOP_SPAN